@@ -25,7 +25,6 @@ from config import (
     MARKET_DATA_REQUEST_INTERVAL_MS,
     ML_BUY_SCORE_THRESHOLD,
     ML_SELL_SCORE_THRESHOLD,
-    broker_symbol_key,
 )
 from ctrader_open_api.messages.OpenApiMessages_pb2 import (
     ProtoOAGetTrendbarsReq,
@@ -34,8 +33,9 @@ from ctrader_open_api.messages.OpenApiMessages_pb2 import (
 from ctrader_open_api.messages.OpenApiModelMessages_pb2 import (
     ProtoOATrendbarPeriod as TrendbarPeriod,
 )
-from price_utils import resolve_price_divisor
+from ctrader_open_api.protobuf import Protobuf
 from state import app_state
+from symbol_registry import MISSING
 
 logger = logging.getLogger("analysis")
 
@@ -137,29 +137,6 @@ def _chain_clone(shared: Deferred, clone_fn):
     return d
 
 
-def _resolve_symbol_details(symbol_cache, pair: str):
-    norm = _normalize_pair(pair)
-    broker_norm = broker_symbol_key(pair)
-
-    candidates = [
-        norm,
-        broker_norm,
-        pair,
-        pair.upper() if pair else "",
-    ]
-
-    if len(norm) >= 6:
-        candidates.append(f"{norm[:3]}/{norm[3:]}")
-    if len(broker_norm) >= 6:
-        candidates.append(f"{broker_norm[:3]}/{broker_norm[3:]}")
-
-    for candidate in candidates:
-        if candidate and candidate in symbol_cache:
-            return symbol_cache[candidate]
-
-    return None
-
-
 def _models_ready() -> bool:
     return (
         ml_models.SCALER is not None
@@ -399,7 +376,7 @@ def _entry_drift_block_reason(verdict: str, signal_price, live_price) -> str | N
 
 
 @defer.inlineCallbacks
-def _analysis_flow(client, symbol_cache, symbol, user_id, timeframe="5m", lang: str | None = None):
+def _analysis_flow(client, symbols, symbol, user_id, timeframe="5m", lang: str | None = None):
     pair_norm = _normalize_pair(symbol)
     data_status = _base_status(pair_norm)
 
@@ -430,8 +407,8 @@ def _analysis_flow(client, symbol_cache, symbol, user_id, timeframe="5m", lang:
 
         tf_a, tf_b = ("1m", "5m") if timeframe == "1m" else ("5m", "15m")
 
-        d_a = get_market_data(client, symbol_cache, pair_norm, tf_a, 300)
-        d_b = get_market_data(client, symbol_cache, pair_norm, tf_b, 300)
+        d_a = get_market_data(client, symbols, pair_norm, tf_a, 300)
+        d_b = get_market_data(client, symbols, pair_norm, tf_b, 300)
 
         results = yield DeferredList([d_a, d_b], consumeErrors=True)
 
@@ -551,8 +528,13 @@ def _analysis_flow(client, symbol_cache, symbol, user_id, timeframe="5m", lang:
         }
 
 
-def get_api_detailed_signal_data(client, symbol_cache, symbol, user_id, timeframe="5m", lang: str | None = None):
+def get_api_detailed_signal_data(client, symbols, symbol, user_id, timeframe="5m", lang: str | None = None):
     pair_norm = _normalize_pair(symbol)
+    # Пара може бути поза сканером: без цього живої ціни (і перевірки
+    # відходу ціни від входу) для неї не буде.
+    from ctrader import register_price_demand
+
+    register_price_demand([pair_norm])
     tf = timeframe or "5m"
     lang_key = ""
 
@@ -572,7 +554,7 @@ def get_api_detailed_signal_data(client, symbol_cache, symbol, user_id, timefram
     if inflight is not None:
         return _chain_clone(inflight, _clone_result)
 
-    shared = defer.maybeDeferred(_analysis_flow, client, symbol_cache, pair_norm, user_id, tf, None)
+    shared = defer.maybeDeferred(_analysis_flow, client, symbols, pair_norm, user_id, tf, None)
 
     with _analysis_cache_lock:
         _analysis_inflight[inflight_key] = shared
@@ -666,7 +648,8 @@ def _dispatch_market_data_request(client, req, response_timeout: int):
     return outer
 
 
-def get_market_data(client, symbol_cache, norm_pair: str, period: str, count: int):
+def get_market_data(client, symbols, norm_pair: str, period: str, count: int):
+    """`symbols` is the SymbolRegistry (app_state.symbol_registry)."""
     cache_key = (_normalize_pair(norm_pair), period, int(count))
 
     with _market_data_lock:
@@ -684,8 +667,8 @@ def get_market_data(client, symbol_cache, norm_pair: str, period: str, count: in
     with _market_data_lock:
         _market_data_inflight[cache_key] = d
 
-    symbol_details = _resolve_symbol_details(symbol_cache, norm_pair)
-    if not symbol_details:
+    symbol_index = symbols.index(norm_pair)
+    if symbol_index == MISSING:
         with _market_data_lock:
             _market_data_inflight.pop(cache_key, None)
         reactor.callLater(0, d.errback, Exception(f"Symbol not found: {norm_pair}"))
@@ -710,7 +693,7 @@ def get_market_data(client, symbol_cache, norm_pair: str, period: str, count: in
 
     req = ProtoOAGetTrendbarsReq(
         ctidTraderAccountId=account_id,
-        symbolId=symbol_details.symbolId,
+        symbolId=symbols.symbol_ids[symbol_index],
         period=PERIOD_MAP[period],
         fromTimestamp=from_ts,
         toTimestamp=now,
@@ -729,14 +712,13 @@ def get_market_data(client, symbol_cache, norm_pair: str, period: str, count: in
             return None
 
         try:
-            res = ProtoOAGetTrendbarsRes()
-            res.ParseFromString(msg.payload)
+            res = Protobuf.extract(msg, ProtoOAGetTrendbarsRes)
 
             if not res.trendbar:
                 d.errback(Exception(f"No trendbars returned for {norm_pair} {period}"))
                 return None
 
-            divisor = resolve_price_divisor(symbol_details)
+            divisor = symbols.divisors[symbol_index]
             rows = [_trendbar_to_row(bar, divisor) for bar in res.trendbar]
             df = pd.DataFrame(rows)
 
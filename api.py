@@ -1,21 +1,23 @@
 ﻿# api.py
+import hashlib
 import json
 import logging
 import os
-import queue
-import re
 import time
-from functools import wraps
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
 from html import escape as html_escape
 from urllib.parse import quote
 
-from flask import Response, jsonify, redirect, request, send_from_directory
+from flask import Response, jsonify, redirect, request
 from twisted.internet import defer, reactor
-from twisted.internet.task import LoopingCall
-from twisted.internet.threads import blockingCallFromThread
+from twisted.internet.interfaces import IPushProducer
+from twisted.internet.threads import deferToThreadPool
 from twisted.web.resource import Resource
 from twisted.web.server import NOT_DONE_YET
 from twisted.web.wsgi import WSGIResource
+from zope.interface import implementer
 
 import analysis as analysis_module
 import ctrader
@@ -23,33 +25,35 @@ import crypto_pay
 import db
 import ml_models
 import news_filter
+import signal_archive
 import signal_tracking
+import write_behind
 from auth import get_user_id_from_init_data, is_valid_admin_token, is_valid_init_data
 from config import (
     COMMODITIES,
     CRYPTO_PAIRS,
     DEV_USER_ID,
     FOREX_SESSIONS,
+    SIGNALS_BATCH_MAX_PAIRS,
+    SSE_MAX_BUFFERED_BYTES,
     STOCK_TICKERS,
     SUBSCRIPTION_DAYS,
     get_ct_client_id,
     get_ct_client_secret,
     get_ctrader_redirect_uri,
-    get_fly_app_name,
     get_public_base_url,
 )
 from ctrader_open_api.auth import Auth as CTraderAuth
 from locales import localize_reason, localize_signal_payload, normalize_lang, session_label, t
 from session_times import DEFAULT_TIMEZONE, normalize_timezone, session_time_label
 from state import app_state
+from static_assets import StaticAssetResource, StaticAssetStore
 
 logger = logging.getLogger("api")
 WEBAPP_DIR = os.path.join(os.path.dirname(__file__), "webapp")
 TEMPLATES_DIR = os.path.join(WEBAPP_DIR, "templates")
-# Matches only src="...file.js" / href="...file.css" attribute values, so
-# cache-busting can't corrupt unrelated ".js"/".css" substrings elsewhere in
-# the page (e.g. inside inline <script> text or a ".json" reference).
-_ASSET_VERSION_PATTERN = re.compile(r'((?:src|href)=")([^"?]+\.(?:js|css))(")')
+_pair_availability_cache: dict = {}
+_forex_sessions_cache: dict = {}
 
 
 def _render_template(name: str, **kwargs) -> str:
@@ -83,19 +87,23 @@ def _current_user_id() -> int | None:
     return None
 
 
-def _request_lang() -> str:
+def _resolve_user_lang(uid: int | None, lang_hint: str | None) -> str:
     try:
-        uid = _current_user_id()
         saved_lang = db.get_user_language(uid) if uid else None
         if saved_lang:
             return normalize_lang(saved_lang)
     except Exception:
         logger.debug("Could not resolve saved user language", exc_info=True)
 
-    return normalize_lang(
+    return normalize_lang(lang_hint)
+
+
+def _request_lang() -> str:
+    return _resolve_user_lang(
+        _current_user_id(),
         request.values.get("lang")
         or request.headers.get("X-User-Language")
-        or request.headers.get("Accept-Language")
+        or request.headers.get("Accept-Language"),
     )
 
 
@@ -145,6 +153,14 @@ def _pair_key(pair: str) -> str:
 
 
 def _collect_ui_pairs(watchlist: list[str]) -> list[str]:
+    if not watchlist:
+        return list(_configured_ui_pairs())
+    return _dedupe_pair_keys(list(_configured_ui_pairs()) + list(watchlist))
+
+
+@lru_cache(maxsize=1)
+def _configured_ui_pairs() -> tuple[str, ...]:
+    """Пари з конфігу не змінюються під час роботи процесу — рахуємо раз."""
     pairs = []
 
     for session_pairs in FOREX_SESSIONS.values():
@@ -153,8 +169,10 @@ def _collect_ui_pairs(watchlist: list[str]) -> list[str]:
     pairs.extend(CRYPTO_PAIRS)
     pairs.extend(STOCK_TICKERS)
     pairs.extend(COMMODITIES)
-    pairs.extend(watchlist or [])
+    return tuple(_dedupe_pair_keys(pairs))
 
+
+def _dedupe_pair_keys(pairs: list[str]) -> list[str]:
     seen = set()
     result = []
     for pair in pairs:
@@ -171,10 +189,29 @@ def _broker_pair_availability(watchlist: list[str]) -> tuple[list[str], list[str
     if not app_state.SYMBOLS_LOADED:
         return [], []
 
+    # Доступність залежить лише від завантажених символів брокера, тож для
+    # конфігурованих пар рахуємо її раз на кожен новий реєстр символів.
+    # Тримаємо сам реєстр, не id(): id звільненого реєстру може дістатися новому.
+    registry = app_state.symbol_registry
+    cached = _pair_availability_cache.get("value")
+    if cached is None or cached[0] is not registry:
+        cached = (registry, _compute_pair_availability(_configured_ui_pairs()))
+        _pair_availability_cache["value"] = cached
+
+    available, unavailable = cached[1]
+    extra = [pair for pair in _collect_ui_pairs(watchlist) if pair not in available and pair not in unavailable]
+    if not extra:
+        return list(available), list(unavailable)
+
+    extra_available, extra_unavailable = _compute_pair_availability(extra)
+    return list(available) + extra_available, list(unavailable) + extra_unavailable
+
+
+def _compute_pair_availability(pairs) -> tuple[list[str], list[str]]:
     available = []
     unavailable = []
 
-    for pair in _collect_ui_pairs(watchlist):
+    for pair in pairs:
         if ctrader._resolve_broker_symbol(pair) is None:
             unavailable.append(pair)
         else:
@@ -183,6 +220,84 @@ def _broker_pair_availability(watchlist: list[str]) -> tuple[list[str], list[str
     return available, unavailable
 
 
+def _forex_sessions_payload(lang: str, user_timezone: str) -> list[dict]:
+    """
+    Підписи сесій залежать лише від мови, таймзони та дати (DST), тож
+    тримаємо готові списки на (lang, timezone) і скидаємо їх із новою добою.
+    """
+    today = datetime.now(timezone.utc).date()
+    if _forex_sessions_cache.get("_date") != today:
+        _forex_sessions_cache.clear()
+        _forex_sessions_cache["_date"] = today
+
+    key = (lang, user_timezone)
+    payload = _forex_sessions_cache.get(key)
+    if payload is None:
+        payload = [
+            {
+                "title": f"{session_label(k, lang)} {session_time_label(k, user_timezone)}".strip(),
+                "timezone": user_timezone,
+                "pairs": v,
+            }
+            for k, v in FOREX_SESSIONS.items()
+        ]
+        _forex_sessions_cache[key] = payload
+    return payload
+
+
+def _conditional_json(payload: dict, etag: str | None = None):
+    """
+    JSON з ETag: повторний запит з тим самим If-None-Match отримує 304
+    без тіла. no-cache змушує клієнта щоразу ревалідувати відповідь.
+    Без готового etag він рахується з тіла.
+    """
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = "private, no-cache"
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    return response.make_conditional(request)
+
+
+def _not_modified(etag: str | None):
+    """304 before the payload is built, if the client already has `etag`."""
+    if not etag or etag not in request.if_none_match:
+        return None
+    response = Response(status=304)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.set_etag(etag)
+    return response
+
+
+def _pairs_etag(uid: int | None, lang: str) -> str | None:
+    """
+    ETag /api/get_pairs з того, що вже є в пам'яті: мова, таймзона, дата
+    (DST у підписах сесій), покоління реєстру символів, версія watchlist і
+    кешований статус користувача. None — статус не в кеші або таймзону
+    треба записати: тоді відповідь рахується повністю.
+    """
+    requested_tz = _request_timezone()
+    refreshed_at = None
+    if uid:
+        status = app_state.get_cached_user_status(uid)
+        if not status or normalize_timezone(status.get("timezone")) != requested_tz:
+            return None
+        refreshed_at = status.get("refreshed_at")
+
+    parts = (
+        uid,
+        lang,
+        requested_tz,
+        datetime.now(timezone.utc).date().isoformat(),
+        app_state.symbol_registry.generation,
+        bool(app_state.SYMBOLS_LOADED),
+        db.get_watchlist_version(),
+        refreshed_at,
+    )
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
 def _unavailable_symbol_payload(pair: str, tf: str, lang: str = "en") -> dict:
     return {
         "success": False,
@@ -198,16 +313,67 @@ def _unavailable_symbol_payload(pair: str, tf: str, lang: str = "en") -> dict:
     }
 
 
+def _payment_required_payload(pair: str, tf: str, lang: str, access: dict | None) -> dict:
+    return {
+        "success": False,
+        "error": t("access_denied_subscription", lang),
+        "payment_required": True,
+        "user": access,
+        "pair": pair,
+        "timeframe": tf,
+        "verdict_text": "WAIT",
+        "score": 50,
+        "reasons": [t("access_denied_subscription", lang)],
+        "is_trade_allowed": False,
+    }
+
+
+def _bad_analysis_payload(pair: str, tf: str, lang: str) -> dict:
+    return {
+        "pair": pair,
+        "timeframe": tf,
+        "verdict_text": "ERROR",
+        "score": 50,
+        "reasons": [t("bad_analysis_response", lang)],
+        "error": t("bad_analysis_response", lang),
+        "is_trade_allowed": False,
+    }
+
+
+def _analysis_error_payload(error: BaseException, pair: str, tf: str, lang: str) -> dict:
+    raw_msg = str(error)
+    if isinstance(error, defer.TimeoutError) or "Deferred" in raw_msg:
+        msg = t("analysis_timeout", lang)
+    elif "Timed out" in raw_msg or "timeout" in raw_msg.lower():
+        msg = t("analysis_timeout", lang)
+    else:
+        # Unclassified exceptions may contain internal details (paths,
+        # connection strings, symbol internals) — never forward the raw
+        # message to the client. The full traceback is already logged.
+        msg = t("technical_error", lang)
+
+    return {
+        "success": False,
+        "error": msg,
+        "pair": pair,
+        "timeframe": tf,
+        "verdict_text": "ERROR",
+        "score": 50,
+        "reasons": [msg],
+        "is_trade_allowed": False,
+    }
+
+
 def _diagnostics_payload() -> dict:
     now = time.time()
-    prices = app_state.get_live_prices_snapshot()
+    price_ts = app_state.get_live_price_timestamps()
     configured_pairs = _collect_ui_pairs([])
     stale_prices = {
-        pair: int(now - data.get("ts", 0))
-        for pair, data in prices.items()
-        if now - data.get("ts", 0) > 60
+        pair: int(now - ts)
+        for pair, ts in price_ts.items()
+        if now - ts > 60
     }
-    missing_prices = sorted(set(configured_pairs) - set(prices.keys()))
+    missing_prices = sorted(set(configured_pairs) - set(price_ts))
 
     return {
         "ok": True,
@@ -217,7 +383,7 @@ def _diagnostics_payload() -> dict:
             "label": "символи завантажені" if app_state.SYMBOLS_LOADED else "символи не завантажені",
             "auth_issue": app_state.get_ctrader_auth_issue(),
             "configured_pairs": len(configured_pairs),
-            "prices_live": len(prices),
+            "prices_live": len(price_ts),
             "missing_prices": missing_prices,
             "stale_prices": stale_prices,
             "price_stream": ctrader.get_price_stream_status(),
@@ -237,34 +403,158 @@ def _diagnostics_payload() -> dict:
         },
         "calendar": news_filter.get_cache_stats(),
         "database": db.check_database_status(),
+        "user_cache": db.get_user_cache_stats(),
+        "db_pool": db.get_pool_stats(),
+        "runtime_settings": db.get_runtime_settings_cache_stats(),
         "sse": {
             "signal_clients": app_state.sse_listener_count("signal"),
             "price_clients": app_state.sse_listener_count("price"),
         },
+        "write_behind": write_behind.stats(),
     }
 
 
-def _drain_channel(channel: str) -> None:
-    events = app_state.pop_pending_sse_events(channel, limit=500)
-    if not events:
-        return
+@implementer(IPushProducer)
+class SSEConnection:
+    """
+    Одне SSE-підключення як IPushProducer.
 
-    for event in events:
+    Публікація викликає deliver() лише для підписаних клієнтів каналу, тож
+    ніяких per-client таймерів. Поки transport приймає дані — пишемо
+    одразу; коли його буфер переповнено і twisted кличе pauseProducing(),
+    складаємо повідомлення локально й рахуємо байти. Клієнт, що відстав
+    більше ніж на max_buffered_bytes, вважається повільним і відключається.
+    """
+
+    def __init__(self, request, channel: str, max_buffered_bytes: int = SSE_MAX_BUFFERED_BYTES):
+        self.request = request
+        self.channel = channel
+        self.max_buffered_bytes = max(1, int(max_buffered_bytes))
+        self.paused = False
+        self.closed = False
+        self.listener_id: int | None = None
+        # Пари, які показує клієнт (?pairs=); None — весь список.
+        self.pairs: set[str] | None = None
+        self._pending: deque[bytes] = deque()
+        self._pending_bytes = 0
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._pending_bytes
+
+    def deliver(self, message: bytes) -> bool:
+        """Повертає False, якщо підключення треба прибрати з реєстру."""
+        if self.closed:
+            return False
+
+        if self.paused:
+            self._pending.append(message)
+            self._pending_bytes += len(message)
+            if self._pending_bytes > self.max_buffered_bytes:
+                logger.warning(
+                    f"SSE listener #{self.listener_id} [{self.channel}] не встигає читати "
+                    f"({self._pending_bytes} байт у буфері) — відключаємо"
+                )
+                self._drop()
+                return False
+            return True
+
+        self.request.write(message)
+        return True
+
+    def pauseProducing(self) -> None:
+        self.paused = True
+
+    def resumeProducing(self) -> None:
+        self.paused = False
+        while self._pending and not self.paused and not self.closed:
+            message = self._pending.popleft()
+            self._pending_bytes -= len(message)
+            self.request.write(message)
+
+    def stopProducing(self) -> None:
+        self._close()
+
+    def _close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._pending.clear()
+        self._pending_bytes = 0
+        if self.listener_id is not None:
+            app_state.unregister_sse_listener(self.channel, self.listener_id)
+
+    def _drop(self) -> None:
+        self._close()
+        transport = getattr(self.request, "transport", None)
         try:
-            msg = f"data: {_safe_json_dumps(event)}\n\n"
-            app_state.broadcast_sse_message(channel, msg)
+            if transport is not None and hasattr(transport, "abortConnection"):
+                transport.abortConnection()
+            else:
+                self.request.loseConnection()
         except Exception:
-            logger.exception(f"Не вдалося транслювати SSE event каналу '{channel}'")
+            logger.exception("Не вдалося закрити повільне SSE-підключення")
 
 
-def drain_sse_events() -> None:
-    _drain_channel("signal")
-    _drain_channel("price")
+class _NativeApiResource(Resource):
+    """
+    Спільні хелпери для маршрутів, які обслуговуються напряму reactor-ом
+    (поза Flask/WSGI): аргументи запиту, авторизація, JSON-відповідь.
+    """
 
-
-class SSEStreamResource(Resource):
     isLeaf = True
 
+    @staticmethod
+    def _get_query_arg(request, key: bytes) -> str | None:
+        values = request.args.get(key, [])
+        if not values:
+            return None
+        try:
+            return values[0].decode("utf-8", errors="ignore")
+        except Exception:
+            return None
+
+    @staticmethod
+    def _get_header(request, name: bytes) -> str | None:
+        value = request.getHeader(name)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return value.decode("utf-8", errors="ignore")
+        return value
+
+    def _lang_hint(self, request) -> str | None:
+        return (
+            self._get_query_arg(request, b"lang")
+            or self._get_header(request, b"X-User-Language")
+            or self._get_header(request, b"Accept-Language")
+        )
+
+    def _authenticate(self, request) -> tuple[bool, int | None]:
+        """Те саме правило, що й _protected_route + _current_user_id."""
+        if is_valid_admin_token(self._get_query_arg(request, b"admin_token")):
+            return True, DEV_USER_ID
+
+        init_data = self._get_query_arg(request, b"initData")
+        if not is_valid_init_data(init_data):
+            return False, None
+        return True, get_user_id_from_init_data(init_data)
+
+    @staticmethod
+    def _json_body(request, payload: dict, status: int = 200) -> bytes:
+        request.setResponseCode(status)
+        request.setHeader(b"Content-Type", b"application/json; charset=utf-8")
+        return _safe_json_dumps(payload).encode("utf-8")
+
+    @classmethod
+    def _finish_json(cls, request, payload: dict, status: int = 200) -> None:
+        if getattr(request, "_disconnected", False) or request.finished:
+            return
+        request.write(cls._json_body(request, payload, status))
+        request.finish()
+
+
+class SSEStreamResource(_NativeApiResource):
     def __init__(self, channel: str):
         super().__init__()
         self.channel = channel
@@ -274,9 +564,7 @@ class SSEStreamResource(Resource):
         admin_token = self._get_query_arg(request, b"admin_token")
         lang = normalize_lang(self._get_query_arg(request, b"lang"))
         if not is_valid_admin_token(admin_token) and not is_valid_init_data(init_data):
-            request.setResponseCode(401)
-            request.setHeader(b"Content-Type", b"application/json; charset=utf-8")
-            return _safe_json_dumps({"success": False, "error": t("unauthorized", lang)}).encode("utf-8")
+            return self._json_body(request, {"success": False, "error": t("unauthorized", lang)}, 401)
 
         request.setHeader(b"Content-Type", b"text/event-stream; charset=utf-8")
         request.setHeader(b"Cache-Control", b"no-cache")
@@ -284,64 +572,237 @@ class SSEStreamResource(Resource):
         request.setHeader(b"X-Accel-Buffering", b"no")
         request.write(b": connected\n\n")
 
-        listener_id, listener_queue = app_state.register_sse_listener(self.channel, maxsize=200)
-        flusher = LoopingCall(self._flush_queue, request, listener_queue)
-        flusher.clock = reactor
+        connection = SSEConnection(request, self.channel)
+        pairs = {_pair_key(pair) for pair in (self._get_query_arg(request, b"pairs") or "").split(",")}
+        pairs.discard("")
+        connection.pairs = pairs or None
+        request.registerProducer(connection, True)
+        connection.listener_id = app_state.register_sse_listener(self.channel, connection)
+        if self.channel == "price":
+            # Новий глядач може потребувати пар, на які ще немає підписки.
+            ctrader.request_price_demand_refresh()
 
         def _cleanup(_=None):
+            connection._close()
             try:
-                if getattr(flusher, "running", False):
-                    flusher.stop()
+                request.unregisterProducer()
             except Exception:
-                logger.exception("Помилка зупинки SSE flusher")
-            app_state.unregister_sse_listener(self.channel, listener_id)
+                pass
             return None
 
         request.notifyFinish().addBoth(_cleanup)
+        return NOT_DONE_YET
+
+
+def _blocking_pool():
+    return app_state.blocking_pool or reactor.getThreadPool()
+
+
+def _prepare_signal_access(uid: int, lang_hint: str | None) -> tuple[str, dict | None, bool]:
+    """Усі DB-кроки перед аналізом — виконується в blocking_pool."""
+    with db.unit_of_work():
+        lang = _resolve_user_lang(uid, lang_hint)
+        access, trial_started = db.ensure_trial_or_access(uid, language_hint=lang)
+    return lang, access, trial_started
+
 
-        d = flusher.start(0.25, now=False)
+def _record_signals_in_background(results: list[dict]) -> None:
+    """Лише ставить записи в write-behind буфер — INSERT робить його flush
+    у blocking_pool, тож з reactor-потоку викликати безпечно."""
+    for result in results:
+        try:
+            signal_tracking.maybe_record_signal(result)
+        except Exception:
+            logger.exception("Failed to record signal outcome for pair=%s", result.get("pair"))
+
+
+def _record_signal_in_background(result: dict) -> None:
+    _record_signals_in_background([result])
 
-        def _flusher_failed(failure):
-            logger.warning(
-                f"SSE flusher failure [{self.channel}]: {failure.getErrorMessage()}"
+
+class SignalResource(_NativeApiResource):
+    """
+    /api/signal без WSGI-потоку: запит тримає лише Deferred аналізу, а
+    DB-перевірки доступу короткочасно йдуть у blocking_pool. Раніше кожен
+    аналіз займав потік wsgi_pool до 50s через blockingCallFromThread,
+    і 20 повільних запитів повністю блокували Web App.
+    """
+
+    def render_GET(self, request):
+        lang_hint = self._lang_hint(request)
+        pair = (self._get_query_arg(request, b"pair") or "").strip()
+        tf = (self._get_query_arg(request, b"timeframe") or "15m").strip()
+
+        authorized, uid = self._authenticate(request)
+        if not authorized:
+            return self._json_body(request, {"success": False, "error": t("unauthorized", normalize_lang(lang_hint))}, 401)
+
+        if not pair:
+            return self._json_body(request, {"success": False, "error": t("pair_required", normalize_lang(lang_hint))}, 400)
+
+        if not uid:
+            return self._json_body(request, {"success": False, "error": t("user_not_resolved", normalize_lang(lang_hint))}, 400)
+
+        request.notifyFinish().addErrback(lambda _: setattr(request, "_disconnected", True))
+        self._handle(request, pair, tf, uid, lang_hint)
+        return NOT_DONE_YET
+
+    @defer.inlineCallbacks
+    def _handle(self, request, pair: str, tf: str, uid: int, lang_hint: str | None):
+        lang = normalize_lang(lang_hint)
+        try:
+            lang, access, trial_started = yield deferToThreadPool(
+                reactor, _blocking_pool(), _prepare_signal_access, uid, lang_hint
             )
-            _cleanup()
 
-        d.addErrback(_flusher_failed)
+            if not access or not access.get("access_allowed"):
+                self._finish_json(request, _payment_required_payload(pair, tf, lang, access), 402)
+                return
+
+            if app_state.SYMBOLS_LOADED and ctrader._resolve_broker_symbol(pair) is None:
+                self._finish_json(request, _unavailable_symbol_payload(pair, tf, lang))
+                return
+
+            app_state.mark_manual_analysis_request()
+            result = yield _call_analysis_in_reactor(pair, uid, tf, lang)
+
+            if not isinstance(result, dict):
+                result = _bad_analysis_payload(pair, tf, lang)
+
+            if trial_started:
+                result["trial_started"] = True
+                result["user"] = access
+
+            self._finish_json(request, localize_signal_payload(result, lang))
+            _record_signal_in_background(result)
+
+        except Exception as e:
+            logger.exception("api_signal failed for pair=%s timeframe=%s", pair, tf)
+            self._finish_json(request, _analysis_error_payload(e, pair, tf, lang), 500)
+
+
+def _parse_batch_pairs(raw: str | None) -> list[str]:
+    pairs: list[str] = []
+    seen: set[str] = set()
+    for item in (raw or "").split(","):
+        pair = item.strip()
+        key = _pair_key(pair)
+        if not pair or key in seen:
+            continue
+        seen.add(key)
+        pairs.append(pair)
+    return pairs[:SIGNALS_BATCH_MAX_PAIRS]
+
+
+class SignalsBatchResource(_NativeApiResource):
+    """
+    /api/signals?pairs=A,B,C — аналіз кількох пар за один запит.
+
+    Авторизація та перевірка доступу виконуються один раз, далі кожна
+    пара йде через той самий in-flight map, що й /api/signal, тож
+    паралельні запити на ту саму пару не дублюють аналіз. Відповідь —
+    NDJSON: по рядку на пару в порядку готовності; кешовані результати
+    пишуться одразу, решта — щойно завершиться аналіз. Запис outcome-ів
+    робиться одним викликом blocking_pool після завершення пачки.
+    """
+
+    def render_GET(self, request):
+        lang_hint = self._lang_hint(request)
+        tf = (self._get_query_arg(request, b"timeframe") or "15m").strip()
+        pairs = _parse_batch_pairs(self._get_query_arg(request, b"pairs"))
+
+        authorized, uid = self._authenticate(request)
+        if not authorized:
+            return self._json_body(request, {"success": False, "error": t("unauthorized", normalize_lang(lang_hint))}, 401)
+
+        if not pairs:
+            return self._json_body(request, {"success": False, "error": t("pair_required", normalize_lang(lang_hint))}, 400)
+
+        if not uid:
+            return self._json_body(request, {"success": False, "error": t("user_not_resolved", normalize_lang(lang_hint))}, 400)
+
+        request.notifyFinish().addErrback(lambda _: setattr(request, "_disconnected", True))
+        self._handle(request, pairs, tf, uid, lang_hint)
         return NOT_DONE_YET
 
     @staticmethod
-    def _get_query_arg(request, key: bytes) -> str | None:
-        values = request.args.get(key, [])
-        if not values:
-            return None
+    def _write_line(request, payload: dict) -> None:
+        if getattr(request, "_disconnected", False) or request.finished:
+            return
+        request.write(_safe_json_dumps(payload).encode("utf-8") + b"\n")
+
+    @defer.inlineCallbacks
+    def _handle(self, request, pairs: list[str], tf: str, uid: int, lang_hint: str | None):
+        lang = normalize_lang(lang_hint)
         try:
-            return values[0].decode("utf-8", errors="ignore")
+            lang, access, trial_started = yield deferToThreadPool(
+                reactor, _blocking_pool(), _prepare_signal_access, uid, lang_hint
+            )
         except Exception:
-            return None
+            logger.exception("api_signals access check failed for uid=%s", uid)
+            self._finish_json(request, {"success": False, "error": t("technical_error", lang)}, 500)
+            return
 
-    @staticmethod
-    def _flush_queue(request, listener_queue: queue.Queue) -> None:
-        for _ in range(100):
-            try:
-                message = listener_queue.get_nowait()
-            except queue.Empty:
-                break
+        if not access or not access.get("access_allowed"):
+            payload = _payment_required_payload(pairs[0], tf, lang, access)
+            payload["pairs"] = pairs
+            self._finish_json(request, payload, 402)
+            return
+
+        request.setHeader(b"Content-Type", b"application/x-ndjson; charset=utf-8")
+        request.setHeader(b"Cache-Control", b"no-cache")
+        request.setHeader(b"X-Accel-Buffering", b"no")
+
+        app_state.mark_manual_analysis_request()
+        recorded: list[dict] = []
+        pending: list[defer.Deferred] = []
+
+        for pair in pairs:
+            if app_state.SYMBOLS_LOADED and ctrader._resolve_broker_symbol(pair) is None:
+                self._write_line(request, _unavailable_symbol_payload(pair, tf, lang))
+                continue
 
-            if isinstance(message, str):
-                message = message.encode("utf-8")
+            d = _call_analysis_in_reactor(pair, uid, tf, lang)
+            d.addCallback(self._on_result, request, pair, tf, lang, access if trial_started else None, recorded)
+            # Після _on_result: його збій теж має дати рядок для пари, а не
+            # зникнути в DeferredList(consumeErrors=True).
+            d.addErrback(self._on_error, request, pair, tf, lang)
+            pending.append(d)
 
-            request.write(message)
+        if pending:
+            yield defer.DeferredList(pending, consumeErrors=True)
+
+        if not getattr(request, "_disconnected", False) and not request.finished:
+            request.finish()
+        _record_signals_in_background(recorded)
+
+    def _on_result(self, result, request, pair, tf, lang, trial_access, recorded):
+        if not isinstance(result, dict):
+            result = _bad_analysis_payload(pair, tf, lang)
+
+        if trial_access is not None:
+            result["trial_started"] = True
+            result["user"] = trial_access
+
+        self._write_line(request, localize_signal_payload(result, lang))
+        recorded.append(result)
+
+    def _on_error(self, failure, request, pair, tf, lang):
+        logger.error("api_signals failed for pair=%s timeframe=%s\n%s", pair, tf, failure.getTraceback())
+        self._write_line(request, _analysis_error_payload(failure.value, pair, tf, lang))
 
 
 class HybridRootResource(Resource):
     isLeaf = True
 
-    def __init__(self, wsgi_resource: WSGIResource):
+    def __init__(self, wsgi_resource: WSGIResource, static_resource: StaticAssetResource | None = None):
         super().__init__()
         self._wsgi_resource = wsgi_resource
+        self._static_resource = static_resource
         self._signal_resource = SSEStreamResource("signal")
         self._price_resource = SSEStreamResource("price")
+        self._signal_api_resource = SignalResource()
+        self._signals_batch_resource = SignalsBatchResource()
 
     def render(self, request):
         path = request.path.rstrip(b"/") or b"/"
@@ -352,19 +813,29 @@ class HybridRootResource(Resource):
         if path == b"/api/price-stream":
             return self._price_resource.render(request)
 
+        if path == b"/api/signal":
+            return self._signal_api_resource.render(request)
+
+        if path == b"/api/signals":
+            return self._signals_batch_resource.render(request)
+
+        if self._static_resource is not None and self._static_resource.has(path):
+            return self._static_resource.render(request)
+
         return self._wsgi_resource.render(request)
 
 
 def build_root_resource(flask_app, reactor_obj, wsgi_pool):
     wsgi_resource = WSGIResource(reactor_obj, wsgi_pool, flask_app)
-    return HybridRootResource(wsgi_resource)
+    static_resource = StaticAssetResource(StaticAssetStore().load())
+    return HybridRootResource(wsgi_resource, static_resource)
 
 
 @defer.inlineCallbacks
 def _call_analysis_in_reactor(pair: str, uid: int | None, tf: str, lang: str):
     d = analysis_module.get_api_detailed_signal_data(
         app_state.client,
-        app_state.symbol_cache,
+        app_state.symbol_registry,
         pair.replace("/", ""),
         uid,
         tf,
@@ -384,6 +855,14 @@ def _ctrader_oauth_client() -> CTraderAuth:
 
 
 def register_routes(app):
+    @app.before_request
+    def _begin_db_unit_of_work():
+        db.begin_unit_of_work()
+
+    @app.teardown_request
+    def _end_db_unit_of_work(exc):
+        db.end_unit_of_work()
+
     @app.route("/privacy")
     @app.route("/privacy.html")
     def privacy_policy():
@@ -476,8 +955,8 @@ def register_routes(app):
     def health_check():
         lang = _request_lang()
         try:
-            prices = app_state.get_live_prices_snapshot()
-            stale_count = sum(1 for d in prices.values() if time.time() - d.get("ts", 0) > 300)
+            price_ts = app_state.get_live_price_timestamps()
+            stale_count = sum(1 for ts in price_ts.values() if time.time() - ts > 300)
             tg_status = f"✅ {t('active', lang)}" if app_state.updater else f"❌ {t('disabled', lang)}"
             quote_label = "✅ " + t("ready", lang) if app_state.SYMBOLS_LOADED else "❌ " + t("error", lang)
             # Public endpoint: no cTrader error details here (those can contain
@@ -502,7 +981,7 @@ def register_routes(app):
                 sse_price_label=t("sse_price_clients", lang),
                 sse_price_count=app_state.sse_listener_count("price"),
                 live_prices_label=t("live_prices", lang),
-                live_prices_count=len(prices),
+                live_prices_count=len(price_ts),
                 stale_prices_label=t("stale_prices", lang),
                 stale_count=stale_count,
                 updated_label=t("updated", lang),
@@ -534,10 +1013,11 @@ def register_routes(app):
         if not pairs:
             return jsonify({"success": False, "error": t("pair_required", _request_lang())}), 400
 
-        snapshot = app_state.get_live_prices_snapshot()
+        # Кореляційна перевірка binomo_executor опитує пари поза сканером.
+        ctrader.register_price_demand(pairs)
         prices = {}
         for pair in pairs:
-            data = snapshot.get(pair)
+            data = app_state.get_live_price(pair)
             if data and isinstance(data.get("mid"), (int, float)):
                 prices[pair] = {"mid": data["mid"], "ts": data.get("ts")}
 
@@ -558,30 +1038,33 @@ def register_routes(app):
             days = 7
 
         stats = db.get_signal_outcome_stats(days)
-        return jsonify({"success": True, **stats})
+        payload = {"success": True, **stats}
+        if request.args.get("archive") in ("1", "true"):
+            # Raw archived rows are read from the monthly CSV.gz files on
+            # demand; the main counters above already include archived days
+            # via rollups.
+            payload["archive"] = signal_archive.get_archived_signal_outcome_stats(days)
+            payload["archive_files"] = signal_archive.list_archive_files()
+        return jsonify(payload)
 
     @app.route("/api/get_pairs")
     @_protected_route
     def get_pairs():
         lang = _request_lang()
         uid = _current_user_id()
+        not_modified = _not_modified(_pairs_etag(uid, lang))
+        if not_modified is not None:
+            return not_modified
+
         user_timezone = _sync_user_timezone(uid)
         user_status = db.get_cached_user_status(uid, language_hint=lang) if uid else None
         raw_watchlist = db.get_watchlist(uid) if uid else []
-        configured_pairs = set(_collect_ui_pairs([]))
+        configured_pairs = set(_configured_ui_pairs())
         watchlist = [pair for pair in raw_watchlist if _pair_key(pair) in configured_pairs]
         available_pairs, unavailable_pairs = _broker_pair_availability(watchlist)
-        forex_data = [
-            {
-                "title": f"{session_label(k, lang)} {session_time_label(k, user_timezone)}".strip(),
-                "timezone": user_timezone,
-                "pairs": v,
-            }
-            for k, v in FOREX_SESSIONS.items()
-        ]
-        return jsonify(
+        return _conditional_json(
             {
-                "forex": forex_data,
+                "forex": _forex_sessions_payload(lang, user_timezone),
                 "crypto": CRYPTO_PAIRS,
                 "stocks": STOCK_TICKERS,
                 "commodities": COMMODITIES,
@@ -592,7 +1075,10 @@ def register_routes(app):
                 "language": lang,
                 "timezone": user_timezone,
                 "user": user_status,
-            }
+            },
+            # Після синхронізації таймзони й статусу кеш теплий — той самий
+            # ETag, що наступний запит порахує без жодної роботи з БД.
+            etag=_pairs_etag(uid, lang),
         )
 
     @app.route("/api/user/status", methods=["GET"])
@@ -753,7 +1239,7 @@ def register_routes(app):
         cat = request.values.get("category")
         if cat in app_state.SCANNER_STATE:
             app_state.set_scanner_state(cat, not app_state.get_scanner_state(cat))
-            reactor.callLater(0.5, ctrader.start_price_subscriptions)
+            reactor.callFromThread(ctrader.request_price_demand_refresh)
         return jsonify(app_state.get_scanner_state_snapshot())
 
     @app.route("/api/toggle_watchlist", methods=["GET", "POST"])
@@ -782,119 +1268,3 @@ def register_routes(app):
                 "pair": pair.replace("/", "").upper(),
             }
         )
-
-    @app.route("/api/signal")
-    @_protected_route
-    def api_signal():
-        lang = _request_lang()
-        pair = request.args.get("pair", "").strip()
-        tf = request.args.get("timeframe", "15m").strip()
-        uid = _current_user_id()
-
-        if not pair:
-            return jsonify({"success": False, "error": t("pair_required", lang)}), 400
-
-        if not uid:
-            return jsonify({"success": False, "error": t("user_not_resolved", lang)}), 400
-
-        access, trial_started = db.ensure_trial_or_access(uid, language_hint=lang)
-        if not access or not access.get("access_allowed"):
-            return jsonify(
-                {
-                    "success": False,
-                    "error": t("access_denied_subscription", lang),
-                    "payment_required": True,
-                    "user": access,
-                    "pair": pair,
-                    "timeframe": tf,
-                    "verdict_text": "WAIT",
-                    "score": 50,
-                    "reasons": [t("access_denied_subscription", lang)],
-                    "is_trade_allowed": False,
-                }
-            ), 402
-
-        if app_state.SYMBOLS_LOADED and ctrader._resolve_broker_symbol(pair) is None:
-            return jsonify(_unavailable_symbol_payload(pair, tf, lang))
-
-        try:
-            app_state.mark_manual_analysis_request()
-            result = blockingCallFromThread(
-                reactor,
-                _call_analysis_in_reactor,
-                pair,
-                uid,
-                tf,
-                lang,
-            )
-
-            if not isinstance(result, dict):
-                result = {
-                    "pair": pair,
-                    "timeframe": tf,
-                    "verdict_text": "ERROR",
-                    "score": 50,
-                    "reasons": [t("bad_analysis_response", lang)],
-                    "error": t("bad_analysis_response", lang),
-                    "is_trade_allowed": False,
-                }
-
-            if trial_started:
-                result["trial_started"] = True
-                result["user"] = access
-
-            try:
-                signal_tracking.maybe_record_signal(result)
-            except Exception:
-                logger.exception("Failed to record signal outcome for pair=%s", pair)
-
-            return jsonify(localize_signal_payload(result, lang))
-
-        except Exception as e:
-            logger.exception("api_signal failed for pair=%s timeframe=%s", pair, tf)
-
-            raw_msg = str(e)
-            if raw_msg in {"(45, 'Deferred')", "(50, 'Deferred')"} or "Deferred" in raw_msg:
-                msg = t("analysis_timeout", lang)
-            elif "Timed out" in raw_msg or "timeout" in raw_msg.lower():
-                msg = t("analysis_timeout", lang)
-            else:
-                # Unclassified exceptions may contain internal details (paths,
-                # connection strings, symbol internals) — never forward the raw
-                # message to the client. The full traceback is already logged above.
-                msg = t("technical_error", lang)
-
-            return jsonify(
-                {
-                    "success": False,
-                    "error": msg,
-                    "pair": pair,
-                    "timeframe": tf,
-                    "verdict_text": "ERROR",
-                    "score": 50,
-                    "reasons": [msg],
-                    "is_trade_allowed": False,
-                }
-            ), 500
-
-    @app.route("/")
-    def home():
-        idx = os.path.join(WEBAPP_DIR, "index.html")
-        if os.path.exists(idx):
-            with open(idx, "r", encoding="utf-8") as f:
-                content = f.read().replace(
-                    "{{API_BASE_URL}}",
-                    f"https://{get_fly_app_name()}.fly.dev" if get_fly_app_name() else "",
-                )
-                version = int(time.time())
-                content = _ASSET_VERSION_PATTERN.sub(rf"\1\2?v={version}\3", content)
-                return Response(content, mimetype="text/html")
-        return t("not_found", _request_lang()), 404
-
-    @app.route("/<path:filename>")
-    def static_files(filename):
-        # webapp/templates/ holds server-rendered HTML fragments (with raw
-        # {placeholder} markers) — never serve them directly as static files.
-        if filename == "templates" or filename.startswith("templates/"):
-            return t("not_found", _request_lang()), 404
-        return send_from_directory(WEBAPP_DIR, filename)
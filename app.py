@@ -8,6 +8,7 @@ import time
 from flask import Flask
 from twisted.internet import reactor
 from twisted.internet.task import LoopingCall
+from twisted.internet.threads import deferToThreadPool
 from twisted.python.threadpool import ThreadPool
 from twisted.web.server import Site
 
@@ -18,8 +19,10 @@ import ctrader
 import db
 import ml_models
 import scanner
+import signal_archive
 import signal_tracking
 import threshold_advisor
+import write_behind
 from errors import ConfigError
 from notifier import notify_bot_failed
 from state import app_state
@@ -69,7 +72,12 @@ def _start_loop(interval: float, func, *, now: bool = False, name: str = "loop")
 
 
 def _publish_sse_ping() -> None:
-    app_state.publish_sse({"_ping": int(time.time())})
+    app_state.publish_sse_ping(int(time.time()))
+
+
+def _run_signal_archive() -> None:
+    d = deferToThreadPool(reactor, app_state.blocking_pool, signal_archive.run_archival)
+    d.addErrback(lambda failure: logger.error(f"Архівація сигналів не вдалася: {failure.getErrorMessage()}"))
 
 
 def _start_background_services() -> None:
@@ -95,10 +103,16 @@ def _start_background_services() -> None:
     except Exception:
         logger.exception("Не вдалося запустити cTrader client")
 
+    rollups = deferToThreadPool(reactor, app_state.blocking_pool, db.ensure_signal_outcome_rollups)
+    rollups.addErrback(
+        lambda failure: logger.error(f"Не вдалося підготувати signal outcome rollups: {failure.getErrorMessage()}")
+    )
+
+    write_behind.start(reactor, app_state.blocking_pool)
+
     _start_loop(60.0, scanner.scan_markets_once, now=False, name="scanner")
     _start_loop(30.0, ctrader.monitor_price_stream_health, now=False, name="price_watchdog")
     _start_loop(120.0, db.refresh_cached_user_statuses, now=False, name="user_status_cache")
-    _start_loop(0.2, api.drain_sse_events, now=False, name="sse_drain")
     _start_loop(20.0, _publish_sse_ping, now=False, name="sse_ping")
     _start_loop(
         max(30.0, config.SIGNAL_OUTCOME_CHECK_INTERVAL_MINUTES * 60.0),
@@ -106,6 +120,8 @@ def _start_background_services() -> None:
         now=False,
         name="signal_outcome_resolver",
     )
+    if config.SIGNAL_ARCHIVE_RETENTION_DAYS and config.SIGNAL_ARCHIVE_RETENTION_DAYS > 0:
+        _start_loop(24 * 3600.0, _run_signal_archive, now=False, name="signal_archive")
     _start_loop(
         max(3600.0, config.THRESHOLD_RECOMMENDATION_INTERVAL_HOURS * 3600.0),
         threshold_advisor.send_daily_recommendation,
@@ -131,6 +147,13 @@ def _shutdown() -> None:
     finally:
         app_state.updater = None
 
+    try:
+        flushed = write_behind.stop_and_flush()
+        if flushed:
+            logger.info(f"Write-behind: дописано {flushed} рядків перед зупинкою")
+    except Exception:
+        logger.exception("Не вдалося дописати write-behind буфери")
+
     for pool_name, pool in (
         ("wsgi_pool", app_state.wsgi_pool),
         ("blocking_pool", app_state.blocking_pool),
@@ -162,13 +185,13 @@ def main():
 
     wsgi_pool = _create_thread_pool(
         "zigzag-wsgi-pool",
-        minthreads=_env_int("WSGI_POOL_MIN", 4),
-        maxthreads=_env_int("WSGI_POOL_MAX", 20),
+        minthreads=config.WSGI_POOL_MIN,
+        maxthreads=config.WSGI_POOL_MAX,
     )
     blocking_pool = _create_thread_pool(
         "zigzag-blocking-pool",
-        minthreads=_env_int("BLOCKING_POOL_MIN", 2),
-        maxthreads=_env_int("BLOCKING_POOL_MAX", 12),
+        minthreads=config.BLOCKING_POOL_MIN,
+        maxthreads=config.BLOCKING_POOL_MAX,
     )
     app_state.set_thread_pools(wsgi_pool=wsgi_pool, blocking_pool=blocking_pool)
 
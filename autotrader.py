@@ -51,6 +51,7 @@ from ctrader_open_api.messages.OpenApiModelMessages_pb2 import (
     ProtoOAPayloadType,
     ProtoOATradeSide,
 )
+from ctrader_open_api.protobuf import Protobuf
 from state import app_state
 
 logger = logging.getLogger("autotrader")
@@ -162,8 +163,7 @@ def _fetch_balance_in_reactor():
     req = ProtoOATraderReq(ctidTraderAccountId=account_id)
     msg = yield client.send(req, responseTimeoutInSeconds=15)
 
-    res = ProtoOATraderRes()
-    res.ParseFromString(msg.payload)
+    res = Protobuf.extract(msg, ProtoOATraderRes)
     money_digits = res.trader.moneyDigits or 2
     return res.trader.balance / (10 ** money_digits)
 
@@ -218,9 +218,11 @@ def _normalize_volume(pair: str, raw_units: float) -> int | None:
     if symbol is None or raw_units <= 0:
         return None
 
-    min_volume = getattr(symbol, "minVolume", 0) or 1000
-    max_volume = getattr(symbol, "maxVolume", 0) or None
-    step_volume = getattr(symbol, "stepVolume", 0) or min_volume or 1
+    # Обмеження обсягу є лише в ProtoOASymbol (деталі), не в light-символі зі списку.
+    details = ctrader.get_symbol_details(getattr(symbol, "symbolId", None))
+    min_volume = details.get("minVolume") or getattr(symbol, "minVolume", 0) or 1000
+    max_volume = details.get("maxVolume") or getattr(symbol, "maxVolume", 0) or None
+    step_volume = details.get("stepVolume") or getattr(symbol, "stepVolume", 0) or min_volume or 1
 
     # cTrader volume field is units * 100 (e.g. 1 standard FX lot = 100,000
     # units -> volume=10,000,000).
@@ -356,22 +358,19 @@ def _handle_order_submit_response(trade_id: int, prepared: dict, msg) -> None:
     pt = msg.payloadType
 
     if pt == ProtoOAPayloadType.PROTO_OA_EXECUTION_EVENT:
-        event = ProtoOAExecutionEvent()
-        event.ParseFromString(msg.payload)
+        event = Protobuf.extract(msg, ProtoOAExecutionEvent)
         _apply_execution_event(event, trade_id_hint=trade_id, prepared=prepared)
         return
 
     if pt == ProtoOAPayloadType.PROTO_OA_ORDER_ERROR_EVENT:
-        event = ProtoOAOrderErrorEvent()
-        event.ParseFromString(msg.payload)
+        event = Protobuf.extract(msg, ProtoOAOrderErrorEvent)
         message = f"{event.errorCode}: {event.description}"
         deferToThreadPool(reactor, _blocking_pool(), db.mark_auto_trade_error, trade_id, message[:255])
         _notify_admin_async(f"❌ Автотрейд #{trade_id} {prepared['pair']} {prepared['verdict']}: {message}")
         return
 
     if pt == ProtoOAPayloadType.PROTO_OA_ERROR_RES:
-        res = ProtoOAErrorRes()
-        res.ParseFromString(msg.payload)
+        res = Protobuf.extract(msg, ProtoOAErrorRes)
         message = f"{res.errorCode}: {res.description}"
         deferToThreadPool(reactor, _blocking_pool(), db.mark_auto_trade_error, trade_id, message[:255])
         _notify_admin_async(f"❌ Автотрейд #{trade_id} {prepared['pair']} {prepared['verdict']}: {message}")
@@ -98,6 +98,77 @@ MARKET_DATA_REQUEST_INTERVAL_MS = _env_int("MARKET_DATA_REQUEST_INTERVAL_MS", 40
 MARKET_DATA_MAX_CONCURRENT_REQUESTS = _env_int("MARKET_DATA_MAX_CONCURRENT_REQUESTS", 1) or 1
 MIN_ATR_PERCENTAGE = _env_float("MIN_ATR_PERCENTAGE", 0.05)
 
+# cTrader spot events: when on, all ticks decoded from one socket read are
+# handed to ctrader.py as one batch (one reactor callback per read, repeated
+# ticks of the same symbol coalesced) instead of one dispatch per tick.
+CTRADER_SPOT_BATCHING = _env_bool("CTRADER_SPOT_BATCHING", True)
+
+# Warm-standby cTrader session: a second socket to the next proto host, kept
+# app-authorized. On a connection failure it is promoted in place (account
+# auth only) and symbols/live prices are kept, instead of a full teardown and
+# a 5-180s reconnect. Off by default — it is one more Open API connection.
+CTRADER_HOT_STANDBY = _env_bool("CTRADER_HOT_STANDBY", False)
+
+# Local snapshot of the cTrader symbol list (symbol_snapshot.py), loaded at
+# boot so prices and analysis don't wait for ProtoOASymbolsListRes. Defaults
+# to the directory of a SQLite database file (survives deploys on the Fly
+# volume), otherwise data/ in the app directory.
+CTRADER_SYMBOL_SNAPSHOT = _env_bool("CTRADER_SYMBOL_SNAPSHOT", True)
+CTRADER_SYMBOL_SNAPSHOT_PATH = _env_str("CTRADER_SYMBOL_SNAPSHOT_PATH")
+
+# Recording / replay of the incoming cTrader frame stream (ctrader_replay.py).
+# CTRADER_RECORD_PATH writes every frame the live connection receives to that
+# file (+ a .times sidecar). CTRADER_REPLAY_PATH runs the bot off such a
+# recording instead of a live connection, at CTRADER_REPLAY_SPEED (1 =
+# recorded pace, N = N times faster, 0 = as fast as possible).
+CTRADER_RECORD_PATH = _env_str("CTRADER_RECORD_PATH")
+CTRADER_REPLAY_PATH = _env_str("CTRADER_REPLAY_PATH")
+CTRADER_REPLAY_SPEED = _env_float("CTRADER_REPLAY_SPEED", 1.0)
+
+# SSE push delivery: how many bytes may pile up for one client whose TCP
+# send buffer is already full before it is treated as a slow reader and
+# disconnected (EventSource reconnects on its own).
+SSE_MAX_BUFFERED_BYTES = _env_int("SSE_MAX_BUFFERED_BYTES", 256 * 1024) or 256 * 1024
+
+# Upper bound on pairs accepted by one /api/signals batch request.
+SIGNALS_BATCH_MAX_PAIRS = _env_int("SIGNALS_BATCH_MAX_PAIRS", 30) or 30
+
+# Write-behind buffering for SignalOutcome inserts: rows are batched and
+# flushed by the blocking pool every interval, or earlier once the buffer
+# holds WRITE_BEHIND_MAX_BATCH rows.
+WRITE_BEHIND_FLUSH_INTERVAL_MS = _env_int("WRITE_BEHIND_FLUSH_INTERVAL_MS", 500) or 500
+WRITE_BEHIND_MAX_BATCH = _env_int("WRITE_BEHIND_MAX_BATCH", 200) or 200
+
+# Twisted thread pools (app.py) and the DB connection pool sized to them:
+# every pool thread can hold at most one connection at a time, so the
+# default pool covers both pools without threads queueing for a connection.
+WSGI_POOL_MIN = _env_int("WSGI_POOL_MIN", 4) or 4
+WSGI_POOL_MAX = _env_int("WSGI_POOL_MAX", 20) or 20
+BLOCKING_POOL_MIN = _env_int("BLOCKING_POOL_MIN", 2) or 2
+BLOCKING_POOL_MAX = _env_int("BLOCKING_POOL_MAX", 12) or 12
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", WSGI_POOL_MAX + BLOCKING_POOL_MAX) or WSGI_POOL_MAX + BLOCKING_POOL_MAX
+# Spare connections for the reactor thread and one-off scripts.
+DB_POOL_MAX_OVERFLOW = _env_int("DB_POOL_MAX_OVERFLOW", 4)
+DB_POOL_TIMEOUT_SECONDS = _env_float("DB_POOL_TIMEOUT_SECONDS", 10.0)
+DB_POOL_RECYCLE_SECONDS = _env_int("DB_POOL_RECYCLE_SECONDS", 1800)
+
+# Archival (signal_archive.py): resolved signal_outcomes / binomo_trades /
+# auto_trades rows older than the retention window are moved once a day to
+# monthly CSV.gz files. Rollups keep their counts. 0 disables the job.
+# SIGNAL_ARCHIVE_DIR defaults to archive/ next to a SQLite database file
+# (the Fly volume), otherwise data/archive/ in the app directory.
+SIGNAL_ARCHIVE_RETENTION_DAYS = _env_int("SIGNAL_ARCHIVE_RETENTION_DAYS", 90)
+SIGNAL_ARCHIVE_DIR = _env_str("SIGNAL_ARCHIVE_DIR")
+
+# AppRuntimeSetting rows (Binomo kill switch, scanner state, cTrader
+# tokens) are cached in memory; the shared version row is re-checked at
+# most this often. Writes from the same process are visible immediately.
+RUNTIME_SETTINGS_MAX_AGE_SECONDS = _env_float("RUNTIME_SETTINGS_MAX_AGE_SECONDS", 1.0)
+
+# Per-user LRU caches in db.py (watchlist, language/timezone). Bounded so a
+# burst of one-off Web App users can't grow memory without limit.
+USER_CACHE_MAX_ENTRIES = _env_int("USER_CACHE_MAX_ENTRIES", 5000) or 5000
+
 # Signal outcome tracking (Part 1, legacy TP/SL fields — kept only so old
 # rows/paths don't break; no longer used to size new tracking).
 SIGNAL_TP_ATR_MULTIPLIER = _env_float("SIGNAL_TP_ATR_MULTIPLIER", 1.5)
@@ -298,10 +369,6 @@ SYMBOL_ALIASES = {
 }
 
 
-def broker_symbol_key(value: str) -> str:
-    requested = normalize_symbol_key(value)
-    return SYMBOL_ALIASES.get(requested, requested)
-
 TRADING_HOURS = {
     "Європейська": "🇪🇺 (10:00 - 19:00)",
     "Американська": "🇺🇸 (15:00 - 00:00)",
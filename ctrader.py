@@ -1,92 +1,93 @@
 # ctrader.py
 import logging
 import re
+import threading
 import time
 
-from twisted.internet import reactor
+from twisted.internet import defer, reactor
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadable import isInIOThread
 
 from config import (
     COMMODITIES,
     CRYPTO_PAIRS,
+    CTRADER_HOT_STANDBY,
+    CTRADER_RECORD_PATH,
+    CTRADER_REPLAY_PATH,
+    CTRADER_REPLAY_SPEED,
+    CTRADER_SPOT_BATCHING,
+    CTRADER_SYMBOL_SNAPSHOT,
     FOREX_SESSIONS,
     STOCK_TICKERS,
-    broker_symbol_key,
     get_ct_client_id,
     get_ct_client_secret,
+    get_demo_account_id,
 )
 from ctrader_open_api.messages.OpenApiMessages_pb2 import (
     ProtoOASpotEvent,
     ProtoOASubscribeSpotsReq,
+    ProtoOASymbolByIdRes,
     ProtoOASymbolsListRes,
+    ProtoOAUnsubscribeSpotsReq,
 )
+from ctrader_open_api.protobuf import Protobuf
+from ctrader_replay import FrameRecorder, ReplayClient
+import db
 from notifier import notify_admin
-from price_utils import resolve_price_divisor
+from spot_subscriptions import SpotSubscriptionManager
 from spotware_connect import SpotwareConnect
 from state import app_state
+import symbol_snapshot
+from symbol_registry import MISSING, SymbolRegistry
 
 logger = logging.getLogger("ctrader")
 
 _reconnect_attempt = 0
 _reconnect_scheduled = False
 _SUBSCRIBE_BATCH_SIZE = 50
-_SUBSCRIBE_BATCH_DELAY = 1.0
+_DEMAND_REFRESH_DELAY = 1.0
+# Пара, що випала з попиту, лишається підписаною ще стільки секунд.
+_UNSUBSCRIBE_GRACE_SECONDS = 300
+# Разовий запит ціни (ручний аналіз, /api/live_price) тримає пару в попиті стільки секунд.
+_ON_DEMAND_TTL_SECONDS = 600
+_MAX_ON_DEMAND_PAIRS = 200
 _PRICE_FRESH_SECONDS = 120
 _PRICE_START_GRACE_SECONDS = 60
 _PRICE_RECOVERY_COOLDOWN_SECONDS = 120
 _PRICE_RESUBSCRIBE_ATTEMPTS_BEFORE_RECONNECT = 1
+# Резервне з'єднання піднімається через стільки секунд після готовності основного.
+_STANDBY_START_DELAY = 10.0
+_STANDBY_RETRY_SECONDS = 60.0
+_RATE_LIMIT_REASONS = {"RATE_LIMIT_BLOCKED", "REQUEST_FREQUENCY_EXCEEDED"}
 
 _symbols_loaded_at = 0.0
 _last_subscription_request_ts = 0.0
 _last_price_recovery_ts = 0.0
 _price_recovery_attempts = 0
 _last_spot_event_ts = 0.0
+_demand_refresh_scheduled = False
+_demand_refresh_inflight = False
+_demand_refresh_again = False
+# pair -> expires_at; пишуть WSGI- та пул-потоки.
+_on_demand_pairs: dict[str, float] = {}
+_on_demand_lock = threading.Lock()
+_standby_client = None
+_failover_count = 0
+_last_failover_ts = 0.0
+# "snapshot" поки живий список ще не прийшов, далі "server".
+_symbols_source = None
+_frame_recorder = None
+_SYMBOLS_RETRY_SECONDS = 60
 
 
 def _compact_symbol(value: str) -> str:
     return re.sub(r"[^A-Z0-9]", "", (value or "").upper())
 
 
-def _display_symbol_name(symbol) -> str:
-    return getattr(symbol, "symbolName", "") or str(getattr(symbol, "symbolId", "unknown"))
-
-
 def _requested_pair_key(pair: str) -> str:
     return _compact_symbol(pair)
 
 
-def _broker_pair_keys(pair: str) -> list[str]:
-    requested = _requested_pair_key(pair)
-    broker_key = broker_symbol_key(pair)
-    keys = []
-
-    for key in (requested, broker_key):
-        if key and key not in keys:
-            keys.append(key)
-
-    return keys
-
-
-def _symbol_cache_keys(symbol) -> set[str]:
-    raw_name = _display_symbol_name(symbol)
-    no_slash = raw_name.replace("/", "").upper().strip()
-    compact = _compact_symbol(raw_name)
-    return {key for key in (no_slash, compact) if key}
-
-
-def _unique_symbols_from_cache() -> list:
-    seen = set()
-    symbols = []
-
-    for symbol in app_state.symbol_cache.values():
-        symbol_id = getattr(symbol, "symbolId", None)
-        if symbol_id in seen:
-            continue
-        seen.add(symbol_id)
-        symbols.append(symbol)
-
-    return symbols
-
-
 def _collect_configured_assets() -> list[str]:
     assets = []
 
@@ -112,32 +113,53 @@ def _collect_configured_assets() -> list[str]:
 
 
 def _resolve_broker_symbol(pair: str):
-    requested_keys = _broker_pair_keys(pair)
-    if not requested_keys:
+    return app_state.symbol_registry.resolve(pair)
+
+
+def _pair_name(symbol_id) -> str:
+    return app_state.symbol_registry.name_of_id(symbol_id, str(symbol_id))
+
+
+def _get_frame_recorder():
+    """One recording per process: reconnects and a promoted standby keep
+    appending to it, so a replay sees the same gaps as the live bot did."""
+    global _frame_recorder
+
+    if not CTRADER_RECORD_PATH or CTRADER_REPLAY_PATH:
         return None
+    if _frame_recorder is None:
+        try:
+            _frame_recorder = FrameRecorder(CTRADER_RECORD_PATH)
+        except Exception:
+            logger.exception("Failed to open cTrader frame recording %s", CTRADER_RECORD_PATH)
+            return None
+        reactor.addSystemEventTrigger("before", "shutdown", _frame_recorder.close)
+        logger.warning("Вхідний потік cTrader записується у %s", CTRADER_RECORD_PATH)
+    return _frame_recorder
 
-    for key in requested_keys:
-        exact = app_state.symbol_cache.get(key)
-        if exact is not None:
-            return exact
 
-    candidates = []
-    for symbol in _unique_symbols_from_cache():
-        keys = _symbol_cache_keys(symbol)
-        if any(requested in keys for requested in requested_keys):
-            return symbol
+def _session_transport() -> dict:
+    if CTRADER_REPLAY_PATH:
+        replay = ReplayClient(CTRADER_REPLAY_PATH, speed=CTRADER_REPLAY_SPEED)
+        logger.warning("cTrader працює з запису %s (швидкість %s), не з сервера.", CTRADER_REPLAY_PATH, CTRADER_REPLAY_SPEED)
+        return {"client_factory": lambda host, port: replay}
+    return {"recorder": _get_frame_recorder()}
 
-        for key in keys:
-            for requested in requested_keys:
-                if key.startswith(requested):
-                    candidates.append((len(key), _display_symbol_name(symbol), symbol))
-                    break
 
-    if candidates:
-        candidates.sort(key=lambda item: (item[0], item[1]))
-        return candidates[0][2]
+def _wire_session(client):
+    client.on("ready", on_ctrader_ready)
+    if CTRADER_SPOT_BATCHING:
+        client.on_batch("spot_event", _on_spot_events)
+    else:
+        client.on("spot_event", _on_spot_event)
+    client.on("error", _handle_error)
 
-    return None
+    try:
+        import autotrader
+
+        client.on("execution_event", autotrader.handle_execution_event)
+    except Exception:
+        logger.exception("Failed to wire autotrader execution event handler")
 
 
 def start_ctrader_client():
@@ -145,20 +167,14 @@ def start_ctrader_client():
 
     _reconnect_scheduled = False
 
+    if not app_state.SYMBOLS_LOADED:
+        # Лише холодний старт: при перепідключенні символи лишаються в пам'яті.
+        _load_symbol_snapshot()
+
     try:
-        client = SpotwareConnect(get_ct_client_id(), get_ct_client_secret())
+        client = SpotwareConnect(get_ct_client_id(), get_ct_client_secret(), **_session_transport())
         app_state.client = client
-
-        client.on("ready", on_ctrader_ready)
-        client.on("spot_event", _on_spot_event)
-        client.on("error", _handle_error)
-
-        try:
-            import autotrader
-
-            client.on("execution_event", autotrader.handle_execution_event)
-        except Exception:
-            logger.exception("Failed to wire autotrader execution event handler")
+        _wire_session(client)
 
         client.start()
         logger.info("cTrader client started")
@@ -170,10 +186,95 @@ def start_ctrader_client():
         return None
 
 
+def _start_standby():
+    global _standby_client
+
+    if not CTRADER_HOT_STANDBY or CTRADER_REPLAY_PATH or _standby_client is not None or _reconnect_scheduled:
+        return
+
+    primary = app_state.client
+    if primary is None or not primary.is_authorized:
+        return
+
+    try:
+        standby = SpotwareConnect(
+            get_ct_client_id(),
+            get_ct_client_secret(),
+            host_index=primary.host_index + 1,
+            standby=True,
+            recorder=_get_frame_recorder(),
+        )
+    except Exception:
+        logger.exception("Failed to initialize standby cTrader client")
+        return
+
+    standby.on("error", lambda reason: _on_standby_error(standby, reason))
+    _standby_client = standby
+    standby.start()
+    logger.info("Резервне з'єднання cTrader: %s:%s", standby.host, standby.port)
+
+
+def _stop_standby():
+    global _standby_client
+
+    standby, _standby_client = _standby_client, None
+    if standby is None:
+        return
+    try:
+        standby.stop()
+    except Exception:
+        logger.exception("Failed to stop standby cTrader client")
+
+
+def _on_standby_error(standby, reason):
+    if standby is not _standby_client:
+        # Уже промотоване або замінене з'єднання — його помилки обробляє _handle_error.
+        return
+
+    delay = 180 if reason in _RATE_LIMIT_REASONS else _STANDBY_RETRY_SECONDS
+    logger.warning("Резервне з'єднання cTrader (%s) недоступне: %s. Повтор за %ss.", standby.host, reason, delay)
+    _stop_standby()
+    reactor.callLater(delay, _start_standby)
+
+
+def _failover_to_standby() -> bool:
+    """Promote the warm standby in place of a failed primary. Symbol
+    metadata and live prices stay; only the spot subscriptions are redone
+    once the account is authorized on the new socket."""
+    global _standby_client, _failover_count, _last_failover_ts
+
+    standby = _standby_client
+    if standby is None or not standby.app_authorized:
+        return False
+
+    _standby_client = None
+    old = app_state.client
+    logger.warning(
+        "Перемикаю cTrader на резервне з'єднання %s:%s без повного перезапуску.",
+        standby.host,
+        standby.port,
+    )
+
+    if old is not None:
+        try:
+            old.stop()
+        except Exception:
+            logger.exception("Failed to stop cTrader client before failover")
+
+    _wire_session(standby)
+    app_state.client = standby
+    _subscriptions.reset()
+    _failover_count += 1
+    _last_failover_ts = time.time()
+    standby.promote()
+    return True
+
+
 def _handle_error(reason):
     logger.error("cTrader error handler: %s", reason)
 
-    if reason in {"RATE_LIMIT_BLOCKED", "REQUEST_FREQUENCY_EXCEEDED"}:
+    rate_limited = reason in _RATE_LIMIT_REASONS
+    if rate_limited:
         try:
             from scanner import pause_scanning_for_rate_limit
 
@@ -181,16 +282,20 @@ def _handle_error(reason):
         except Exception:
             logger.exception("Failed to pause scanner after rate limit event")
 
-    delay = 180 if reason in {"RATE_LIMIT_BLOCKED", "REQUEST_FREQUENCY_EXCEEDED"} else 30
-    _schedule_reconnect(delay)
+    delay = 180 if rate_limited else 30
+    # Rate limit — питання частоти запитів, інше з'єднання тут не допоможе.
+    _schedule_reconnect(delay, failover=not rate_limited)
 
 
-def _schedule_reconnect(delay):
+def _schedule_reconnect(delay, failover=True):
     global _reconnect_scheduled, _reconnect_attempt
 
     if _reconnect_scheduled:
         return
 
+    if failover and _failover_to_standby():
+        return
+
     _reconnect_scheduled = True
     _reconnect_attempt += 1
 
@@ -199,7 +304,7 @@ def _schedule_reconnect(delay):
 
 
 def _do_reconnect():
-    global _last_spot_event_ts
+    global _last_spot_event_ts, _symbols_source
 
     if app_state.client:
         try:
@@ -207,8 +312,16 @@ def _do_reconnect():
         except Exception:
             logger.exception("Failed to stop cTrader client before reconnect")
 
-    app_state.clear_symbol_state()
+    _stop_standby()
+    if CTRADER_SYMBOL_SNAPSHOT and app_state.SYMBOLS_LOADED:
+        # Знімок на диску — це той самий список, що вже в пам'яті: не читаємо
+        # і не перебудовуємо його на реакторі, лише звіримо після авторизації.
+        _symbols_source = "snapshot"
+    else:
+        app_state.clear_symbol_state()
+        _symbols_source = None
     app_state.clear_live_prices()
+    _subscriptions.reset()
     _last_spot_event_ts = 0.0
     start_ctrader_client()
 
@@ -217,8 +330,31 @@ def on_ctrader_ready():
     global _reconnect_attempt
 
     _reconnect_attempt = 0
-    logger.info("cTrader account authorized. Loading symbols...")
-    reactor.callLater(1.0, _request_symbols)
+    if app_state.SYMBOLS_LOADED:
+        # Символи вже є: після перемикання на резервне з'єднання або зі
+        # знімка — лишається тільки повторити підписки на новому сокеті.
+        logger.info("cTrader account authorized. Symbols kept (%s), resubscribing prices...", _symbols_source)
+        start_price_subscriptions()
+        if _symbols_source == "snapshot":
+            reactor.callLater(1.0, _request_symbols)
+    else:
+        logger.info("cTrader account authorized. Loading symbols...")
+        reactor.callLater(1.0, _request_symbols)
+
+    if CTRADER_HOT_STANDBY:
+        reactor.callLater(_STANDBY_START_DELAY, _start_standby)
+
+
+def _standby_status() -> dict | None:
+    if not CTRADER_HOT_STANDBY:
+        return None
+    standby = _standby_client
+    return {
+        "host": standby.host if standby else None,
+        "ready": bool(standby and standby.app_authorized),
+        "failovers": _failover_count,
+        "last_failover_age": int(time.time() - _last_failover_ts) if _last_failover_ts else None,
+    }
 
 
 def _request_symbols():
@@ -239,56 +375,148 @@ def _request_symbols():
 
 def _on_symbols_error(failure):
     logger.error("Symbols error: %s", failure.getErrorMessage())
+    if _symbols_source == "snapshot" and app_state.SYMBOLS_LOADED:
+        # Працюємо зі знімка — звіримо пізніше, без перезапуску з'єднання.
+        reactor.callLater(_SYMBOLS_RETRY_SECONDS, _request_symbols)
+        return None
     _schedule_reconnect(30)
     return None
 
 
-def _on_symbols_loaded(msg):
-    global _symbols_loaded_at
+def _apply_symbol_list(symbols, source: str) -> int:
+    global _symbols_loaded_at, _symbols_source
 
-    try:
-        res = ProtoOASymbolsListRes()
-        res.ParseFromString(msg.payload)
+    registry = SymbolRegistry(symbols, details=app_state.symbol_details)
 
-        symbol_cache = {}
-        symbol_id_map = {}
-        all_names = []
+    with app_state._state_lock:
+        app_state.symbol_registry = registry
+        app_state.all_symbol_names = registry.all_names()
+        app_state.SYMBOLS_LOADED = True
+    app_state.live_prices.reserve(len(registry))
 
-        for symbol in res.symbol:
-            display_name = _display_symbol_name(symbol)
-            keys = _symbol_cache_keys(symbol)
+    _symbols_loaded_at = time.time()
+    _symbols_source = source
+    return registry.key_count
 
-            for key in keys:
-                symbol_cache[key] = symbol
 
-            canonical = _compact_symbol(display_name)
-            if canonical:
-                symbol_id_map[symbol.symbolId] = canonical
-                all_names.append(canonical)
+def _load_symbol_snapshot() -> bool:
+    if not CTRADER_SYMBOL_SNAPSHOT:
+        return False
 
-        with app_state._state_lock:
-            app_state.symbol_cache = symbol_cache
-            app_state.symbol_id_map = symbol_id_map
-            app_state.all_symbol_names = sorted(all_names)
-            app_state.SYMBOLS_LOADED = True
+    try:
+        snapshot = symbol_snapshot.load(get_demo_account_id())
+    except Exception:
+        logger.exception("Failed to load cTrader symbol snapshot")
+        return False
+    if not snapshot or not snapshot["symbols"]:
+        return False
+
+    with app_state._state_lock:
+        app_state.symbol_details = dict(snapshot["details"])
+    keys = _apply_symbol_list(snapshot["symbols"], "snapshot")
+
+    age = int(time.time() - snapshot["saved_at"]) if snapshot.get("saved_at") else None
+    logger.info(
+        "Символи cTrader зі знімка: %s (%s ключів пошуку, вік %ss). Живий список звіримо після авторизації.",
+        len(snapshot["symbols"]),
+        keys,
+        age,
+    )
+    return True
 
-        _symbols_loaded_at = time.time()
+
+def _on_symbols_loaded(msg):
+    try:
+        res = Protobuf.extract(msg, ProtoOASymbolsListRes)
+        reconciling = _symbols_source == "snapshot"
+        if reconciling:
+            known = set(app_state.symbol_registry.symbol_ids)
+            live = {symbol.symbolId for symbol in res.symbol}
+
+        keys = _apply_symbol_list(res.symbol, "server")
 
         logger.info(
             "Завантажено %s символів cTrader (%s ключів пошуку). Пари готові.",
             len(res.symbol),
-            len(symbol_cache),
+            keys,
         )
-        start_price_subscriptions()
+        if reconciling:
+            logger.info("Знімок символів звірено: +%s / -%s.", len(live - known), len(known - live))
+
+        # Після знімка підписки вже стоять — досить доповнити різницю.
+        start_price_subscriptions(reset=not reconciling)
+        _refresh_symbol_details(list(res.symbol))
 
     except Exception:
         logger.exception("Error parsing symbols")
         _schedule_reconnect(30)
 
 
-def start_price_subscriptions():
-    global _last_subscription_request_ts
+def _refresh_symbol_details(symbols):
+    """ProtoOASymbolByIdReq for the configured symbols, then a new
+    snapshot. Only these carry volume limits for the autotrader."""
+    if not app_state.client:
+        return None
+
+    symbol_ids = []
+    for pair in _collect_configured_assets():
+        symbol = _resolve_broker_symbol(pair)
+        if symbol is not None and symbol.symbolId not in symbol_ids:
+            symbol_ids.append(symbol.symbolId)
+
+    requests = []
+    for i in range(0, len(symbol_ids), _SUBSCRIBE_BATCH_SIZE):
+        d = app_state.client.get_symbols_by_id(symbol_ids[i : i + _SUBSCRIBE_BATCH_SIZE])
+        d.addCallback(_on_symbol_details)
+        requests.append(d)
+
+    done = defer.DeferredList(requests, consumeErrors=True)
+    done.addCallback(_log_symbol_detail_errors)
+    done.addCallback(lambda _: _save_symbol_snapshot(symbols))
+    return done
+
+
+def _on_symbol_details(msg) -> int:
+    res = Protobuf.extract(msg, ProtoOASymbolByIdRes)
+    details = {symbol.symbolId: symbol_snapshot.symbol_details(symbol) for symbol in res.symbol}
+    with app_state._state_lock:
+        app_state.symbol_details = {**app_state.symbol_details, **details}
+    app_state.symbol_registry.set_details(details)
+    return len(details)
+
+
+def _log_symbol_detail_errors(results):
+    for ok, value in results:
+        if not ok:
+            logger.warning("Деталі символів cTrader не отримано: %s", value.getErrorMessage())
+    return results
+
+
+def _save_symbol_snapshot(symbols):
+    if not CTRADER_SYMBOL_SNAPSHOT:
+        return None
+
+    account_id = _account_id()
+    if not account_id:
+        return None
+
+    details = dict(app_state.symbol_details)
+    pool = app_state.blocking_pool or reactor.getThreadPool()
+    d = deferToThreadPool(reactor, pool, symbol_snapshot.save, account_id, symbols, details)
+    d.addCallback(lambda path: logger.info("Знімок символів cTrader збережено: %s (%s символів)", path, len(symbols)))
+    d.addErrback(lambda failure: logger.warning("Не вдалося зберегти знімок символів cTrader: %s", failure.getErrorMessage()))
+    return d
+
+
+def get_symbol_details(symbol_id) -> dict:
+    return app_state.symbol_details.get(symbol_id) or {}
+
 
+def start_price_subscriptions(reset: bool = True):
+    """Fresh symbol list (new connection): maps every configured asset to
+    its broker symbol and subscribes whatever is currently in demand.
+    reset=False keeps the subscriptions of this connection and only sends
+    the difference (live list replacing the snapshot)."""
     if not app_state.SYMBOLS_LOADED:
         logger.info("Символи ще не завантажені. Підписку на ціни пропущено.")
         return
@@ -302,14 +530,15 @@ def start_price_subscriptions():
     resolved = []
     missing = []
 
+    registry = app_state.symbol_registry
     for pair in assets:
-        symbol = _resolve_broker_symbol(pair)
-        if symbol is None:
+        index = registry.index(pair)
+        if index == MISSING:
             logger.warning("Не зміг підписатися на пару %s, бо її немає в списку брокера", pair)
             missing.append(pair)
             continue
 
-        resolved.append((pair, symbol))
+        resolved.append((pair, index))
 
     if not resolved:
         logger.warning(
@@ -318,85 +547,222 @@ def start_price_subscriptions():
         )
         return
 
-    with app_state._state_lock:
-        for pair, symbol in resolved:
-            app_state.symbol_cache[pair] = symbol
-            app_state.symbol_id_map[symbol.symbolId] = pair
+    for pair, index in resolved:
+        registry.bind(pair, index)
 
     logger.info(
-        "Підписуюся на ціни: знайдено %s з %s активів, не знайдено %s.",
+        "Символи для цін: знайдено %s з %s активів, не знайдено %s. Підписка — за попитом.",
         len(resolved),
         len(assets),
         len(missing),
     )
 
-    _last_subscription_request_ts = time.time()
+    if reset:
+        _subscriptions.reset()
+    refresh_price_subscriptions()
 
-    for i in range(0, len(resolved), _SUBSCRIBE_BATCH_SIZE):
-        batch = resolved[i : i + _SUBSCRIBE_BATCH_SIZE]
-        reactor.callLater(
-            (i // _SUBSCRIBE_BATCH_SIZE) * _SUBSCRIBE_BATCH_DELAY,
-            _subscribe_symbol_batch,
-            batch,
-        )
 
+def _web_app_price_demand() -> list[str]:
+    """Pairs the open Web App price streams need. A stream opened without
+    ?pairs= shows the whole pair list, i.e. every configured asset."""
+    listeners = app_state.sse_listeners("price")
+    pairs = set()
+    for listener in listeners:
+        wanted = getattr(listener, "pairs", None)
+        if not wanted:
+            return _collect_configured_assets()
+        pairs.update(wanted)
+    return sorted(pairs)
 
-def _subscribe_symbol_batch(batch):
-    if not app_state.client:
-        logger.warning("cTrader client не готовий. Батч підписки пропущено.")
+
+def collect_price_demand() -> dict[str, list[str]]:
+    """Who needs a live price right now, by source. Reads the DB — call it
+    from a pool thread."""
+    from scanner import get_scan_universe
+
+    return {
+        # Одна цілодобова пара, щоб контроль цін міг відрізнити мертвий
+        # потік від закритого ринку (вихідні, коли в попиті лише Forex).
+        "canary": list(CRYPTO_PAIRS[:1]),
+        "scanner": get_scan_universe(),
+        "web_app": _web_app_price_demand(),
+        "autotrades": db.get_open_auto_trade_pairs(),
+        "signal_outcomes": db.get_pending_signal_outcome_pairs(),
+        "on_demand": _on_demand_price_pairs(),
+    }
+
+
+def register_price_demand(pairs, ttl: float = _ON_DEMAND_TTL_SECONDS) -> None:
+    """A one-off consumer (manual analysis, /api/live_price) needs prices for
+    `pairs`: keep them subscribed for `ttl` seconds. A pair that wasn't in
+    this demand yet triggers a subscription refresh. Any thread."""
+    now = time.time()
+    registry = app_state.symbol_registry
+    added = False
+
+    with _on_demand_lock:
+        for pair in pairs or ():
+            key = _requested_pair_key(pair)
+            if not key or (app_state.SYMBOLS_LOADED and registry.index(key) == MISSING):
+                continue
+            if _on_demand_pairs.get(key, 0.0) <= now:
+                if key not in _on_demand_pairs and len(_on_demand_pairs) >= _MAX_ON_DEMAND_PAIRS:
+                    _prune_on_demand(now)
+                    if len(_on_demand_pairs) >= _MAX_ON_DEMAND_PAIRS:
+                        continue
+                added = True
+            _on_demand_pairs[key] = now + ttl
+
+    if added:
+        if isInIOThread():
+            request_price_demand_refresh()
+        else:
+            reactor.callFromThread(request_price_demand_refresh)
+
+
+def _prune_on_demand(now: float) -> None:
+    for key in [key for key, expires_at in _on_demand_pairs.items() if expires_at <= now]:
+        del _on_demand_pairs[key]
+
+
+def _on_demand_price_pairs() -> list[str]:
+    with _on_demand_lock:
+        _prune_on_demand(time.time())
+        return sorted(_on_demand_pairs)
+
+
+def request_price_demand_refresh():
+    """Debounced refresh after a demand change (scanner toggle, new Web App
+    stream, on-demand price request). Reactor thread only."""
+    global _demand_refresh_scheduled
+
+    if _demand_refresh_scheduled:
         return
+    _demand_refresh_scheduled = True
+
+    def _run():
+        global _demand_refresh_scheduled
+        _demand_refresh_scheduled = False
+        refresh_price_subscriptions()
+
+    reactor.callLater(_DEMAND_REFRESH_DELAY, _run)
+
+
+def refresh_price_subscriptions():
+    global _demand_refresh_inflight, _demand_refresh_again
 
-    if not batch:
+    if not app_state.SYMBOLS_LOADED or not _account_id():
         return
 
-    account_id = getattr(app_state.client._client, "account_id", None)
-    if not account_id:
-        logger.warning("Акаунт cTrader не готовий. Не можу підписатися на ціни.")
+    if _demand_refresh_inflight:
+        _demand_refresh_again = True
         return
+    _demand_refresh_inflight = True
 
-    symbol_ids = []
-    pairs = []
+    def _done(result):
+        global _demand_refresh_inflight, _demand_refresh_again
+        _demand_refresh_inflight = False
+        if _demand_refresh_again:
+            _demand_refresh_again = False
+            refresh_price_subscriptions()
+        return result
 
-    for pair, symbol in batch:
-        symbol_id = getattr(symbol, "symbolId", None)
-        if symbol_id is None:
-            logger.warning("Не зміг підписатися на пару %s, бо її немає в списку брокера", pair)
-            continue
+    pool = app_state.blocking_pool or reactor.getThreadPool()
+    d = deferToThreadPool(reactor, pool, collect_price_demand)
+    d.addCallback(_apply_price_demand)
+    d.addErrback(lambda failure: logger.error("Не вдалося зібрати попит на ціни: %s", failure.getErrorMessage()))
+    d.addBoth(_done)
+    return d
 
-        symbol_ids.append(symbol_id)
-        pairs.append(f"{pair}->{_display_symbol_name(symbol)}")
 
-    if not symbol_ids:
-        return
+def _apply_price_demand(demand: dict[str, list[str]]) -> dict:
+    global _last_subscription_request_ts
 
-    try:
-        req = ProtoOASubscribeSpotsReq(
-            ctidTraderAccountId=account_id,
-            symbolId=symbol_ids,
-        )
-        app_state.client.send(req, responseTimeoutInSeconds=10)
-        logger.info("Підписка на ціни надіслана для %s символів: %s", len(symbol_ids), ", ".join(pairs))
+    registry = app_state.symbol_registry
+    desired = {}
+    for pairs in demand.values():
+        for pair in pairs:
+            key = _requested_pair_key(pair)
+            if not key or key in desired:
+                continue
+            index = registry.index(key)
+            if index == MISSING:
+                continue
+            desired[key] = registry.symbol_ids[index]
+
+    result = _subscriptions.reconcile(desired, demand)
+    if result["subscribed"]:
+        _last_subscription_request_ts = time.time()
+    for pair in result["unsubscribed"]:
+        app_state.drop_live_price(pair)
+    return result
+
+
+def _account_id():
+    return getattr(getattr(app_state.client, "_client", None), "account_id", None)
+
+
+def _send_spot_request(req_cls, symbol_ids: list[int], action: str):
+    client = app_state.client
+    account_id = _account_id()
+    if not client or not account_id:
+        logger.warning("Акаунт cTrader не готовий. %s пропущено.", action)
+        return None
+
+    pairs = [_pair_name(symbol_id) for symbol_id in symbol_ids]
+    req = req_cls(ctidTraderAccountId=account_id, symbolId=symbol_ids)
+    d = client.send(req, responseTimeoutInSeconds=10)
+    d.addErrback(lambda failure: logger.warning("%s не підтверджено (%s): %s", action, failure.getErrorMessage(), ", ".join(pairs)))
+    logger.info("%s надіслано для %s символів: %s", action, len(symbol_ids), ", ".join(pairs))
+    return d
+
+
+def _send_subscribe_spots(symbol_ids: list[int]):
+    return _send_spot_request(ProtoOASubscribeSpotsReq, symbol_ids, "Підписку на ціни")
+
+
+def _send_unsubscribe_spots(symbol_ids: list[int]):
+    return _send_spot_request(ProtoOAUnsubscribeSpotsReq, symbol_ids, "Відписку від цін")
+
+
+_subscriptions = SpotSubscriptionManager(
+    _send_subscribe_spots,
+    _send_unsubscribe_spots,
+    batch_size=_SUBSCRIBE_BATCH_SIZE,
+    unsubscribe_grace=_UNSUBSCRIBE_GRACE_SECONDS,
+    resubscribe_backoff=_PRICE_RECOVERY_COOLDOWN_SECONDS,
+)
 
+
+def _send_queue_stats():
+    client = app_state.client
+    stats_method = getattr(client, "get_send_queue_stats", None)
+    if not callable(stats_method):
+        return None
+    try:
+        return stats_method()
     except Exception:
-        logger.exception("Не вдалося надіслати батч підписки на ціни: %s", ", ".join(pairs))
+        logger.exception("Не вдалося отримати статистику черги відправки cTrader")
+        return None
 
 
 def _price_stream_snapshot() -> dict:
     now = time.time()
     assets = _collect_configured_assets()
-    prices = app_state.get_live_prices_snapshot()
+    tracked = sorted(_subscriptions.subscribed_pairs())
+    price_ts = app_state.get_live_price_timestamps()
 
     fresh = []
     stale = {}
     missing = []
 
-    for pair in assets:
-        price = prices.get(pair)
-        if not price:
+    for pair in tracked:
+        ts = price_ts.get(pair)
+        if ts is None:
             missing.append(pair)
             continue
 
-        age = max(0, int(now - price.get("ts", 0)))
+        age = max(0, int(now - ts))
         if age <= _PRICE_FRESH_SECONDS:
             fresh.append(pair)
         else:
@@ -404,7 +770,8 @@ def _price_stream_snapshot() -> dict:
 
     return {
         "configured": len(assets),
-        "live": len(prices),
+        "subscribed": len(tracked),
+        "live": len(price_ts),
         "fresh": len(fresh),
         "missing": missing,
         "stale": stale,
@@ -415,17 +782,24 @@ def _price_stream_snapshot() -> dict:
             else None
         ),
         "recovery_attempts": _price_recovery_attempts,
+        "subscriptions": _subscriptions.stats(),
+        "standby": _standby_status(),
+        "symbols_source": _symbols_source,
+        "send_queue": _send_queue_stats(),
+        "dispatch": dict(getattr(app_state.client, "dispatch_stats", None) or {}),
     }
 
 
 def get_price_stream_status() -> dict:
     snapshot = _price_stream_snapshot()
-    ok = bool(app_state.SYMBOLS_LOADED and snapshot["fresh"] > 0)
+    ok = bool(app_state.SYMBOLS_LOADED and (snapshot["fresh"] > 0 or not snapshot["subscribed"]))
 
     if not app_state.SYMBOLS_LOADED:
         label = "символи ще не завантажені"
+    elif not snapshot["subscribed"]:
+        label = "немає попиту на ціни"
     elif snapshot["fresh"] > 0:
-        label = f"є свіжі ціни: {snapshot['fresh']} з {snapshot['configured']}"
+        label = f"є свіжі ціни: {snapshot['fresh']} з {snapshot['subscribed']}"
     elif snapshot["live"] > 0:
         label = "потік цін давно не оновлювався"
     else:
@@ -448,12 +822,14 @@ def monitor_price_stream_health():
         return
 
     client = app_state.client
-    account_id = getattr(getattr(client, "_client", None), "account_id", None)
-    if not client or not account_id:
+    if not client or not _account_id():
         return
 
-    assets = _collect_configured_assets()
-    if not assets:
+    refresh_price_subscriptions()
+
+    subscribed = _subscriptions.subscribed_pairs()
+    if not subscribed:
+        _price_recovery_attempts = 0
         return
 
     now = time.time()
@@ -464,6 +840,19 @@ def monitor_price_stream_health():
         if _price_recovery_attempts:
             logger.info("Потік цін відновився. Свіжих цін: %s.", snapshot["fresh"])
         _price_recovery_attempts = 0
+
+        stale_ids = _subscriptions.stale_symbols(
+            app_state.get_live_price_timestamps(),
+            _PRICE_FRESH_SECONDS,
+            _PRICE_START_GRACE_SECONDS,
+        )
+        if stale_ids:
+            logger.info(
+                "Контроль цін: точкова повторна підписка для %s символів: %s",
+                len(stale_ids),
+                ", ".join(_pair_name(symbol_id) for symbol_id in stale_ids),
+            )
+            _subscriptions.resubscribe(stale_ids)
         return
 
     if last_start and now - last_start < _PRICE_START_GRACE_SECONDS:
@@ -476,8 +865,8 @@ def monitor_price_stream_health():
     _price_recovery_attempts += 1
 
     logger.warning(
-        "Контроль цін: немає свіжих цін. Активів=%s, live=%s, застарілих=%s, пропущених=%s, спроба=%s.",
-        snapshot["configured"],
+        "Контроль цін: немає свіжих цін. Підписано=%s, live=%s, застарілих=%s, пропущених=%s, спроба=%s.",
+        snapshot["subscribed"],
         snapshot["live"],
         len(snapshot["stale"]),
         len(snapshot["missing"]),
@@ -485,8 +874,8 @@ def monitor_price_stream_health():
     )
 
     if _price_recovery_attempts <= _PRICE_RESUBSCRIBE_ATTEMPTS_BEFORE_RECONNECT:
-        logger.warning("Контроль цін: повторно надсилаю підписку на ціни.")
-        start_price_subscriptions()
+        logger.warning("Контроль цін: повторно надсилаю підписку на підписані символи.")
+        _subscriptions.resubscribe(list(subscribed.values()))
         return
 
     logger.warning("Контроль цін: повторна підписка не допомогла, перезапускаю cTrader.")
@@ -494,30 +883,49 @@ def monitor_price_stream_health():
     _schedule_reconnect(5)
 
 
-def _value_from_event(event: ProtoOASpotEvent, field: str, divisor: float):
-    if event.HasField(field):
-        return getattr(event, field) / divisor
-    return None
+def _raw_quote(event: ProtoOASpotEvent, field: str):
+    return getattr(event, field) if event.HasField(field) else None
 
 
 def _on_spot_event(event: ProtoOASpotEvent):
-    global _last_spot_event_ts
-
     if not (event.HasField("bid") or event.HasField("ask")):
         return
+    _publish_spot(event.symbolId, _raw_quote(event, "bid"), _raw_quote(event, "ask"))
+
+
+def _on_spot_events(events: list) -> None:
+    """Batched delivery (CTRADER_SPOT_BATCHING): every tick from one socket
+    read at once. Repeated ticks of a symbol collapse into its latest
+    bid/ask, so the price is stored and pushed to SSE once per symbol."""
+    latest = {}
+    for event in events:
+        bid = _raw_quote(event, "bid")
+        ask = _raw_quote(event, "ask")
+        if bid is None and ask is None:
+            continue
+        prev_bid, prev_ask = latest.get(event.symbolId, (None, None))
+        latest[event.symbolId] = (
+            bid if bid is not None else prev_bid,
+            ask if ask is not None else prev_ask,
+        )
 
-    name = app_state.symbol_id_map.get(event.symbolId)
-    if not name:
-        return
+    for symbol_id, (bid, ask) in latest.items():
+        _publish_spot(symbol_id, bid, ask)
+
+
+def _publish_spot(symbol_id: int, raw_bid, raw_ask) -> None:
+    global _last_spot_event_ts
 
-    symbol = app_state.symbol_cache.get(name)
-    if symbol is None:
+    registry = app_state.symbol_registry
+    index = registry.index_of_id(symbol_id)
+    if index == MISSING:
         return
+    name = registry.names[index]
 
     try:
-        divisor = resolve_price_divisor(symbol)
-        bid = _value_from_event(event, "bid", divisor)
-        ask = _value_from_event(event, "ask", divisor)
+        divisor = registry.divisors[index]
+        bid = raw_bid / divisor if raw_bid is not None else None
+        ask = raw_ask / divisor if raw_ask is not None else None
 
         if bid is not None and ask is not None:
             mid = (bid + ask) / 2
@@ -526,17 +934,18 @@ def _on_spot_event(event: ProtoOASpotEvent):
 
         ts = time.time()
         _last_spot_event_ts = ts
-        payload = {
-            "type": "price",
-            "pair": name,
-            "bid": bid,
-            "ask": ask,
-            "mid": mid,
-            "ts": ts,
-        }
-
-        app_state.update_live_price(name, payload)
-        app_state.publish_price_sse(payload)
+        app_state.update_live_price(name, bid, ask, mid, ts)
+
+        # Словник події потрібен лише підключеним SSE-клієнтам цін.
+        if app_state.has_sse_listeners("price"):
+            app_state.publish_price_sse({
+                "type": "price",
+                "pair": name,
+                "bid": bid,
+                "ask": ask,
+                "mid": mid,
+                "ts": ts,
+            })
 
     except Exception:
-        logger.exception("Failed to process spot event for symbolId=%s", event.symbolId)
+        logger.exception("Failed to process spot event for symbolId=%s", symbol_id)
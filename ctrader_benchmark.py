@@ -0,0 +1,198 @@
+# ctrader_benchmark.py
+"""
+Micro-benchmark: incoming cTrader frames/sec through the receive path.
+
+Feeds a length-prefixed frame stream (the exact bytes TcpProtocol sees after
+TLS) through TcpProtocol -> Client -> SpotwareConnect's payloadType table ->
+batched spot delivery, in socket-sized chunks, and compares it with the
+previous path (if-chain dispatch, inner payload parsed by the dispatcher and
+again by the consumer). Without --frames a synthetic stream is generated:
+mostly spot ticks, plus execution events, trendbar responses and heartbeats.
+A recording made with CTRADER_RECORD_PATH (ctrader_replay.py) is such a
+stream; ctrader_replay.py itself replays it end to end through ctrader.py.
+
+    python ctrader_benchmark.py
+    python ctrader_benchmark.py --frames /tmp/ctrader-frames.bin --chunk-size 16384
+"""
+import argparse
+import logging
+import random
+import struct
+import time
+
+from twisted.internet import reactor
+from twisted.protocols.basic import Int32StringReceiver
+from twisted.python import threadable
+from twisted.internet.testing import StringTransport
+
+from ctrader_open_api.factory import Factory
+from ctrader_open_api.messages.OpenApiCommonMessages_pb2 import ProtoHeartbeatEvent, ProtoMessage
+from ctrader_open_api.messages.OpenApiMessages_pb2 import (
+    ProtoOAExecutionEvent,
+    ProtoOAGetTrendbarsRes,
+    ProtoOASpotEvent,
+)
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import (
+    ProtoOAExecutionType,
+    ProtoOAPayloadType,
+    ProtoOATrendbar,
+    ProtoOATrendbarPeriod,
+)
+from ctrader_open_api.tcpProtocol import TcpProtocol
+from spotware_connect import SpotwareConnect
+
+_LEGACY_CHAIN = (
+    ProtoOAPayloadType.PROTO_OA_APPLICATION_AUTH_RES,
+    ProtoOAPayloadType.PROTO_OA_GET_ACCOUNTS_BY_ACCESS_TOKEN_RES,
+    ProtoOAPayloadType.PROTO_OA_ACCOUNT_AUTH_RES,
+    ProtoOAPayloadType.PROTO_OA_ERROR_RES,
+    ProtoOAPayloadType.PROTO_OA_ACCOUNTS_TOKEN_INVALIDATED_EVENT,
+    ProtoOAPayloadType.PROTO_OA_SPOT_EVENT,
+    ProtoOAPayloadType.PROTO_OA_EXECUTION_EVENT,
+)
+_LEGACY_CLASSES = {
+    ProtoOAPayloadType.PROTO_OA_SPOT_EVENT: ProtoOASpotEvent,
+    ProtoOAPayloadType.PROTO_OA_EXECUTION_EVENT: ProtoOAExecutionEvent,
+    ProtoOAPayloadType.PROTO_OA_GET_TRENDBARS_RES: ProtoOAGetTrendbarsRes,
+}
+
+
+def _frame(message, client_msg_id=None) -> bytes:
+    envelope = ProtoMessage(payloadType=message.payloadType, payload=message.SerializeToString())
+    if client_msg_id:
+        envelope.clientMsgId = client_msg_id
+    data = envelope.SerializeToString()
+    return struct.pack("!I", len(data)) + data
+
+
+def synthetic_stream(count: int, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    bars = ProtoOAGetTrendbarsRes(
+        ctidTraderAccountId=1, period=ProtoOATrendbarPeriod.M1, symbolId=1, timestamp=1_700_000_000_000,
+        trendbar=[
+            ProtoOATrendbar(volume=100, low=108000 + i, deltaOpen=5, deltaHigh=9, deltaClose=3,
+                            utcTimestampInMinutes=28_000_000 + i)
+            for i in range(300)
+        ],
+    )
+    frames = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.95:
+            spot = ProtoOASpotEvent(ctidTraderAccountId=1, symbolId=rng.randint(1, 40))
+            spot.bid = 108000 + rng.randint(-500, 500)
+            spot.ask = spot.bid + rng.randint(1, 20)
+            frames.append(_frame(spot))
+        elif roll < 0.97:
+            frames.append(_frame(ProtoOAExecutionEvent(
+                ctidTraderAccountId=1, executionType=ProtoOAExecutionType.ORDER_FILLED,
+            )))
+        elif roll < 0.99:
+            frames.append(_frame(bars, client_msg_id=f"bench-{i}"))
+        else:
+            frames.append(_frame(ProtoHeartbeatEvent()))
+    return b"".join(frames)
+
+
+def _chunks(stream: bytes, size: int):
+    for offset in range(0, len(stream), size):
+        yield stream[offset:offset + size]
+
+
+class _LegacyReceiver(Int32StringReceiver):
+    """The pre-dispatch-table receive path, kept only for comparison."""
+    MAX_LENGTH = TcpProtocol.MAX_LENGTH
+
+    def __init__(self):
+        self.count = 0
+
+    def stringReceived(self, data):
+        msg = ProtoMessage()
+        msg.ParseFromString(data)
+        is_heartbeat = msg.payloadType == ProtoHeartbeatEvent().payloadType  # noqa: F841
+        for payload_type in _LEGACY_CHAIN:
+            if msg.payloadType == payload_type:
+                break
+        klass = _LEGACY_CLASSES.get(msg.payloadType)
+        if klass is not None:
+            klass().ParseFromString(msg.payload)  # dispatcher
+            if msg.payloadType != ProtoOAPayloadType.PROTO_OA_SPOT_EVENT:
+                klass().ParseFromString(msg.payload)  # consumer (analysis/autotrader)
+        self.count += 1
+
+
+def run_legacy(stream: bytes, chunk_size: int) -> int:
+    receiver = _LegacyReceiver()
+    for chunk in _chunks(stream, chunk_size):
+        receiver.dataReceived(chunk)
+    return receiver.count
+
+
+def run_current(stream: bytes, chunk_size: int) -> int:
+    threadable.registerAsIOThread()
+    connect = SpotwareConnect("bench", "bench")
+    counted = {"messages": 0}
+    connect.on_batch("spot_event", lambda events: None)
+    connect.on("execution_event", lambda event: None)
+
+    client = connect._client
+    original_received = client._received
+
+    def _received(message):
+        counted["messages"] += 1
+        original_received(message)
+        # Те, що робить analysis з відповіддю на trendbars.
+        if message.payloadType == ProtoOAPayloadType.PROTO_OA_GET_TRENDBARS_RES:
+            message.decode(ProtoOAGetTrendbarsRes)
+
+    client._received = _received
+    protocol = TcpProtocol()
+    protocol.factory = Factory(client=client)
+    protocol.transport = StringTransport()
+
+    for chunk in _chunks(stream, chunk_size):
+        protocol.dataReceived(chunk)
+        reactor.runUntilCurrent()
+    return counted["messages"]
+
+
+def _rate(fn, stream: bytes, chunk_size: int, repeats: int) -> tuple[int, float]:
+    best = 0.0
+    count = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        count = fn(stream, chunk_size)
+        elapsed = time.perf_counter() - started
+        best = max(best, count / elapsed if elapsed else 0.0)
+    return count, best
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="Incoming cTrader frames/sec through the receive path.")
+    parser.add_argument("--frames", default=None, help="Recorded length-prefixed frame stream (default: synthetic).")
+    parser.add_argument("--count", type=int, default=50_000, help="Synthetic frames (default 50000).")
+    parser.add_argument("--chunk-size", type=int, default=8192, help="Bytes per simulated socket read (default 8192).")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per path; the best is reported (default 3).")
+    args = parser.parse_args()
+
+    if args.frames:
+        with open(args.frames, "rb") as f:
+            stream = f.read()
+    else:
+        stream = synthetic_stream(args.count)
+
+    legacy_count, legacy_rate = _rate(run_legacy, stream, args.chunk_size, args.repeats)
+    current_count, current_rate = _rate(run_current, stream, args.chunk_size, args.repeats)
+    if legacy_count != current_count:
+        raise AssertionError(f"Frame counts differ: legacy={legacy_count} current={current_count}")
+
+    print(f"{current_count} frames, {len(stream)} bytes, {args.chunk_size}-byte reads")
+    print(f"{'path':10} {'msg/s':>12}")
+    print(f"{'legacy':10} {legacy_rate:12,.0f}")
+    print(f"{'current':10} {current_rate:12,.0f}  ({current_rate / legacy_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ class Client(ClientService):
         self._events = dict()
         self._responseDeferreds = dict()
         self.isConnected = False
+        self.protocol = None
 
     def startService(self):
         if self.running:
@@ -28,11 +29,13 @@ class Client(ClientService):
 
     def _connected(self, protocol):
         self.isConnected = True
+        self.protocol = protocol
         if hasattr(self, "_connectedCallback"):
             self._connectedCallback(self)
 
     def _disconnected(self, reason):
         self.isConnected = False
+        self.protocol = None
         self._responseDeferreds.clear()
         if hasattr(self, "_disconnectedCallback"):
             self._disconnectedCallback(self, reason)
@@ -59,6 +62,12 @@ class Client(ClientService):
         protocolDiferred.addCallbacks(lambda protocol: protocol.send(message, clientMsgId=clientMsgId, isCanceled=lambda: clientMsgId not in self._responseDeferreds), responseDeferred.errback)
         return responseDeferred
 
+    def sendQueueStats(self):
+        protocol = self.protocol
+        if protocol is None or not hasattr(protocol, "sendQueueStats"):
+            return None
+        return protocol.sendQueueStats()
+
     def setConnectedCallback(self, callback):
         self._connectedCallback = callback
 
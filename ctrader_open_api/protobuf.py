@@ -45,7 +45,61 @@ class Protobuf(object):
         return p.payloadType
 
     @classmethod
-    def extract(cls, message):
-        payload = cls.get(message.payloadType)
+    def extract(cls, message, expected=None):
+        """Inner message of an envelope. A DecodedMessage hands back its
+        cached decode; `expected` (a message class) forces that type, as the
+        old `res = Expected(); res.ParseFromString(msg.payload)` did."""
+        if isinstance(message, DecodedMessage):
+            return message.decode(expected)
+        if expected is not None:
+            payload = expected()
+        else:
+            payload = cls.get(message.payloadType)
         payload.ParseFromString(message.payload)
         return payload
+
+
+class DecodedMessage(object):
+    """
+    Incoming ProtoMessage envelope plus its inner message, decoded on first
+    access and cached, so the dispatcher, Client response deferreds and the
+    final consumer (analysis, autotrader) share one ParseFromString.
+
+    Exposes the envelope fields callers already use (payloadType, payload,
+    clientMsgId), so it can stand in for the raw ProtoMessage.
+    """
+    __slots__ = ("envelope", "payloadType", "_decoded")
+
+    def __init__(self, envelope):
+        self.envelope = envelope
+        self.payloadType = envelope.payloadType
+        self._decoded = None
+
+    @property
+    def payload(self):
+        return self.envelope.payload
+
+    @property
+    def clientMsgId(self):
+        return self.envelope.clientMsgId
+
+    def HasField(self, name):
+        return self.envelope.HasField(name)
+
+    def decode(self, expected=None):
+        decoded = self._decoded
+        if decoded is None or (expected is not None and type(decoded) is not expected):
+            if expected is not None:
+                decoded = expected()
+            else:
+                decoded = Protobuf.get(self.payloadType, fail=False)
+                if decoded is None:
+                    return None
+            decoded.ParseFromString(self.envelope.payload)
+            if self._decoded is None:
+                self._decoded = decoded
+        return decoded
+
+    @property
+    def message(self):
+        return self.decode()
@@ -2,31 +2,150 @@
 
 from collections import deque
 from twisted.protocols.basic import Int32StringReceiver
-from twisted.internet import task
+from twisted.internet import reactor, task
 from ctrader_open_api.messages.OpenApiCommonMessages_pb2 import ProtoMessage, ProtoHeartbeatEvent
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOAPayloadType
+from ctrader_open_api.protobuf import DecodedMessage
 import datetime
 import logging # <-- Додано імпорт
 
 logger = logging.getLogger(__name__) # <-- Додано ініціалізацію логера
 
+_WAIT_SAMPLES = 256
+_HEARTBEAT_PAYLOAD_TYPE = ProtoHeartbeatEvent().payloadType
+# Clock arithmetic is float: t + 1.0 - 1.0 is not always t.
+_WINDOW_EPSILON = 1e-9
+
+# Outbound lanes, highest priority first. All lanes share one rate limit;
+# a lower lane only gets a slot when every lane above it is empty, so an
+# order never waits behind a scan burst of trendbar requests.
+LANE_ORDERS = "orders"
+LANE_CONTROL = "control"
+LANE_SUBSCRIPTIONS = "subscriptions"
+LANE_MARKET_DATA = "market_data"
+LANES = (LANE_ORDERS, LANE_CONTROL, LANE_SUBSCRIPTIONS, LANE_MARKET_DATA)
+
+_LANE_BY_PAYLOAD_TYPE = {
+    **dict.fromkeys((
+        ProtoOAPayloadType.PROTO_OA_NEW_ORDER_REQ,
+        ProtoOAPayloadType.PROTO_OA_CANCEL_ORDER_REQ,
+        ProtoOAPayloadType.PROTO_OA_AMEND_ORDER_REQ,
+        ProtoOAPayloadType.PROTO_OA_AMEND_POSITION_SLTP_REQ,
+        ProtoOAPayloadType.PROTO_OA_CLOSE_POSITION_REQ,
+    ), LANE_ORDERS),
+    **dict.fromkeys((
+        ProtoOAPayloadType.PROTO_OA_SUBSCRIBE_SPOTS_REQ,
+        ProtoOAPayloadType.PROTO_OA_UNSUBSCRIBE_SPOTS_REQ,
+        ProtoOAPayloadType.PROTO_OA_SUBSCRIBE_LIVE_TRENDBAR_REQ,
+        ProtoOAPayloadType.PROTO_OA_UNSUBSCRIBE_LIVE_TRENDBAR_REQ,
+        ProtoOAPayloadType.PROTO_OA_SUBSCRIBE_DEPTH_QUOTES_REQ,
+        ProtoOAPayloadType.PROTO_OA_UNSUBSCRIBE_DEPTH_QUOTES_REQ,
+    ), LANE_SUBSCRIPTIONS),
+    **dict.fromkeys((
+        ProtoOAPayloadType.PROTO_OA_GET_TRENDBARS_REQ,
+        ProtoOAPayloadType.PROTO_OA_GET_TICKDATA_REQ,
+    ), LANE_MARKET_DATA),
+}
+
+
+def lane_for_payload_type(payloadType):
+    # Auth, account/symbol lists, reconcile and anything unknown -> control.
+    return _LANE_BY_PAYLOAD_TYPE.get(payloadType, LANE_CONTROL)
+
+
+class SendQueueStats:
+    """Queue wait (enqueue -> socket) of rate-limited messages."""
+
+    def __init__(self):
+        self.sent = 0
+        self.canceled = 0
+        self.dropped = 0
+        self.delayed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_last = 0.0
+        self._recent = deque(maxlen=_WAIT_SAMPLES)
+
+    def record(self, wait):
+        self.sent += 1
+        if wait > 0:
+            self.delayed += 1
+        self._wait_total += wait
+        self._wait_last = wait
+        self._wait_max = max(self._wait_max, wait)
+        self._recent.append(wait)
+
+    def snapshot(self, depth=0):
+        recent = sorted(self._recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "depth": depth,
+            "sent": self.sent,
+            "delayed": self.delayed,
+            "canceled": self.canceled,
+            "dropped": self.dropped,
+            "wait_ms_avg": round(self._wait_total / self.sent * 1000, 1) if self.sent else 0.0,
+            "wait_ms_p95": round(p95 * 1000, 1),
+            "wait_ms_max": round(self._wait_max * 1000, 1),
+            "wait_ms_last": round(self._wait_last * 1000, 1),
+        }
+
+
 class TcpProtocol(Int32StringReceiver):
+    """
+    Non-instant messages are paced per connection: at most
+    numberOfMessagesToSendPerSecond in any rolling 1s window, and each
+    send slot comes back exactly 1s after it was used. A message is written
+    as soon as a slot is free; otherwise one timer is set for the moment the
+    oldest slot frees up. Same rate cap as the old LoopingCall(1) batch,
+    without the up-to-1s wait for the next tick.
+
+    Queued messages sit in per-priority lanes (see LANES); the free slot
+    always goes to the head of the highest non-empty lane.
+    """
     MAX_LENGTH = 15000000
-    _send_queue = deque([])
-    _send_task = None
+    HEARTBEAT_IDLE_SECONDS = 20
+    HEARTBEAT_CHECK_SECONDS = 1
+    SEND_WINDOW_SECONDS = 1.0
     _lastSendMessageTime = None
+    # Client.recorder (ctrader_replay.FrameRecorder): every received frame
+    # is appended to a recording before it is decoded.
+    _recorder = None
+
+    def __init__(self, clock=None):
+        self.clock = clock or reactor
+        self._send_queue = {lane: deque() for lane in LANES}
+        self._sentTimes = deque()
+        self._drainCall = None
+        self._heartbeat_task = None
+        self.sendStats = SendQueueStats()
+        self.laneStats = {lane: SendQueueStats() for lane in LANES}
+
+    @property
+    def _rate(self):
+        return max(1, int(getattr(self.factory, "numberOfMessagesToSendPerSecond", 5) or 5))
 
     def connectionMade(self):
         super().connectionMade()
+        self._recorder = getattr(getattr(self.factory, "client", None), "recorder", None)
 
-        if not self._send_task:
-            self._send_task = task.LoopingCall(self._sendStrings)
-        self._send_task.start(1)
+        self._heartbeat_task = task.LoopingCall(self._checkHeartbeat)
+        self._heartbeat_task.clock = self.clock
+        self._heartbeat_task.start(self.HEARTBEAT_CHECK_SECONDS, now=False)
         self.factory.connected(self)
 
     def connectionLost(self, reason):
         super().connectionLost(reason)
-        if self._send_task.running:
-            self._send_task.stop()
+        if self._heartbeat_task is not None and self._heartbeat_task.running:
+            self._heartbeat_task.stop()
+        if self._drainCall is not None and self._drainCall.active():
+            self._drainCall.cancel()
+        self._drainCall = None
+        # Черга належить цьому з'єднанню: відповіді на ці запити вже не прийдуть.
+        for lane, queue in self._send_queue.items():
+            self.sendStats.dropped += len(queue)
+            self.laneStats[lane].dropped += len(queue)
+            queue.clear()
         self.factory.disconnected(reason)
 
     def heartbeat(self):
@@ -36,9 +155,11 @@ class TcpProtocol(Int32StringReceiver):
 
     def send(self, message, instant=False, clientMsgId=None, isCanceled = None):
         data = b''
+        payloadType = None
 
         if isinstance(message, ProtoMessage):
             data = message.SerializeToString()
+            payloadType = message.payloadType
 
         if isinstance(message, bytes):
             data = message
@@ -48,35 +169,87 @@ class TcpProtocol(Int32StringReceiver):
                                clientMsgId=clientMsgId,
                                payloadType=message.payloadType)
             data = msg.SerializeToString()
+            payloadType = message.payloadType
 
         if instant:
             self.sendString(data)
             self._lastSendMessageTime = datetime.datetime.now()
         else:
-            self._send_queue.append((isCanceled, data))
-
-    def _sendStrings(self):
-        size = len(self._send_queue)
-
-        if not size:
-            if self._lastSendMessageTime is None or (datetime.datetime.now() - self._lastSendMessageTime).total_seconds() > 20:
-                self.heartbeat()
+            lane = lane_for_payload_type(payloadType)
+            self._send_queue[lane].append((isCanceled, data, self.clock.seconds()))
+            if self._drainCall is None:
+                self._drainSendQueue()
+
+    def queuedCount(self):
+        return sum(len(queue) for queue in self._send_queue.values())
+
+    def sendQueueStats(self):
+        stats = self.sendStats.snapshot(self.queuedCount())
+        stats["lanes"] = {
+            lane: self.laneStats[lane].snapshot(len(self._send_queue[lane]))
+            for lane in LANES
+        }
+        return stats
+
+    def _nextQueued(self):
+        for lane in LANES:
+            queue = self._send_queue[lane]
+            if queue:
+                return lane, queue.popleft()
+        return None, None
+
+    def _freeSlots(self, now):
+        window = self._sentTimes
+        while window and window[0] <= now - self.SEND_WINDOW_SECONDS + _WINDOW_EPSILON:
+            window.popleft()
+        return self._rate - len(window)
+
+    def _drainSendQueue(self):
+        self._drainCall = None
+        if not self.queuedCount():
             return
 
-        for _ in range(min(size, self.factory.numberOfMessagesToSendPerSecond)):
-            isCanceled, data = self._send_queue.popleft()
+        now = self.clock.seconds()
+        free = self._freeSlots(now)
+
+        while free > 0:
+            lane, item = self._nextQueued()
+            if item is None:
+                break
+            isCanceled, data, enqueuedAt = item
             if isCanceled is not None and isCanceled():
-                continue;
+                self.sendStats.canceled += 1
+                self.laneStats[lane].canceled += 1
+                continue
             self.sendString(data)
-        self._lastSendMessageTime = datetime.datetime.now()
+            self._sentTimes.append(now)
+            free -= 1
+            self._lastSendMessageTime = datetime.datetime.now()
+            wait = max(0.0, now - enqueuedAt)
+            self.sendStats.record(wait)
+            self.laneStats[lane].record(wait)
 
-    def stringReceived(self, data):
-        msg = ProtoMessage()
-        msg.ParseFromString(data)
+        if self.queuedCount() and self._drainCall is None:
+            delay = self._sentTimes[0] + self.SEND_WINDOW_SECONDS - now
+            self._drainCall = self.clock.callLater(max(0.0, delay), self._drainSendQueue)
 
-        if msg.payloadType == ProtoHeartbeatEvent().payloadType:
+    def _checkHeartbeat(self):
+        if self.queuedCount():
+            return
+        if self._lastSendMessageTime is None or (datetime.datetime.now() - self._lastSendMessageTime).total_seconds() > self.HEARTBEAT_IDLE_SECONDS:
+            self.heartbeat()
+
+    def stringReceived(self, data):
+        if self._recorder is not None:
+            self._recorder.record(data)
+        envelope = ProtoMessage()
+        envelope.ParseFromString(data)
+        # Внутрішнє повідомлення декодується лише на вимогу, і лише один раз.
+        msg = DecodedMessage(envelope)
+
+        if msg.payloadType == _HEARTBEAT_PAYLOAD_TYPE:
             # --- ДІАГНОСТИКА: Логуємо отримання heartbeat ---
             logger.debug("TcpProtocol: Отримано Heartbeat у відповідь")
             self.heartbeat()
         self.factory.received(msg)
-        return data
\ No newline at end of file
+        return data
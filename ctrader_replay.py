@@ -0,0 +1,596 @@
+# ctrader_replay.py
+"""
+Record the incoming cTrader frame stream and play it back without an account.
+
+FrameRecorder is hung on the live client (CTRADER_RECORD_PATH): TcpProtocol
+hands it every frame it receives — auth responses, symbol lists, spots,
+trendbars, execution events — and it appends them to a file in the exact
+on-the-wire form, a 4-byte big-endian length followed by the ProtoMessage.
+That file is what `ctrader_benchmark.py --frames` reads. The receive time
+of each frame (seconds since the recording started, little-endian float64)
+goes to a `<path>.times` sidecar, so the frame file stays a plain stream.
+
+ReplayClient stands in for ctrader_open_api.client.Client under
+SpotwareConnect: it pushes the recording through a real TcpProtocol at the
+recorded pace (speed=1), N times faster (speed=N) or as fast as the reactor
+takes it (speed=0), in socket-sized reads. Outgoing requests go nowhere;
+a request's Deferred is answered by the next recorded response of the
+matching *_RES type. Trendbar and symbol-detail responses must also match
+the request's content (symbolId + period, the set of symbolIds): the order
+in which concurrent requests go out depends on timing and speed, and a
+GBPUSD 1m answer must never land in the EURUSD 5m cache.
+
+Playback never runs ahead of the bot: when the next recorded frame is a
+response nobody has asked for yet (the symbol list ctrader.py requests a
+second after "ready", spot subscriptions, trendbars), the feed pauses until
+the matching request goes out, or for at most `response_wait` seconds if
+it never does. Otherwise at max speed every spot would be played before
+the symbol list is even requested, and the number of prices that make it
+through would depend on timing. With the pause, a recording of the same
+setup drives ctrader.py, the scanner and the price SSE exactly like the
+live feed, run after run.
+
+    python ctrader_replay.py /data/ctrader-frames.bin --speed 0
+    python ctrader_replay.py /data/ctrader-frames.bin --speed 10 --signal EURUSD --signal GBPUSD
+"""
+import argparse
+import bisect
+import logging
+import os
+import struct
+import time
+from array import array
+from collections import deque
+
+from twisted.internet import address, defer, error, reactor
+from twisted.python import failure
+
+from ctrader_open_api.factory import Factory
+from ctrader_open_api.messages.OpenApiCommonMessages_pb2 import ProtoMessage
+from ctrader_open_api.messages.OpenApiMessages_pb2 import ProtoOAGetTrendbarsRes, ProtoOASymbolByIdRes
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOAPayloadType
+from ctrader_open_api.protobuf import Protobuf
+from ctrader_open_api.tcpProtocol import TcpProtocol
+
+logger = logging.getLogger("ctrader_replay")
+
+_LENGTH = struct.Struct("!I")
+_FLUSH_SECONDS = 1.0
+# Відповіді, на які ще ніхто не чекав (запит не встиг піти), тримаємо обмежено.
+_MAX_UNCLAIMED_PER_KEY = 256
+
+# PROTO_OA_X_REQ -> PROTO_OA_X_RES
+RESPONSE_TYPE = {
+    ProtoOAPayloadType.Value(name): ProtoOAPayloadType.Value(name[:-4] + "_RES")
+    for name in ProtoOAPayloadType.keys()
+    if name.endswith("_REQ") and name[:-4] + "_RES" in ProtoOAPayloadType.keys()
+}
+
+
+_TRENDBARS_REQ = ProtoOAPayloadType.Value("PROTO_OA_GET_TRENDBARS_REQ")
+_TRENDBARS_RES = ProtoOAPayloadType.Value("PROTO_OA_GET_TRENDBARS_RES")
+_SYMBOL_BY_ID_REQ = ProtoOAPayloadType.Value("PROTO_OA_SYMBOL_BY_ID_REQ")
+_SYMBOL_BY_ID_RES = ProtoOAPayloadType.Value("PROTO_OA_SYMBOL_BY_ID_RES")
+# SpotwareConnect у режимі відтворення не надсилає запитів авторизації:
+# ці відповіді з запису йдуть у сесію без запиту, на них не чекаємо.
+_HANDSHAKE_RESPONSES = {
+    ProtoOAPayloadType.Value(name)
+    for name in (
+        "PROTO_OA_APPLICATION_AUTH_RES",
+        "PROTO_OA_GET_ACCOUNTS_BY_ACCESS_TOKEN_RES",
+        "PROTO_OA_ACCOUNT_AUTH_RES",
+        "PROTO_OA_REFRESH_TOKEN_RES",
+    )
+}
+_AWAITED_RESPONSES = set(RESPONSE_TYPE.values()) - _HANDSHAKE_RESPONSES
+DEFAULT_RESPONSE_WAIT = 5.0
+
+
+def times_path(path: str) -> str:
+    return f"{path}.times"
+
+
+def request_key(message) -> tuple:
+    """(response type, content) a request waits for. Content is None for
+    types that are answered in order."""
+    payload_type = message.payloadType
+    if payload_type == _TRENDBARS_REQ:
+        content = (message.symbolId, message.period)
+    elif payload_type == _SYMBOL_BY_ID_REQ:
+        content = tuple(sorted(set(message.symbolId)))
+    else:
+        content = None
+    return RESPONSE_TYPE.get(payload_type), content
+
+
+def response_key(message) -> tuple:
+    """The request_key() a received ProtoMessage answers."""
+    payload_type = message.payloadType
+    if payload_type == _TRENDBARS_RES:
+        res = Protobuf.extract(message, ProtoOAGetTrendbarsRes)
+        content = (res.symbolId, res.period)
+    elif payload_type == _SYMBOL_BY_ID_RES:
+        res = Protobuf.extract(message, ProtoOASymbolByIdRes)
+        content = tuple(sorted({symbol.symbolId for symbol in res.symbol} | {symbol.symbolId for symbol in res.archivedSymbol}))
+    else:
+        content = None
+    return payload_type, content
+
+
+class _NullTransport:
+    """Where the replayed connection's requests and heartbeats go."""
+
+    disconnecting = False
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+
+    def writeSequence(self, data):
+        for chunk in data:
+            self.write(chunk)
+
+    def loseConnection(self):
+        self.disconnecting = True
+
+    abortConnection = loseConnection
+
+    def getPeer(self):
+        return address.IPv4Address("TCP", "127.0.0.1", 0)
+
+    getHost = getPeer
+
+
+class FrameRecorder:
+    """Appends received frames to `path` and their receive times to the
+    sidecar. Runs on the reactor thread, inside TcpProtocol.stringReceived."""
+
+    def __init__(self, path: str, clock=time.monotonic):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._clock = clock
+        self._frames = open(path, "wb")
+        self._times = open(times_path(path), "wb")
+        self._started = clock()
+        self._last_flush = self._started
+        self.frames = 0
+        self.bytes = 0
+
+    def record(self, data: bytes) -> None:
+        if self._frames is None:
+            return
+        now = self._clock()
+        self._frames.write(_LENGTH.pack(len(data)))
+        self._frames.write(data)
+        self._times.write(struct.pack("<d", now - self._started))
+        self.frames += 1
+        self.bytes += len(data) + _LENGTH.size
+        if now - self._last_flush >= _FLUSH_SECONDS:
+            self.flush()
+            self._last_flush = now
+
+    def flush(self) -> None:
+        if self._frames is not None:
+            self._frames.flush()
+            self._times.flush()
+
+    def close(self) -> None:
+        if self._frames is None:
+            return
+        self.flush()
+        self._frames.close()
+        self._times.close()
+        self._frames = self._times = None
+        logger.info("Запис потоку cTrader закрито: %s кадрів, %s байт -> %s", self.frames, self.bytes, self.path)
+
+
+def read_recording(path: str) -> tuple[list[bytes], array]:
+    """([framed bytes, length prefix included], receive offsets). Without a
+    sidecar every offset is 0 — the recording only replays at max speed."""
+    with open(path, "rb") as f:
+        stream = f.read()
+
+    frames = []
+    offset = 0
+    while offset + _LENGTH.size <= len(stream):
+        (length,) = _LENGTH.unpack_from(stream, offset)
+        end = offset + _LENGTH.size + length
+        if end > len(stream):
+            logger.warning("Обрізаний останній кадр у %s, ігнорую %s байт.", path, len(stream) - offset)
+            break
+        frames.append(stream[offset:end])
+        offset = end
+
+    times = array("d")
+    if os.path.exists(times_path(path)):
+        with open(times_path(path), "rb") as f:
+            times.frombytes(f.read())
+        if len(times) != len(frames):
+            logger.warning("%s: %s кадрів, але %s міток часу — ігнорую мітки.", path, len(frames), len(times))
+            times = array("d")
+    if not times:
+        times = array("d", bytes(8 * len(frames)))
+    return frames, times
+
+
+class ReplayClient:
+    """The subset of ctrader_open_api.client.Client that SpotwareConnect uses,
+    fed from a recording instead of a socket. `done` fires with the replay
+    stats once the last frame has been delivered."""
+
+    replay = True
+    recorder = None
+
+    def __init__(self, path: str, *, speed: float = 1.0, chunk_size: int = 8192, clock=None,
+                 response_wait: float = DEFAULT_RESPONSE_WAIT, numberOfMessagesToSendPerSecond: int = 5):
+        self.path = path
+        self.speed = float(speed or 0)
+        self.chunk_size = max(1, int(chunk_size))
+        self.clock = clock or reactor
+        self.response_wait = max(0.0, float(response_wait or 0))
+        self.numberOfMessagesToSendPerSecond = numberOfMessagesToSendPerSecond
+        self.frames, self.times = read_recording(path)
+        # Індекси кадрів-відповідей, які мають дочекатися свого запиту, і їхні ключі.
+        self._awaited = self._index_responses() if self.response_wait else {}
+        self._awaited_indices = sorted(self._awaited)
+        self._waiting_for = None
+        self._wait_started = None
+        self._wait_call = None
+        self._released = -1
+        self.isConnected = False
+        self.protocol = None
+        self.running = False
+        self.done = defer.Deferred()
+        self._transport = None
+        self._position = 0
+        self._started_at = None
+        self._wall_started = None
+        self._feed_call = None
+        self._pending = {}
+        self._unclaimed = {}
+        # request_key -> perf_counter() моменту, коли відповідь віддано запиту.
+        self.answered_at = {}
+        self.stats = {
+            "frames": 0, "bytes": 0, "reads": 0, "responses_matched": 0, "responses_unclaimed": 0,
+            "responses_waited": 0, "response_wait_timeouts": 0,
+        }
+
+    def _index_responses(self) -> dict:
+        awaited = {}
+        for index, frame in enumerate(self.frames):
+            message = ProtoMessage.FromString(frame[_LENGTH.size:])
+            if message.clientMsgId and message.payloadType in _AWAITED_RESPONSES:
+                awaited[index] = response_key(message)
+        return awaited
+
+    # -- Client interface ------------------------------------------------
+
+    def setConnectedCallback(self, callback):
+        self._connectedCallback = callback
+
+    def setDisconnectedCallback(self, callback):
+        self._disconnectedCallback = callback
+
+    def setMessageReceivedCallback(self, callback):
+        self._messageReceivedCallback = callback
+
+    def startService(self):
+        if self.running:
+            return
+        self.running = True
+        self._transport = _NullTransport()
+        protocol = TcpProtocol(clock=self.clock)
+        protocol.factory = Factory(client=self)
+        protocol.makeConnection(self._transport)
+        self._started_at = self.clock.seconds()
+        self._wall_started = time.perf_counter()
+        logger.info("Відтворення %s: %s кадрів, швидкість %s.", self.path, len(self.frames), self.speed or "max")
+        self._schedule(0)
+
+    def stopService(self):
+        if not self.running:
+            return
+        self.running = False
+        if self._feed_call is not None and self._feed_call.active():
+            self._feed_call.cancel()
+        self._feed_call = None
+        if self._wait_call is not None and self._wait_call.active():
+            self._wait_call.cancel()
+        self._wait_call = None
+        self._waiting_for = None
+        if self.protocol is not None:
+            self.protocol.connectionLost(failure.Failure(error.ConnectionDone()))
+
+    def send(self, message, clientMsgId=None, responseTimeoutInSeconds=5, **params):
+        if type(message) in [str, int]:
+            message = Protobuf.get(message, **params)
+        key = request_key(message)
+        responseDeferred = defer.Deferred()
+
+        unclaimed = self._unclaimed.get(key)
+        if unclaimed:
+            self._answer(key, responseDeferred, unclaimed.popleft())
+            return responseDeferred
+
+        if key[0] is not None:
+            pending = self._pending.setdefault(key, deque())
+            pending.append(responseDeferred)
+            responseDeferred.addErrback(self._forget, key, responseDeferred)
+            responseDeferred.addTimeout(responseTimeoutInSeconds, self.clock)
+        if self.protocol is not None:
+            # Через справжню чергу з лімітом, але в нікуди.
+            self.protocol.send(message, clientMsgId=clientMsgId)
+        if self._waiting_for == key:
+            self._resume()
+        return responseDeferred
+
+    def sendQueueStats(self):
+        protocol = self.protocol
+        return protocol.sendQueueStats() if protocol is not None else None
+
+    # -- Factory callbacks ---------------------------------------------
+
+    def _connected(self, protocol):
+        self.isConnected = True
+        self.protocol = protocol
+        if hasattr(self, "_connectedCallback"):
+            self._connectedCallback(self)
+
+    def _disconnected(self, reason):
+        self.isConnected = False
+        self.protocol = None
+        self._pending.clear()
+        if hasattr(self, "_disconnectedCallback"):
+            self._disconnectedCallback(self, reason)
+
+    def _received(self, message):
+        if hasattr(self, "_messageReceivedCallback"):
+            self._messageReceivedCallback(self, message)
+        if not message.clientMsgId:
+            return
+        key = response_key(message)
+        pending = self._pending.get(key)
+        if pending:
+            self._answer(key, pending.popleft(), message)
+            return
+        unclaimed = self._unclaimed.setdefault(key, deque(maxlen=_MAX_UNCLAIMED_PER_KEY))
+        unclaimed.append(message)
+        self.stats["responses_unclaimed"] += 1
+
+    def _answer(self, key, responseDeferred, message):
+        self.stats["responses_matched"] += 1
+        self.answered_at[key] = time.perf_counter()
+        responseDeferred.callback(message)
+
+    def _forget(self, reason, key, responseDeferred):
+        pending = self._pending.get(key)
+        if pending and responseDeferred in pending:
+            pending.remove(responseDeferred)
+        return reason
+
+    # -- Playback ------------------------------------------------------
+
+    def _schedule(self, delay):
+        self._feed_call = self.clock.callLater(max(0.0, delay), self._feed)
+
+    def _feed(self):
+        self._feed_call = None
+        if not self.running or self.protocol is None:
+            return
+
+        end = self._position
+        if self.speed:
+            elapsed = (self.clock.seconds() - self._started_at) * self.speed
+            while end < len(self.frames) and self.times[end] <= elapsed:
+                end += 1
+        else:
+            size = 0
+            while end < len(self.frames) and (size < self.chunk_size or end == self._position):
+                size += len(self.frames[end])
+                end += 1
+        due = end
+        end = self._answerable_end(end)
+
+        if end > self._position:
+            self._deliver(self.frames[self._position:end])
+            self._position = end
+
+        if self._position >= len(self.frames):
+            self._finish()
+        elif end < due:
+            self._wait(self._awaited[end])
+        elif self.speed:
+            elapsed = (self.clock.seconds() - self._started_at) * self.speed
+            self._schedule((self.times[self._position] - elapsed) / self.speed)
+        else:
+            # Віддаємо reactor-у хід між читаннями: батчі спотів, callLater і т.д.
+            self._schedule(0)
+
+    def _answerable_end(self, end: int) -> int:
+        """First recorded response in [position, end) that no request is
+        waiting for yet, or `end`."""
+        claims = {}
+        first = bisect.bisect_left(self._awaited_indices, self._position)
+        for index in self._awaited_indices[first:]:
+            if index >= end:
+                break
+            if index == self._released:
+                continue
+            key = self._awaited[index]
+            claims[key] = claims.get(key, 0) + 1
+            if claims[key] > len(self._pending.get(key, ())):
+                return index
+        return end
+
+    def _wait(self, key) -> None:
+        self._waiting_for = key
+        self._wait_started = self.clock.seconds()
+        self.stats["responses_waited"] += 1
+        self._wait_call = self.clock.callLater(self.response_wait, self._wait_expired)
+
+    def _wait_expired(self) -> None:
+        self._wait_call = None
+        self.stats["response_wait_timeouts"] += 1
+        logger.warning(
+            "Запит для записаної відповіді %s не надійшов за %ss — віддаю її без запиту.",
+            self._waiting_for, self.response_wait,
+        )
+        self._released = self._position
+        self._resume()
+
+    def _resume(self) -> None:
+        if self._wait_call is not None and self._wait_call.active():
+            self._wait_call.cancel()
+        self._wait_call = None
+        self._waiting_for = None
+        if self.speed:
+            # Пауза не з'їдає записаних інтервалів між наступними кадрами.
+            self._started_at += self.clock.seconds() - self._wait_started
+        self._schedule(0)
+
+    def _deliver(self, frames):
+        data = b"".join(frames)
+        for offset in range(0, len(data), self.chunk_size):
+            self.protocol.dataReceived(data[offset:offset + self.chunk_size])
+            self.stats["reads"] += 1
+        self.stats["frames"] += len(frames)
+        self.stats["bytes"] += len(data)
+
+    def _finish(self):
+        elapsed = time.perf_counter() - self._wall_started
+        stats = dict(self.stats, seconds=round(elapsed, 3))
+        stats["frames_per_second"] = round(stats["frames"] / elapsed) if elapsed else None
+        logger.info("Відтворення %s завершено: %s", self.path, stats)
+        if not self.done.called:
+            self.done.callback(stats)
+
+
+class _PriceListener:
+    def __init__(self):
+        self.events = 0
+        self.bytes = 0
+
+    def deliver(self, message: bytes):
+        self.events += 1
+        self.bytes += len(message)
+        return True
+
+
+def measure_signal(replay: ReplayClient, pair: str, timeframe: str = "5m"):
+    """Analyses `pair` from the recorded trendbars the way the scanner does —
+    both timeframes through analysis.get_market_data, the model verdict of
+    each, the confirmed verdict — and fires with the bar → signal time: from
+    the later of the two trendbar responses to the verdict. The news and
+    calendar step is left out: it is a network call, not replayed data."""
+    import analysis
+    from state import app_state
+    from symbol_registry import MISSING
+
+    registry = app_state.symbol_registry
+    pair_norm = analysis._normalize_pair(pair)
+    index = registry.index(pair_norm)
+    if index == MISSING:
+        return defer.succeed({"pair": pair_norm, "error": "symbol not found"})
+
+    periods = ("1m", "5m") if timeframe == "1m" else ("5m", "15m")
+    keys = [(_TRENDBARS_RES, (registry.symbol_ids[index], analysis.PERIOD_MAP[period])) for period in periods]
+    d = defer.gatherResults(
+        [analysis.get_market_data(app_state.client, registry, pair_norm, period, 300) for period in periods],
+        consumeErrors=True,
+    )
+
+    def _signal(frames):
+        verdicts = [analysis._run_technical_analysis(df)[1] for df in frames]
+        verdict = analysis._confirmed_verdict(*verdicts)
+        bar_at = max(replay.answered_at.get(key, 0.0) for key in keys)
+        return {
+            "pair": pair_norm,
+            "verdict": verdict,
+            "bar_to_signal_ms": round((time.perf_counter() - bar_at) * 1000, 1),
+        }
+
+    def _failed(failure):
+        return {"pair": pair_norm, "error": failure.getErrorMessage()}
+
+    d.addCallbacks(_signal, _failed)
+    return d
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded cTrader frame stream through ctrader.py.")
+    parser.add_argument("frames", help="Recording made with CTRADER_RECORD_PATH.")
+    parser.add_argument("--speed", type=float, default=0, help="1 = recorded pace, N = N times faster, 0 = max (default).")
+    parser.add_argument("--chunk-size", type=int, default=8192, help="Bytes per simulated socket read (default 8192).")
+    parser.add_argument(
+        "--response-wait", type=float, default=DEFAULT_RESPONSE_WAIT,
+        help=f"Seconds a recorded response waits for its request (default {DEFAULT_RESPONSE_WAIT:g}, 0 = don't wait).",
+    )
+    parser.add_argument(
+        "--signal", action="append", default=[], metavar="PAIR",
+        help="Once the symbol list is in, analyse PAIR from the recorded trendbars and report bar → signal time. Repeatable.",
+    )
+    parser.add_argument("--timeframe", choices=("1m", "5m"), default="5m", help="Signal timeframe for --signal (default 5m).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    import ctrader
+    import ml_models
+    from spotware_connect import SpotwareConnect
+    from state import app_state
+
+    client = ReplayClient(args.frames, speed=args.speed, chunk_size=args.chunk_size, response_wait=args.response_wait)
+    connect = SpotwareConnect("replay", "replay", client_factory=lambda host, port: client)
+    app_state.client = connect
+    ctrader._wire_session(connect)
+
+    listener = _PriceListener()
+    app_state.register_sse_listener("price", listener)
+
+    signals = defer.Deferred()
+    if args.signal:
+        ml_models.load_models()
+
+        def _start_signals():
+            if not app_state.SYMBOLS_LOADED:
+                reactor.callLater(0.1, _start_signals)
+                return
+            measured = [measure_signal(client, pair, args.timeframe) for pair in args.signal]
+            defer.gatherResults(measured).chainDeferred(signals)
+
+        connect.on("ready", lambda: reactor.callLater(0, _start_signals))
+    else:
+        signals.callback([])
+
+    def _report(results):
+        stats, measured = results
+        print(f"{stats['frames']} frames, {stats['bytes']} bytes, {stats['reads']} reads in {stats['seconds']}s")
+        print(f"frames/s:            {stats['frames_per_second']}")
+        print(f"price SSE events:    {listener.events} ({listener.bytes} bytes)")
+        print(f"live prices:         {app_state.live_price_count()}")
+        # Поточні лічильники: запити --signal могли отримати відповіді вже після кінця запису.
+        print(f"responses matched:   {client.stats['responses_matched']} (unclaimed {client.stats['responses_unclaimed']})")
+        print(f"responses waited:    {stats['responses_waited']} (timed out {stats['response_wait_timeouts']})")
+        for result in measured:
+            if "error" in result:
+                print(f"bar → signal {result['pair']:<10} {result['error']}")
+            else:
+                print(f"bar → signal {result['pair']:<10} {result['bar_to_signal_ms']} ms ({result['verdict']})")
+
+    def _stop(outcome):
+        reactor.stop()
+        return outcome
+
+    done = defer.gatherResults([client.done, signals], consumeErrors=True)
+    done.addCallback(_report)
+    done.addErrback(lambda failure: logger.error("Відтворення не вдалося: %s", failure.getErrorMessage()))
+    done.addBoth(_stop)
+    reactor.callWhenRunning(connect.start)
+    reactor.run()
+
+
+if __name__ == "__main__":
+    main()
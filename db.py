@@ -1,27 +1,57 @@
 ﻿# db.py
+import csv
 import logging
 import threading
+import time
+import uuid
+from collections import OrderedDict
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 
 from sqlalchemy import (
     Boolean,
     Column,
+    Date,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
+    and_,
+    bindparam,
+    case,
+    cast,
     create_engine,
     event,
     func,
     inspect,
+    literal_column,
+    or_,
+    select,
     text,
 )
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
-from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
-
-from config import DEV_USER_ID, SUBSCRIPTION_DAYS, TRIAL_HOURS, get_database_url
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.orm import Session, declarative_base, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from config import (
+    DB_POOL_MAX_OVERFLOW,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    DEV_USER_ID,
+    RUNTIME_SETTINGS_MAX_AGE_SECONDS,
+    SUBSCRIPTION_DAYS,
+    TRIAL_HOURS,
+    USER_CACHE_MAX_ENTRIES,
+    get_database_url,
+)
 from session_times import DEFAULT_TIMEZONE, normalize_timezone
 
 logger = logging.getLogger(__name__)
@@ -125,6 +155,36 @@ class SignalOutcome(Base):
     # 'pending' | 'up' | 'down' | 'flat' (legacy rows may still have 'tp' | 'sl' | 'timeout')
     outcome = Column(String(16), nullable=False, default="pending", index=True)
 
+    # Covers the stats/score-breakdown GROUP BY queries: range on entry_ts,
+    # then outcome/pair/timeframe straight from the index.
+    __table_args__ = (
+        Index("ix_signal_outcomes_stats", "entry_ts", "outcome", "pair", "timeframe"),
+    )
+
+
+class SignalOutcomeRollup(Base):
+    """Per-day counters over signal_outcomes, kept in step by
+    create_signal_outcome/resolve_signal_outcome so stats read a few hundred
+    rows instead of scanning every outcome. score_bucket is the normalized
+    score (see _normalized_score_expression) floored to
+    SIGNAL_OUTCOME_ROLLUP_BUCKET, or -1 when the signal had no score.
+    source separates live rows from the archived legacy CSV import, which
+    stats never include (see the 2026-08-10 note on SignalOutcome)."""
+    __tablename__ = "signal_outcome_rollups"
+
+    day = Column(Date, primary_key=True)
+    pair = Column(String, primary_key=True)
+    timeframe = Column(String(8), primary_key=True)
+    verdict = Column(String(8), primary_key=True)
+    score_bucket = Column(Integer, primary_key=True)
+    source = Column(String(16), primary_key=True, default="live")
+    total = Column(Integer, nullable=False, default=0)
+    pending = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    flats = Column(Integer, nullable=False, default=0)
+    legacy = Column(Integer, nullable=False, default=0)
+
 
 class AutoTrade(Base):
     __tablename__ = "auto_trades"
@@ -289,20 +349,106 @@ def _is_sqlite_url(url: str) -> bool:
     return url.startswith("sqlite:")
 
 
-def _build_engine(url: str):
-    kwargs = {
-        "pool_pre_ping": True,
-        "pool_recycle": 3600,
-        "future": True,
-    }
+def _is_sqlite_memory_url(url: str) -> bool:
+    return _is_sqlite_url(url) and make_url(url).database in (None, "", ":memory:")
+
+
+class _PoolStats:
+    """Checkout counters and time spent waiting for a pooled connection,
+    reported under "db_pool" in /api/diagnostics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.waits = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.timeouts = 0
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def record_wait(self, seconds: float, *, timed_out: bool = False) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / self.waits, 3) if self.waits else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "timeouts": self.timeouts,
+            }
+
+
+_pool_stats = _PoolStats()
+
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waited for a free
+    connection (including a pool_timeout that ran out)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except SQLAlchemyTimeoutError:
+            _pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        _pool_stats.record_wait(time.perf_counter() - started)
+        return connection
 
+
+def _engine_options(url: str) -> dict:
+    """Per-backend engine kwargs.
+
+    SQLite is a local file: no pre-ping round-trip and no recycling, but a
+    real QueuePool sized to the thread pools. In-memory SQLite keeps
+    SQLAlchemy's own single-connection pool. Network databases get
+    pre-ping (Fly Postgres drops idle connections) plus recycling."""
     if _is_sqlite_url(url):
-        kwargs["connect_args"] = {
-            "check_same_thread": False,
-            "timeout": 30,
+        options = {
+            "future": True,
+            "connect_args": {
+                "check_same_thread": False,
+                "timeout": 30,
+            },
         }
+        if _is_sqlite_memory_url(url):
+            return options
+        options.update(
+            poolclass=_TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_POOL_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+        )
+        return options
 
-    return create_engine(url, **kwargs)
+    return {
+        "future": True,
+        "poolclass": _TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True,
+    }
+
+
+def _build_engine(url: str):
+    sqlalchemy_engine = create_engine(url, **_engine_options(url))
+    event.listen(sqlalchemy_engine, "checkout", lambda *args: _pool_stats.record_checkout())
+    return sqlalchemy_engine
 
 
 def _configure_sqlite_pragmas(sqlalchemy_engine) -> None:
@@ -319,12 +465,27 @@ def _configure_sqlite_pragmas(sqlalchemy_engine) -> None:
             cursor.close()
 
 
-if not DATABASE_URL:
-    logger.critical("DATABASE_URL is not set.")
-else:
+def configure_database(url: str | None) -> bool:
+    """(Re)creates the module engine and session registry for `url`. Runs
+    at import for DATABASE_URL; scripts can call it again to point db.py at
+    another database."""
+    global engine, SessionLocal
+
+    if SessionLocal is not None:
+        SessionLocal.remove()
+    if engine is not None:
+        engine.dispose()
+    engine = None
+    SessionLocal = None
+    _pool_stats.reset()
+
+    if not url:
+        logger.critical("DATABASE_URL is not set.")
+        return False
+
     try:
-        engine = _build_engine(DATABASE_URL)
-        if _is_sqlite_url(DATABASE_URL):
+        engine = _build_engine(url)
+        if _is_sqlite_url(url):
             _configure_sqlite_pragmas(engine)
 
         SessionLocal = scoped_session(
@@ -337,10 +498,64 @@ else:
             )
         )
         logger.info("Database engine initialized.")
+        return True
     except Exception as e:
         logger.critical(f"Failed to create database engine: {e}", exc_info=True)
         engine = None
         SessionLocal = None
+        return False
+
+
+def get_pool_stats() -> dict:
+    stats = _pool_stats.snapshot()
+    pool = getattr(engine, "pool", None)
+    stats["pool_class"] = type(pool).__name__ if pool is not None else None
+    stats["pre_ping"] = bool(getattr(pool, "_pre_ping", False))
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    return stats
+
+
+configure_database(DATABASE_URL)
+
+
+# A unit of work keeps one scoped session for a whole Flask request or
+# background job, so consecutive helpers share it (and whatever it already
+# loaded) instead of building and tearing down a session per call.
+_unit_of_work = threading.local()
+
+
+def _in_unit_of_work() -> bool:
+    return getattr(_unit_of_work, "depth", 0) > 0
+
+
+def begin_unit_of_work() -> None:
+    _unit_of_work.depth = getattr(_unit_of_work, "depth", 0) + 1
+
+
+def end_unit_of_work() -> None:
+    depth = max(0, getattr(_unit_of_work, "depth", 0) - 1)
+    _unit_of_work.depth = depth
+    if depth == 0 and SessionLocal is not None:
+        SessionLocal.remove()
+
+
+@contextmanager
+def unit_of_work():
+    begin_unit_of_work()
+    try:
+        yield
+    finally:
+        end_unit_of_work()
+
+
+def _release_session(session) -> None:
+    if _in_unit_of_work():
+        return
+    try:
+        session.close()
+    finally:
+        SessionLocal.remove()
 
 
 @contextmanager
@@ -353,10 +568,7 @@ def get_db():
     try:
         yield session
     finally:
-        try:
-            session.close()
-        finally:
-            SessionLocal.remove()
+        _release_session(session)
 
 
 @contextmanager
@@ -373,10 +585,7 @@ def session_scope():
         session.rollback()
         raise
     finally:
-        try:
-            session.close()
-        finally:
-            SessionLocal.remove()
+        _release_session(session)
 
 
 def initialize_database():
@@ -388,6 +597,7 @@ def initialize_database():
         Base.metadata.create_all(bind=engine)
         _ensure_user_columns()
         _ensure_signal_outcome_columns()
+        _ensure_signal_outcome_indexes()
         _ensure_binomo_trade_fk()
         logger.info("Database initialization complete.")
     except Exception as e:
@@ -454,6 +664,18 @@ def _ensure_signal_outcome_columns() -> None:
 _BINOMO_SIGNAL_OUTCOME_FK = "fk_binomo_trades_signal_outcome_id"
 
 
+def _ensure_signal_outcome_indexes() -> None:
+    """create_all() only builds indexes together with a new table, so an
+    existing signal_outcomes table needs the composite stats index added
+    separately."""
+    try:
+        for index in SignalOutcome.__table__.indexes:
+            if index.name == "ix_signal_outcomes_stats":
+                index.create(bind=engine, checkfirst=True)
+    except Exception:
+        logger.exception("Could not ensure signal_outcomes indexes")
+
+
 def _ensure_binomo_trade_fk() -> None:
     """Adds the binomo_trades.signal_outcome_id -> signal_outcomes.id foreign
     key to tables created before it existed. create_all() only creates whole
@@ -493,43 +715,155 @@ def _ensure_binomo_trade_fk() -> None:
         logger.exception("Could not ensure binomo_trades foreign key")
 
 
-def _set_runtime_setting(session, key: str, value: str | None) -> None:
+def _put_runtime_setting_row(session, key: str, value: str | None) -> AppRuntimeSetting:
     row = session.query(AppRuntimeSetting).filter(AppRuntimeSetting.key == key).first()
     if row is None:
         row = AppRuntimeSetting(key=key)
         session.add(row)
     row.value = value
     row.updated_at = _utcnow()
+    return row
 
 
-def _get_runtime_setting(session, key: str) -> str | None:
-    row = session.query(AppRuntimeSetting).filter(AppRuntimeSetting.key == key).first()
-    return None if row is None else row.value
+def _set_runtime_setting(session, key: str, value: str | None) -> None:
+    """Writes one setting and bumps the shared settings version in the same
+    transaction, so every process's runtime-settings cache reloads."""
+    _put_runtime_setting_row(session, key, value)
+    # One version row per transaction (autoflush is off, so a second lookup
+    # wouldn't see the first, still-pending insert).
+    version_row = session.info.get("runtime_settings_version_row")
+    if version_row is None:
+        version_row = _put_runtime_setting_row(session, _RUNTIME_SETTINGS_VERSION_KEY, None)
+        session.info["runtime_settings_version_row"] = version_row
+    version_row.value = uuid.uuid4().hex
+
+
+_RUNTIME_SETTING_VALUE = (
+    select(AppRuntimeSetting.__table__.c.value)
+    .where(AppRuntimeSetting.__table__.c.key == bindparam("key"))
+)
 
 
-def get_ctrader_token_bundle() -> dict | None:
+def _get_runtime_setting(session, key: str) -> str | None:
+    return session.execute(_RUNTIME_SETTING_VALUE, {"key": key}).scalar()
+
+
+# Any write through _set_runtime_setting stores a fresh random token under
+# this key, so "did anything change?" is one primary-key lookup. The Binomo
+# executor is a separate process, which is why this lives in the table and
+# not in memory.
+_RUNTIME_SETTINGS_VERSION_KEY = "runtime_settings_version"
+_RUNTIME_SETTINGS_ALL = select(AppRuntimeSetting.__table__.c.key, AppRuntimeSetting.__table__.c.value)
+_UNLOADED = object()
+
+
+class _RuntimeSettingsCache:
+    """All AppRuntimeSetting rows held in memory. A read re-checks the
+    version row at most every `max_age` seconds and reloads everything only
+    when it changed; commits from this process invalidate immediately, so
+    only another process's writes can be up to `max_age` late."""
+
+    def __init__(self, max_age: float = RUNTIME_SETTINGS_MAX_AGE_SECONDS):
+        self.max_age = max(0.0, float(max_age))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values: dict[str, str | None] = {}
+            self._version = _UNLOADED
+            self._checked_at = 0.0
+            self._generation = 0
+            self.version_checks = 0
+            self.reloads = 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._checked_at = 0.0
+            self._generation += 1
+
+    def get_many(self, session, keys: tuple[str, ...]) -> dict[str, str | None]:
+        with self._lock:
+            fresh = self._version is not _UNLOADED and time.monotonic() - self._checked_at < self.max_age
+            if fresh:
+                return {key: self._values.get(key) for key in keys}
+
+        checked_at = time.monotonic()
+        with self._lock:
+            generation = self._generation
+        version = _get_runtime_setting(session, _RUNTIME_SETTINGS_VERSION_KEY)
+        with self._lock:
+            self.version_checks += 1
+            reload_needed = self._version is _UNLOADED or version != self._version
+        values = dict(session.execute(_RUNTIME_SETTINGS_ALL).all()) if reload_needed else None
+
+        with self._lock:
+            if values is not None:
+                self._values = values
+                self._version = version
+                self.reloads += 1
+            # A commit that landed while we were reading leaves the entry
+            # due for another check instead of marking stale data fresh.
+            if generation == self._generation:
+                self._checked_at = checked_at
+            if values is not None:
+                return {key: values.get(key) for key in keys}
+            return {key: self._values.get(key) for key in keys}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._values), "version_checks": self.version_checks, "reloads": self.reloads}
+
+
+_runtime_settings_cache = _RuntimeSettingsCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_runtime_settings_after_commit(session) -> None:
+    if session.info.pop("runtime_settings_version_row", None) is not None:
+        _runtime_settings_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_runtime_settings_change(session) -> None:
+    session.info.pop("runtime_settings_version_row", None)
+
+
+def get_runtime_settings(*keys: str) -> dict[str, str | None] | None:
+    """Cached read of several runtime settings; None when the DB is
+    unavailable."""
     try:
-        with get_db() as db:
-            if db is None:
+        with get_db() as session:
+            if session is None:
                 return None
+            return _runtime_settings_cache.get_many(session, keys)
+    except SQLAlchemyError:
+        logger.exception("Error loading runtime settings %s", keys)
+        return None
 
-            access_token = _get_runtime_setting(db, "ctrader_access_token")
-            refresh_token = _get_runtime_setting(db, "ctrader_refresh_token")
-            expires_at_raw = _get_runtime_setting(db, "ctrader_access_token_expires_at")
-            expires_at = _normalize_datetime(expires_at_raw)
 
-            if not access_token and not refresh_token:
-                return None
+def get_runtime_settings_cache_stats() -> dict:
+    return _runtime_settings_cache.stats()
 
-            return {
-                "access_token": access_token,
-                "refresh_token": refresh_token,
-                "expires_at": expires_at,
-            }
-    except SQLAlchemyError:
-        logger.exception("Error loading persisted cTrader token bundle")
+
+def get_ctrader_token_bundle() -> dict | None:
+    settings = get_runtime_settings(
+        "ctrader_access_token", "ctrader_refresh_token", "ctrader_access_token_expires_at"
+    )
+    if settings is None:
         return None
 
+    access_token = settings["ctrader_access_token"]
+    refresh_token = settings["ctrader_refresh_token"]
+    if not access_token and not refresh_token:
+        return None
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "expires_at": _normalize_datetime(settings["ctrader_access_token_expires_at"]),
+    }
+
 
 def persist_ctrader_token_bundle(
     *,
@@ -747,10 +1081,102 @@ def _fallback_remove_watchlist(user_id: int, pair: str) -> bool:
     return True
 
 
+# ----------------------------------------------------------------------
+# Per-user read-through caches
+# ----------------------------------------------------------------------
+
+
+class _UserLruCache:
+    """Bounded LRU keyed by user id. Readers fill it on a miss; every write
+    path for the cached data invalidates (or overwrites) the entry, so it
+    never needs a TTL.
+
+    `version` guards against a fill racing an invalidation: a reader
+    snapshots it before querying and put() drops the value if any
+    invalidation happened in between."""
+
+    def __init__(self, name: str, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int):
+        with self._lock:
+            value = self._items.get(int(user_id))
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(int(user_id))
+            self.hits += 1
+            return value
+
+    def put(self, user_id: int, value, *, version: int | None = None) -> None:
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._items[int(user_id)] = value
+            self._items.move_to_end(int(user_id))
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self.version += 1
+            self._items.pop(int(user_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# Watchlist as a sorted tuple (DB rows merged with the in-memory fallback).
+_watchlist_cache = _UserLruCache("watchlist")
+# (language, timezone) — written through from every user status update.
+_user_settings_cache = _UserLruCache("user_settings")
+
+
+def get_user_cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in (_watchlist_cache, _user_settings_cache)}
+
+
+def clear_user_caches() -> None:
+    _watchlist_cache.clear()
+    _user_settings_cache.clear()
+
+
+def get_watchlist_version() -> int:
+    """Bumped by every watchlist write in this process (cheap ETag input)."""
+    return _watchlist_cache.version
+
+
 def get_watchlist(user_id: int) -> list[str]:
     if not user_id:
         return []
 
+    cached = _watchlist_cache.get(user_id)
+    if cached is not None:
+        return list(cached)
+    version = _watchlist_cache.version
+
     try:
         with get_db() as db:
             if db is None:
@@ -766,6 +1192,7 @@ def get_watchlist(user_id: int) -> list[str]:
             fallback_pairs = _fallback_get_watchlist(user_id)
             if fallback_pairs:
                 pairs = sorted(set(pairs) | set(fallback_pairs))
+            _watchlist_cache.put(user_id, tuple(pairs), version=version)
             return pairs
     except SQLAlchemyError:
         logger.exception("Error loading watchlist")
@@ -776,25 +1203,7 @@ def is_in_watchlist(user_id: int, pair: str) -> bool:
     if not user_id or not pair:
         return False
 
-    pair = pair.strip().upper()
-
-    try:
-        with get_db() as db:
-            if db is None:
-                return False
-
-            row = (
-                db.query(UserWatchlist)
-                .filter(
-                    UserWatchlist.user_id == int(user_id),
-                    UserWatchlist.pair == pair,
-                )
-                .first()
-            )
-            return row is not None
-    except SQLAlchemyError:
-        logger.exception("Error checking watchlist membership")
-        return False
+    return pair.strip().upper() in get_watchlist(user_id)
 
 
 def check_database_status() -> dict:
@@ -826,15 +1235,29 @@ def check_database_status() -> dict:
         }
 
 
-def get_user_language(user_id: int) -> str | None:
+def _get_user_settings(user_id: int) -> tuple[str | None, str | None]:
+    if not user_id:
+        return None, None
+
+    cached = _user_settings_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    # Fills the settings cache through _cache_user_status().
     status = get_cached_user_status(user_id)
-    return status.get("language") if status else None
+    if not status:
+        return None, None
+    return status.get("language"), status.get("timezone")
+
+
+def get_user_language(user_id: int) -> str | None:
+    return _get_user_settings(user_id)[0]
 
 
 def get_user_timezone(user_id: int) -> str:
-    status = get_cached_user_status(user_id)
-    if status and status.get("timezone"):
-        return _normalize_timezone(status.get("timezone"))
+    timezone_name = _get_user_settings(user_id)[1]
+    if timezone_name:
+        return _normalize_timezone(timezone_name)
     return DEFAULT_TIMEZONE
 
 
@@ -930,6 +1353,7 @@ def _get_or_create_user_row(db, user_id: int, language: str | None = None) -> Us
 def _cache_user_status(user_id: int, status: dict | None) -> dict | None:
     if not user_id or not status:
         return status
+    _user_settings_cache.put(user_id, (status.get("language"), status.get("timezone")))
     try:
         from state import app_state
         return app_state.set_cached_user_status(user_id, status)
@@ -939,6 +1363,8 @@ def _cache_user_status(user_id: int, status: dict | None) -> dict | None:
 
 
 def invalidate_user_status_cache(user_id: int) -> None:
+    if user_id:
+        _user_settings_cache.invalidate(user_id)
     try:
         from state import app_state
         app_state.invalidate_user_status(user_id)
@@ -1222,22 +1648,11 @@ def expire_user_access_if_needed(user_id: int, *, notify: bool = True, language_
                         _fallback_user_profiles[int(user_id)] = dict(status)
                 _cache_user_status(user_id, status)
                 if notify and expired_trial_at:
-                    _notify_subscription_event(
-                        f"⏱ Демо завершилося\nuser_id: {user_id}\nбуло до: {_dt_to_iso(expired_trial_at)}",
-                        key=f"trial_expired_{user_id}",
-                    )
+                    _notify_trial_expired(user_id, expired_trial_at)
                 return status
 
             user = _get_or_create_user_row(db, user_id, language=language_hint)
-            current_status = _normalize_subscription_status(getattr(user, "subscription_status", None))
-            end_at = _normalize_datetime(getattr(user, "subscription_end_date", None) or getattr(user, "subscription_ends_at", None))
-            if current_status in {"trial", "active"} and end_at and end_at <= _utcnow():
-                if current_status == "trial":
-                    expired_trial_at = end_at
-                user.subscription_status = "free"
-                user.plan_type = "free"
-                user.subscription_ends_at = None
-                user.subscription_end_date = end_at
+            _, expired_trial_at = _expire_user_row(user)
             status = _user_to_status(user)
     except SQLAlchemyError:
         logger.exception("Error expiring user access for user_id=%s", user_id)
@@ -1245,13 +1660,33 @@ def expire_user_access_if_needed(user_id: int, *, notify: bool = True, language_
 
     _cache_user_status(user_id, status)
     if notify and expired_trial_at:
-        _notify_subscription_event(
-            f"⏱ Демо завершилося\nuser_id: {user_id}\nбуло до: {_dt_to_iso(expired_trial_at)}",
-            key=f"trial_expired_{user_id}",
-        )
+        _notify_trial_expired(user_id, expired_trial_at)
     return status
 
 
+def _expire_user_row(user: User, now: datetime | None = None) -> tuple[bool, datetime | None]:
+    """Downgrades a lapsed trial/subscription on the ORM row in place.
+    Returns (changed, trial_end) — trial_end is set only for an expired
+    trial, which is the case that gets an admin notification."""
+    current_status = _normalize_subscription_status(getattr(user, "subscription_status", None))
+    end_at = _normalize_datetime(getattr(user, "subscription_end_date", None) or getattr(user, "subscription_ends_at", None))
+    if current_status not in {"trial", "active"} or not end_at or end_at > (now or _utcnow()):
+        return False, None
+
+    user.subscription_status = "free"
+    user.plan_type = "free"
+    user.subscription_ends_at = None
+    user.subscription_end_date = end_at
+    return True, end_at if current_status == "trial" else None
+
+
+def _notify_trial_expired(user_id: int, trial_end: datetime) -> None:
+    _notify_subscription_event(
+        f"⏱ Демо завершилося\nuser_id: {user_id}\nбуло до: {_dt_to_iso(trial_end)}",
+        key=f"trial_expired_{user_id}",
+    )
+
+
 def get_user_access_status(user_id: int, *, language_hint: str | None = None, notify_expired: bool = True) -> dict | None:
     status = expire_user_access_if_needed(user_id, notify=notify_expired, language_hint=language_hint)
     if not status:
@@ -1304,20 +1739,62 @@ def notify_new_user_once(user_id: int, *, language_hint: str | None = None) -> N
         )
 
 
+_USER_STATUS_REFRESH_CHUNK = 500
+
+
 def refresh_cached_user_statuses() -> None:
+    """Reloads every cached user in one session with chunked
+    `user_id IN (...)` queries and applies expiry in memory. Only rows whose
+    access actually lapsed are dirtied, so the commit writes just those, and
+    only expired trials trigger a notification."""
     try:
         from state import app_state
-        user_ids = app_state.get_cached_user_status_ids()
+        user_ids = sorted({int(user_id) for user_id in app_state.get_cached_user_status_ids() if user_id})
     except Exception:
         logger.debug("Could not list cached user statuses", exc_info=True)
         return
 
-    for user_id in user_ids:
-        try:
-            status = get_user_status(user_id)
-            _cache_user_status(user_id, status)
-        except Exception:
-            logger.exception("Could not refresh cached user status for user_id=%s", user_id)
+    if not user_ids:
+        return
+
+    statuses: dict[int, dict] = {}
+    expired: list[int] = []
+    expired_trials: list[tuple[int, datetime]] = []
+    now = _utcnow()
+
+    try:
+        with session_scope() as db:
+            if db is None:
+                return
+
+            for start in range(0, len(user_ids), _USER_STATUS_REFRESH_CHUNK):
+                chunk = user_ids[start:start + _USER_STATUS_REFRESH_CHUNK]
+                for user in db.query(User).filter(User.user_id.in_(chunk)):
+                    if not is_admin_user(user.user_id):
+                        changed, trial_end = _expire_user_row(user, now)
+                        if changed:
+                            expired.append(user.user_id)
+                        if trial_end:
+                            expired_trials.append((user.user_id, trial_end))
+                    statuses[user.user_id] = _user_to_status(user)
+    except SQLAlchemyError:
+        logger.exception("Could not refresh cached user statuses")
+        return
+
+    with _fallback_lock:
+        for user_id, status in statuses.items():
+            _fallback_user_profiles[user_id] = dict(status)
+            _fallback_user_languages[user_id] = status.get("language") or "en"
+            _fallback_user_timezones[user_id] = status.get("timezone") or DEFAULT_TIMEZONE
+
+    for user_id, status in statuses.items():
+        _cache_user_status(user_id, status)
+
+    for user_id, trial_end in expired_trials:
+        _notify_trial_expired(user_id, trial_end)
+
+    if expired:
+        logger.info(f"Доступ завершився для {len(expired)} користувачів: {expired[:20]}")
 
 
 def list_users(limit: int = 100, plan_type: str | None = None) -> list[dict]:
@@ -1375,6 +1852,8 @@ def add_to_watchlist(user_id: int, pair: str) -> bool:
     except SQLAlchemyError:
         logger.exception("Error adding to watchlist")
         return False
+    finally:
+        _watchlist_cache.invalidate(user_id)
 
 
 def remove_from_watchlist(user_id: int, pair: str) -> bool:
@@ -1408,6 +1887,8 @@ def remove_from_watchlist(user_id: int, pair: str) -> bool:
     except SQLAlchemyError:
         logger.exception("Error removing from watchlist")
         return False
+    finally:
+        _watchlist_cache.invalidate(user_id)
 
 
 def toggle_watchlist(user_id: int, pair: str) -> bool:
@@ -1447,6 +1928,8 @@ def toggle_watchlist(user_id: int, pair: str) -> bool:
     except SQLAlchemyError:
         logger.exception("Error toggling watchlist")
         return False
+    finally:
+        _watchlist_cache.invalidate(user_id)
 
 
 # ----------------------------------------------------------------------
@@ -1463,34 +1946,128 @@ def create_signal_outcome(
     entry_price: float,
     horizon_seconds: int,
 ) -> int | None:
+    return create_signal_outcomes(
+        [
+            {
+                "pair": pair,
+                "timeframe": timeframe,
+                "verdict": verdict,
+                "score": score,
+                "entry_price": entry_price,
+                "horizon_seconds": horizon_seconds,
+            }
+        ]
+    )[0]
+
+
+def _signal_outcome_row(item: dict, entry_ts: datetime) -> SignalOutcome:
+    return SignalOutcome(
+        pair=(item.get("pair") or "").strip().upper(),
+        timeframe=(item.get("timeframe") or "").strip(),
+        verdict=(item.get("verdict") or "").strip().upper(),
+        score=int(item["score"]) if isinstance(item.get("score"), (int, float)) else None,
+        entry_price=float(item["entry_price"]),
+        entry_ts=item.get("entry_ts") or entry_ts,
+        horizon_seconds=int(item["horizon_seconds"]),
+        outcome="pending",
+    )
+
+
+def create_signal_outcomes(items: list[dict]) -> list[int | None]:
+    """Inserts a batch of pending outcomes (create_signal_outcome kwargs per
+    item) with one flush and one commit, bumping each rollup key once.
+    Returns ids in input order. An item that can't become a row gets None
+    without touching the rest; if the batch insert itself fails, the rows
+    are retried one by one so only the offending row is lost."""
+    if not items:
+        return []
+
+    # entry_ts is set here rather than via server_default so the rollup day
+    # is known without re-reading the rows.
+    entry_ts = _utcnow()
+    rows: list[SignalOutcome | None] = []
+    for item in items:
+        try:
+            rows.append(_signal_outcome_row(item, entry_ts))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            logger.warning("Skipping invalid signal outcome item: %r", item, exc_info=True)
+            rows.append(None)
+
+    valid = [row for row in rows if row is not None]
+    if not valid:
+        return [None] * len(items)
+
     try:
         with session_scope() as session:
             if session is None:
                 logger.debug("Signal outcome tracking skipped: no database engine")
-                return None
+                return [None] * len(items)
 
-            row = SignalOutcome(
-                pair=(pair or "").strip().upper(),
-                timeframe=(timeframe or "").strip(),
-                verdict=(verdict or "").strip().upper(),
-                score=int(score) if isinstance(score, (int, float)) else None,
-                entry_price=float(entry_price),
-                horizon_seconds=int(horizon_seconds),
-                outcome="pending",
-            )
-            session.add(row)
+            session.add_all(valid)
             session.flush()
-            return row.id
+
+            deltas: dict[tuple, int] = {}
+            for row in valid:
+                key = tuple(_rollup_key(row).items())
+                deltas[key] = deltas.get(key, 0) + 1
+            for key, count in deltas.items():
+                _upsert_signal_outcome_rollup(session, dict(key), {"total": count, "pending": count})
+
+            return [row.id if row is not None else None for row in rows]
     except SQLAlchemyError:
-        logger.exception("Error creating signal outcome for pair=%s", pair)
-        return None
+        logger.exception("Error creating %s signal outcome(s)", len(valid))
+
+    if len(valid) == 1:
+        return [None] * len(items)
+
+    logger.warning("Retrying %s signal outcome(s) one by one", len(valid))
+    return [
+        create_signal_outcomes([item])[0] if row is not None else None
+        for item, row in zip(items, rows)
+    ]
+
+
+# Hot read paths below select plain columns from the tables (Core) rather
+# than ORM entities: no identity map or attribute instrumentation, and the
+# module-level statements hit SQLAlchemy's compiled cache on every call.
+_PENDING_SIGNAL_OUTCOMES = (
+    select(
+        SignalOutcome.__table__.c.id,
+        SignalOutcome.__table__.c.pair,
+        SignalOutcome.__table__.c.timeframe,
+        SignalOutcome.__table__.c.verdict,
+        SignalOutcome.__table__.c.entry_price,
+        SignalOutcome.__table__.c.horizon_seconds,
+        SignalOutcome.__table__.c.entry_ts,
+    )
+    .where(SignalOutcome.__table__.c.outcome == "pending")
+    .where(SignalOutcome.__table__.c.horizon_seconds.isnot(None))
+    .order_by(SignalOutcome.__table__.c.entry_ts.asc())
+)
+_PENDING_SIGNAL_OUTCOME_HORIZONS = (
+    select(SignalOutcome.__table__.c.horizon_seconds)
+    .where(SignalOutcome.__table__.c.outcome == "pending")
+    .where(SignalOutcome.__table__.c.horizon_seconds.isnot(None))
+    .distinct()
+)
+_PENDING_SIGNAL_OUTCOME_PAIRS = (
+    select(SignalOutcome.__table__.c.pair)
+    .where(SignalOutcome.__table__.c.outcome == "pending")
+    .where(SignalOutcome.__table__.c.horizon_seconds.isnot(None))
+    .distinct()
+)
 
 
-def get_pending_signal_outcomes(limit: int = 500) -> list[dict]:
+def get_pending_signal_outcomes(limit: int = 500, *, due_at: datetime | None = None) -> list[dict]:
     """Only returns horizon-based (new-style) pending rows. Legacy TP/SL
     rows from the previous tracking generation (horizon_seconds IS NULL)
     are left untouched — nothing resolves them anymore, but they're
-    harmless leftover history."""
+    harmless leftover history.
+
+    With due_at, only rows whose horizon has elapsed by then are returned.
+    The check stays in SQL without dialect-specific interval arithmetic:
+    there are only a handful of distinct horizons, so it becomes
+    OR(horizon = h AND entry_ts <= due_at - h) over them."""
     limit = max(1, min(int(limit or 500), 2000))
 
     try:
@@ -1498,50 +2075,419 @@ def get_pending_signal_outcomes(limit: int = 500) -> list[dict]:
             if session is None:
                 return []
 
+            query = _PENDING_SIGNAL_OUTCOMES
+
+            if due_at is not None:
+                horizons = session.execute(_PENDING_SIGNAL_OUTCOME_HORIZONS).scalars().all()
+                if not horizons:
+                    return []
+                table = SignalOutcome.__table__
+                query = query.where(
+                    or_(
+                        *(
+                            and_(
+                                table.c.horizon_seconds == h,
+                                table.c.entry_ts <= due_at - timedelta(seconds=h),
+                            )
+                            for h in horizons
+                        )
+                    )
+                )
+
+            rows = session.execute(query.limit(limit)).mappings().all()
+            return [dict(row) for row in rows]
+    except SQLAlchemyError:
+        logger.exception("Error loading pending signal outcomes")
+        return []
+
+
+def get_pending_signal_outcome_pairs() -> list[str]:
+    """Pairs that still need a live price to resolve a pending outcome."""
+    try:
+        with get_db() as session:
+            if session is None:
+                return []
+            return sorted(pair for pair in session.execute(_PENDING_SIGNAL_OUTCOME_PAIRS).scalars() if pair)
+    except SQLAlchemyError:
+        logger.exception("Error loading pending signal outcome pairs")
+        return []
+
+
+def resolve_signal_outcome(outcome_id: int, *, outcome: str, exit_price: float | None) -> bool:
+    return bool(resolve_signal_outcomes([(outcome_id, outcome, exit_price)]))
+
+
+def resolve_signal_outcomes(resolutions: list[tuple[int, str, float | None]]) -> list[int]:
+    """Resolves many pending outcomes in one transaction: one SELECT for the
+    rows still pending (needed for their rollup keys), one executemany
+    UPDATE guarded by outcome='pending', rollup deltas merged per key, and
+    a single commit. Returns the ids that were actually resolved.
+
+    Rollup deltas are applied only for rows this call's UPDATE changed: a
+    second resolver (another process, an overlapping loop) racing on the
+    same rows must not count them twice. The SELECT locks the rows where
+    the database supports FOR UPDATE; SQLite has no row locks and pysqlite
+    only opens the write transaction at the UPDATE, so there a short
+    rowcount means re-reading which rows carry this call's resolved_at."""
+    by_id = {int(outcome_id): (outcome, exit_price) for outcome_id, outcome, exit_price in resolutions}
+    if not by_id:
+        return []
+
+    try:
+        with session_scope() as session:
+            if session is None:
+                return []
+
             rows = (
                 session.query(SignalOutcome)
+                .filter(SignalOutcome.id.in_(list(by_id)))
                 .filter(SignalOutcome.outcome == "pending")
-                .filter(SignalOutcome.horizon_seconds.isnot(None))
-                .order_by(SignalOutcome.entry_ts.asc())
-                .limit(limit)
+                .with_for_update()
                 .all()
             )
-            return [
-                {
-                    "id": row.id,
-                    "pair": row.pair,
-                    "timeframe": row.timeframe,
-                    "verdict": row.verdict,
-                    "entry_price": row.entry_price,
-                    "horizon_seconds": row.horizon_seconds,
-                    "entry_ts": row.entry_ts,
+            if not rows:
+                return []
+
+            resolved_at = _utcnow()
+            table = SignalOutcome.__table__
+            result = session.execute(
+                table.update()
+                .where(table.c.id == bindparam("b_id"))
+                .where(table.c.outcome == "pending")
+                .values(
+                    outcome=bindparam("b_outcome"),
+                    exit_price=bindparam("b_exit_price"),
+                    resolved_at=resolved_at,
+                ),
+                [
+                    {"b_id": row.id, "b_outcome": by_id[row.id][0], "b_exit_price": by_id[row.id][1]}
+                    for row in rows
+                ],
+            )
+            if result.rowcount != len(rows):
+                # Частину рядків між SELECT і UPDATE закрив інший резолвер.
+                claimed = {
+                    row_id
+                    for (row_id,) in session.query(SignalOutcome.id)
+                    .filter(SignalOutcome.id.in_([row.id for row in rows]))
+                    .filter(SignalOutcome.resolved_at == resolved_at)
                 }
-                for row in rows
-            ]
+                logger.warning(
+                    "Signal outcome resolve race: %s of %s row(s) were resolved elsewhere",
+                    len(rows) - len(claimed),
+                    len(rows),
+                )
+                rows = [row for row in rows if row.id in claimed]
+
+            deltas: dict[tuple, dict[str, int]] = {}
+            for row in rows:
+                key = tuple(_rollup_key(row).items())
+                counters = deltas.setdefault(key, {"pending": 0})
+                counters["pending"] -= 1
+                counter = _rollup_counter(row.verdict, by_id[row.id][0])
+                counters[counter] = counters.get(counter, 0) + 1
+            for key, counters in deltas.items():
+                _upsert_signal_outcome_rollup(session, dict(key), counters)
+
+            return [row.id for row in rows]
     except SQLAlchemyError:
-        logger.exception("Error loading pending signal outcomes")
+        logger.exception("Error resolving %s signal outcome(s)", len(by_id))
         return []
 
 
-def resolve_signal_outcome(outcome_id: int, *, outcome: str, exit_price: float | None) -> bool:
+SIGNAL_OUTCOME_ROLLUP_BUCKET = 5
+_SIGNAL_OUTCOME_ROLLUP_COUNTERS = ("total", "pending", "wins", "losses", "flats", "legacy")
+_SIGNAL_OUTCOME_ROLLUP_MARKER = "signal_outcome_rollups_ready"
+# Date (UTC, ISO) before which signal_outcomes rows may have been moved to
+# the archive (signal_archive.py). Rollups for those days are the only live
+# copy of their counts, so a rebuild must leave them alone.
+_SIGNAL_OUTCOME_ARCHIVE_WATERMARK = "signal_outcomes_archived_before"
+
+
+def _rollup_counter(verdict: str | None, outcome: str | None) -> str:
+    """Which SignalOutcomeRollup counter a row with this outcome lands in —
+    the same classification _aggregate_signal_outcomes applies."""
+    if (verdict, outcome) in (("BUY", "up"), ("SELL", "down")):
+        return "wins"
+    if (verdict, outcome) in (("BUY", "down"), ("SELL", "up")):
+        return "losses"
+    if outcome == "flat":
+        return "flats"
+    if outcome in ("tp", "sl", "timeout"):
+        return "legacy"
+    return "pending"
+
+
+def _rollup_score_bucket(verdict: str | None, score: int | None) -> int:
+    if score is None:
+        return -1
+    # Same BUY-inverted normalization as _normalized_score_expression.
+    normalized = (100 - score) if verdict == "BUY" else score
+    return (normalized // SIGNAL_OUTCOME_ROLLUP_BUCKET) * SIGNAL_OUTCOME_ROLLUP_BUCKET
+
+
+def _rollup_key(row, source: str = "live") -> dict:
+    return {
+        "day": row.entry_ts.date(),
+        "pair": row.pair,
+        "timeframe": row.timeframe or "",
+        "verdict": row.verdict,
+        "score_bucket": _rollup_score_bucket(row.verdict, row.score),
+        "source": source,
+    }
+
+
+def _bump_signal_outcome_rollup(session, row, source: str = "live", **deltas: int) -> None:
+    _upsert_signal_outcome_rollup(session, _rollup_key(row, source), deltas)
+
+
+def _upsert_signal_outcome_rollup(session, key: dict, deltas: dict) -> None:
+    """Atomic increment: INSERT ... ON CONFLICT DO UPDATE where the dialect
+    has it (SQLite, PostgreSQL), read-modify-write elsewhere."""
+    values = {counter: int(deltas.get(counter, 0)) for counter in _SIGNAL_OUTCOME_ROLLUP_COUNTERS}
+    dialect = session.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        insert_fn = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert_fn(SignalOutcomeRollup).values(**key, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={
+                counter: getattr(SignalOutcomeRollup, counter) + getattr(stmt.excluded, counter)
+                for counter, delta in values.items()
+                if delta
+            },
+        )
+        session.execute(stmt)
+        return
+
+    existing = session.get(SignalOutcomeRollup, tuple(key.values()))
+    if existing is None:
+        session.add(SignalOutcomeRollup(**key, **values))
+        session.flush()
+        return
+    for counter, delta in values.items():
+        setattr(existing, counter, (getattr(existing, counter) or 0) + delta)
+
+
+def _signal_outcome_rollups_ready(session) -> bool:
+    return _get_runtime_setting(session, _SIGNAL_OUTCOME_ROLLUP_MARKER) == "1"
+
+
+def rebuild_signal_outcome_rollups() -> int | None:
+    """(Re)builds the live rollup rows from signal_outcomes in one
+    INSERT ... SELECT ... GROUP BY, then marks rollups as ready so stats
+    switch over to them. Days before the archive watermark are kept as
+    they are — their raw rows are no longer in the table. Returns the
+    number of rollup rows written."""
     try:
         with session_scope() as session:
             if session is None:
-                return False
+                return None
 
-            row = session.query(SignalOutcome).filter(SignalOutcome.id == outcome_id).first()
-            if row is None or row.outcome != "pending":
-                return False
+            watermark = _signal_outcome_archive_watermark(session)
 
-            row.outcome = outcome
-            row.exit_price = exit_price
-            row.resolved_at = _utcnow()
-            return True
+            if session.get_bind().dialect.name == "sqlite":
+                day = func.date(SignalOutcome.entry_ts)
+            else:
+                day = cast(SignalOutcome.entry_ts, Date)
+            score_bucket = case(
+                (SignalOutcome.score.is_(None), -1),
+                else_=(_normalized_score_expression() // SIGNAL_OUTCOME_ROLLUP_BUCKET) * SIGNAL_OUTCOME_ROLLUP_BUCKET,
+            )
+            count_columns = _signal_outcome_count_columns()
+            total, wins, losses, flats, legacy = count_columns
+            pending = func.count(SignalOutcome.id) - (
+                func.sum(case((_signal_outcome_win_condition(), 1), else_=0))
+                + func.sum(case((_signal_outcome_loss_condition(), 1), else_=0))
+                + func.sum(case((SignalOutcome.outcome == "flat", 1), else_=0))
+                + func.sum(case((SignalOutcome.outcome.in_(("tp", "sl", "timeout")), 1), else_=0))
+            )
+            timeframe = func.coalesce(SignalOutcome.timeframe, "")
+
+            grouped = (
+                session.query(
+                    day.label("day"),
+                    SignalOutcome.pair,
+                    timeframe.label("timeframe"),
+                    SignalOutcome.verdict,
+                    score_bucket.label("score_bucket"),
+                    literal_column("'live'").label("source"),
+                    total,
+                    pending.label("pending"),
+                    wins,
+                    losses,
+                    flats,
+                    legacy,
+                )
+                .group_by(day, SignalOutcome.pair, timeframe, SignalOutcome.verdict, score_bucket)
+            )
+
+            stale = session.query(SignalOutcomeRollup).filter(SignalOutcomeRollup.source == "live")
+            if watermark is not None:
+                grouped = grouped.filter(SignalOutcome.entry_ts >= datetime.combine(watermark, datetime.min.time()))
+                stale = stale.filter(SignalOutcomeRollup.day >= watermark)
+            stale.delete(synchronize_session=False)
+            result = session.execute(
+                SignalOutcomeRollup.__table__.insert().from_select(
+                    ["day", "pair", "timeframe", "verdict", "score_bucket", "source", *_SIGNAL_OUTCOME_ROLLUP_COUNTERS],
+                    grouped.statement,
+                )
+            )
+            _set_runtime_setting(session, _SIGNAL_OUTCOME_ROLLUP_MARKER, "1")
+            written = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else None
+            logger.info("Signal outcome rollups rebuilt (%s rows)", written)
+            return written
+    except SQLAlchemyError:
+        logger.exception("Error rebuilding signal outcome rollups")
+        return None
+
+
+def signal_outcome_rollups_ready() -> bool:
+    try:
+        with get_db() as session:
+            return session is not None and _signal_outcome_rollups_ready(session)
     except SQLAlchemyError:
-        logger.exception("Error resolving signal outcome id=%s", outcome_id)
+        logger.exception("Error checking signal outcome rollups")
         return False
 
 
+def _signal_outcome_archive_watermark(session):
+    raw = _get_runtime_setting(session, _SIGNAL_OUTCOME_ARCHIVE_WATERMARK)
+    try:
+        return datetime.fromisoformat(raw).date() if raw else None
+    except ValueError:
+        logger.warning("Invalid %s=%r ignored", _SIGNAL_OUTCOME_ARCHIVE_WATERMARK, raw)
+        return None
+
+
+# ----------------------------------------------------------------------
+# Archival of resolved rows (signal_archive.py writes the files)
+# ----------------------------------------------------------------------
+
+
+def _archivable_tables() -> dict:
+    """table name -> (table, timestamp column, "resolved" condition)."""
+    outcomes = SignalOutcome.__table__
+    binomo = BinomoTrade.__table__
+    auto = AutoTrade.__table__
+    return {
+        # Binomo trades go first: their FK to signal_outcomes is ON DELETE
+        # SET NULL, so archiving them before their signals keeps the link
+        # in the archived trade row.
+        "binomo_trades": (binomo, binomo.c.entry_ts, binomo.c.result != "pending"),
+        "auto_trades": (
+            auto,
+            auto.c.ts,
+            or_(auto.c.status.like("closed%"), auto.c.status == "error"),
+        ),
+        "signal_outcomes": (outcomes, outcomes.c.entry_ts, outcomes.c.outcome != "pending"),
+    }
+
+
+ARCHIVABLE_TABLES = tuple(_archivable_tables())
+
+
+def get_archivable_rows(table_name: str, cutoff: datetime, limit: int = 1000) -> list[dict]:
+    """Oldest resolved rows of `table_name` with a timestamp before
+    `cutoff`, as plain column dicts."""
+    table, ts_column, resolved = _archivable_tables()[table_name]
+    try:
+        with get_db() as session:
+            if session is None:
+                return []
+            rows = session.execute(
+                select(table).where(resolved).where(ts_column < cutoff).order_by(ts_column.asc()).limit(limit)
+            ).mappings().all()
+            return [dict(row) for row in rows]
+    except SQLAlchemyError:
+        logger.exception("Error loading archivable %s rows", table_name)
+        return []
+
+
+def delete_archived_rows(table_name: str, ids: list[int], cutoff: datetime) -> int:
+    """Deletes rows already written to the archive. The resolved/cutoff
+    guard is repeated so a row can never be removed unless it still
+    qualifies. For signal_outcomes the archive watermark moves up to
+    `cutoff` in the same transaction."""
+    if not ids:
+        return 0
+
+    table, ts_column, resolved = _archivable_tables()[table_name]
+    try:
+        with session_scope() as session:
+            if session is None:
+                return 0
+            result = session.execute(
+                table.delete().where(table.c.id.in_(ids)).where(resolved).where(ts_column < cutoff)
+            )
+            if table_name == "signal_outcomes":
+                current = _signal_outcome_archive_watermark(session)
+                if current is None or current < cutoff.date():
+                    _set_runtime_setting(session, _SIGNAL_OUTCOME_ARCHIVE_WATERMARK, cutoff.date().isoformat())
+            return result.rowcount or 0
+    except SQLAlchemyError:
+        logger.exception("Error deleting archived %s rows", table_name)
+        return 0
+
+
+def ensure_signal_outcome_rollups() -> None:
+    """Startup hook: backfills rollups once on a database that predates them."""
+    try:
+        with get_db() as session:
+            if session is None or _signal_outcome_rollups_ready(session):
+                return
+    except SQLAlchemyError:
+        logger.exception("Error checking signal outcome rollup state")
+        return
+
+    rebuild_signal_outcome_rollups()
+
+
+def import_legacy_signal_outcomes_csv(path: str) -> int | None:
+    """Loads an archived signal_outcomes CSV (e.g.
+    data/signal_outcomes_legacy_20260810.csv) into the rollups under
+    source='legacy_csv'. Kept apart from live counters so /api/stats and
+    /winrate keep reporting post-fix signals only. Re-running replaces the
+    previous import."""
+    counters: dict[tuple, dict[str, int]] = {}
+
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            entry_ts = _normalize_datetime(record.get("entry_ts"))
+            if entry_ts is None or not record.get("pair"):
+                continue
+            raw_score = (record.get("score") or "").strip()
+            view = SimpleNamespace(
+                entry_ts=entry_ts,
+                pair=record["pair"].strip().upper(),
+                timeframe=(record.get("timeframe") or "").strip(),
+                verdict=(record.get("verdict") or "").strip().upper(),
+                score=int(float(raw_score)) if raw_score else None,
+            )
+            key = tuple(_rollup_key(view, "legacy_csv").items())
+            bucket = counters.setdefault(key, {"total": 0})
+            bucket["total"] += 1
+            counter = _rollup_counter(view.verdict, (record.get("outcome") or "").strip())
+            bucket[counter] = bucket.get(counter, 0) + 1
+
+    try:
+        with session_scope() as session:
+            if session is None:
+                return None
+
+            session.query(SignalOutcomeRollup).filter(SignalOutcomeRollup.source == "legacy_csv").delete(
+                synchronize_session=False
+            )
+            for key, deltas in counters.items():
+                _upsert_signal_outcome_rollup(session, dict(key), deltas)
+            logger.info("Imported legacy signal outcomes from %s into %s rollup rows", path, len(counters))
+            return len(counters)
+    except SQLAlchemyError:
+        logger.exception("Error importing legacy signal outcomes from %s", path)
+        return None
+
+
 def _row_is_correct_direction(row) -> bool:
     return (row.verdict == "BUY" and row.outcome == "up") or (row.verdict == "SELL" and row.outcome == "down")
 
@@ -1557,16 +2503,23 @@ def _aggregate_signal_outcomes(rows: list) -> dict:
     (excluded from win_rate, like a push). Legacy tp/sl/timeout rows from
     the previous tracking generation are counted as resolved-but-excluded
     so they don't skew win_rate."""
-    wins = sum(1 for r in rows if _row_is_correct_direction(r))
-    losses = sum(1 for r in rows if _row_is_wrong_direction(r))
-    flats = sum(1 for r in rows if r.outcome == "flat")
-    legacy = sum(1 for r in rows if r.outcome in ("tp", "sl", "timeout"))
+    return _signal_outcome_counts(
+        total=len(rows),
+        wins=sum(1 for r in rows if _row_is_correct_direction(r)),
+        losses=sum(1 for r in rows if _row_is_wrong_direction(r)),
+        flats=sum(1 for r in rows if r.outcome == "flat"),
+        legacy=sum(1 for r in rows if r.outcome in ("tp", "sl", "timeout")),
+    )
+
+
+def _signal_outcome_counts(*, total: int, wins: int, losses: int, flats: int, legacy: int) -> dict:
+    total, wins, losses, flats, legacy = (int(v or 0) for v in (total, wins, losses, flats, legacy))
     resolved = wins + losses + flats + legacy
     decided = wins + losses
     return {
-        "total": len(rows),
+        "total": total,
         "resolved": resolved,
-        "pending": len(rows) - resolved,
+        "pending": total - resolved,
         "wins": wins,
         "losses": losses,
         "flats": flats,
@@ -1574,6 +2527,50 @@ def _aggregate_signal_outcomes(rows: list) -> dict:
     }
 
 
+def _signal_outcome_win_condition():
+    verdict, outcome = SignalOutcome.verdict, SignalOutcome.outcome
+    return or_(and_(verdict == "BUY", outcome == "up"), and_(verdict == "SELL", outcome == "down"))
+
+
+def _signal_outcome_loss_condition():
+    verdict, outcome = SignalOutcome.verdict, SignalOutcome.outcome
+    return or_(and_(verdict == "BUY", outcome == "down"), and_(verdict == "SELL", outcome == "up"))
+
+
+def _signal_outcome_count_columns() -> list:
+    """SQL twins of _row_is_correct_direction/_row_is_wrong_direction, so
+    GROUP BY queries return only the counters _signal_outcome_counts needs."""
+    outcome = SignalOutcome.outcome
+    return [
+        func.count(SignalOutcome.id).label("total"),
+        func.sum(case((_signal_outcome_win_condition(), 1), else_=0)).label("wins"),
+        func.sum(case((_signal_outcome_loss_condition(), 1), else_=0)).label("losses"),
+        func.sum(case((outcome == "flat", 1), else_=0)).label("flats"),
+        func.sum(case((outcome.in_(("tp", "sl", "timeout")), 1), else_=0)).label("legacy"),
+    ]
+
+
+def _counts_from_row(row) -> dict:
+    return _signal_outcome_counts(
+        total=row.total,
+        wins=row.wins,
+        losses=row.losses,
+        flats=row.flats,
+        legacy=row.legacy,
+    )
+
+
+def _merge_signal_outcome_counts(items: list[dict]) -> dict:
+    """Combines per-group aggregates; only total/wins/losses/flats/resolved
+    are additive, so win_rate and pending are recomputed."""
+    total = sum(item["total"] for item in items)
+    wins = sum(item["wins"] for item in items)
+    losses = sum(item["losses"] for item in items)
+    flats = sum(item["flats"] for item in items)
+    legacy = sum(item["resolved"] - item["wins"] - item["losses"] - item["flats"] for item in items)
+    return _signal_outcome_counts(total=total, wins=wins, losses=losses, flats=flats, legacy=legacy)
+
+
 def get_signal_outcome_stats(days: int = 7) -> dict:
     days = max(1, min(int(days or 7), 365))
     since = _utcnow() - timedelta(days=days)
@@ -1584,35 +2581,107 @@ def get_signal_outcome_stats(days: int = 7) -> dict:
             if session is None:
                 return empty
 
-            rows = session.query(SignalOutcome).filter(SignalOutcome.entry_ts >= since).all()
+            if _signal_outcome_rollups_ready(session):
+                # Day granularity: the first day of the window is counted
+                # whole rather than from the exact hour.
+                grouped = (
+                    session.query(SignalOutcomeRollup.pair, SignalOutcomeRollup.timeframe, *_rollup_sum_columns())
+                    .filter(SignalOutcomeRollup.day >= since.date())
+                    .filter(SignalOutcomeRollup.source == "live")
+                    .group_by(SignalOutcomeRollup.pair, SignalOutcomeRollup.timeframe)
+                    .all()
+                )
+            else:
+                grouped = (
+                    session.query(SignalOutcome.pair, SignalOutcome.timeframe, *_signal_outcome_count_columns())
+                    .filter(SignalOutcome.entry_ts >= since)
+                    .group_by(SignalOutcome.pair, SignalOutcome.timeframe)
+                    .all()
+                )
     except SQLAlchemyError:
         logger.exception("Error loading signal outcome stats")
         return empty
 
+    # One (pair, timeframe) grid from SQL, folded into both breakdowns here —
+    # a few hundred rows at most, instead of every outcome row.
     by_pair_map: dict[str, list] = {}
     by_tf_map: dict[str, list] = {}
-    for row in rows:
-        by_pair_map.setdefault(row.pair, []).append(row)
-        by_tf_map.setdefault(row.timeframe or "?", []).append(row)
+    for row in grouped:
+        counts = _counts_from_row(row)
+        by_pair_map.setdefault(row.pair, []).append(counts)
+        by_tf_map.setdefault(row.timeframe or "?", []).append(counts)
 
     by_pair = [
-        {"pair": pair, **_aggregate_signal_outcomes(items)}
-        for pair, items in sorted(by_pair_map.items(), key=lambda kv: -len(kv[1]))
+        {"pair": pair, **agg}
+        for pair, agg in sorted(
+            ((pair, _merge_signal_outcome_counts(items)) for pair, items in by_pair_map.items()),
+            key=lambda kv: -kv[1]["total"],
+        )
     ]
     by_timeframe = [
-        {"timeframe": tf, **_aggregate_signal_outcomes(items)}
+        {"timeframe": tf, **_merge_signal_outcome_counts(items)}
         for tf, items in sorted(by_tf_map.items())
     ]
 
     return {
         "ok": True,
         "days": days,
-        **_aggregate_signal_outcomes(rows),
+        **_merge_signal_outcome_counts([item for items in by_pair_map.values() for item in items]),
         "by_pair": by_pair,
         "by_timeframe": by_timeframe,
     }
 
 
+def _normalized_score_expression():
+    # HOTFIX FOLLOW-UP (2026-08-10): analysis.py's BUY/SELL verdict was
+    # swapped relative to score (BUY is now a LOW raw score, SELL a
+    # HIGH one - see analysis.py's TEMPORARY HOTFIX comment). This
+    # normalization used to assume the opposite (BUY=high, SELL=low)
+    # to fold both directions onto one "higher = more confident" scale
+    # for threshold_advisor.py. Flipped which branch inverts to match,
+    # otherwise every bucket here would rank confidence backwards.
+    return case((SignalOutcome.verdict == "BUY", 100 - SignalOutcome.score), else_=SignalOutcome.score)
+
+
+def _rollup_sum_columns() -> list:
+    return [
+        func.sum(getattr(SignalOutcomeRollup, counter)).label(counter)
+        for counter in ("total", "wins", "losses", "flats", "legacy")
+    ]
+
+
+def _score_breakdown_from_rollups(session, since: datetime, bucket_size: int) -> list[dict]:
+    rollup_bucket = (SignalOutcomeRollup.score_bucket // bucket_size) * bucket_size
+    grouped = (
+        session.query(
+            rollup_bucket.label("bucket_start"),
+            func.sum(SignalOutcomeRollup.wins).label("wins"),
+            func.sum(SignalOutcomeRollup.losses).label("losses"),
+        )
+        .filter(SignalOutcomeRollup.day >= since.date())
+        .filter(SignalOutcomeRollup.source == "live")
+        .filter(SignalOutcomeRollup.score_bucket >= 0)
+        .group_by(rollup_bucket)
+        .order_by(rollup_bucket)
+        .all()
+    )
+
+    result = []
+    for row in grouped:
+        wins, losses = int(row.wins or 0), int(row.losses or 0)
+        if not wins + losses:
+            continue
+        start = int(row.bucket_start)
+        result.append(
+            {
+                "bucket_start": start,
+                "score_range": f"{start}-{start + bucket_size}",
+                **_signal_outcome_counts(total=wins + losses, wins=wins, losses=losses, flats=0, legacy=0),
+            }
+        )
+    return result
+
+
 def get_signal_outcome_score_breakdown(days: int = 30, bucket_size: int = 5) -> list[dict]:
     """Win-rate per score bucket (e.g. 75-80, 80-85, ...), used to evaluate
     whether the BUY/SELL threshold in config is well calibrated. BUY signals
@@ -1621,49 +2690,37 @@ def get_signal_outcome_score_breakdown(days: int = 30, bucket_size: int = 5) ->
     days = max(1, min(int(days or 30), 365))
     bucket_size = max(1, min(int(bucket_size or 5), 25))
     since = _utcnow() - timedelta(days=days)
+    bucket_start = ((_normalized_score_expression() // bucket_size) * bucket_size).label("bucket_start")
 
     try:
         with get_db() as session:
             if session is None:
                 return []
 
-            rows = (
-                session.query(SignalOutcome)
+            if bucket_size % SIGNAL_OUTCOME_ROLLUP_BUCKET == 0 and _signal_outcome_rollups_ready(session):
+                return _score_breakdown_from_rollups(session, since, bucket_size)
+
+            grouped = (
+                session.query(bucket_start, *_signal_outcome_count_columns())
                 .filter(SignalOutcome.entry_ts >= since)
                 .filter(SignalOutcome.outcome.in_(("up", "down")))
                 .filter(SignalOutcome.score.isnot(None))
+                .group_by(bucket_start)
+                .order_by(bucket_start)
                 .all()
             )
     except SQLAlchemyError:
         logger.exception("Error loading signal outcome score breakdown")
         return []
 
-    buckets: dict[int, list] = {}
-    for row in rows:
-        # HOTFIX FOLLOW-UP (2026-08-10): analysis.py's BUY/SELL verdict was
-        # swapped relative to score (BUY is now a LOW raw score, SELL a
-        # HIGH one - see analysis.py's TEMPORARY HOTFIX comment). This
-        # normalization used to assume the opposite (BUY=high, SELL=low)
-        # to fold both directions onto one "higher = more confident" scale
-        # for threshold_advisor.py. Flipped which branch inverts to match,
-        # otherwise every bucket here would rank confidence backwards.
-        normalized_score = (100 - row.score) if row.verdict == "BUY" else row.score
-        bucket_start = (normalized_score // bucket_size) * bucket_size
-        buckets.setdefault(bucket_start, []).append(row)
-
-    result = []
-    for bucket_start in sorted(buckets):
-        items = buckets[bucket_start]
-        agg = _aggregate_signal_outcomes(items)
-        result.append(
-            {
-                "bucket_start": bucket_start,
-                "score_range": f"{bucket_start}-{bucket_start + bucket_size}",
-                **agg,
-            }
-        )
-
-    return result
+    return [
+        {
+            "bucket_start": int(row.bucket_start),
+            "score_range": f"{int(row.bucket_start)}-{int(row.bucket_start) + bucket_size}",
+            **_counts_from_row(row),
+        }
+        for row in grouped
+    ]
 
 
 # ----------------------------------------------------------------------
@@ -1832,22 +2889,52 @@ def mark_auto_trade_error(trade_id: int, error_message: str) -> bool:
         return False
 
 
+_AUTO_TRADES = AutoTrade.__table__
+_COUNT_OPEN_AUTO_TRADES = (
+    select(func.count())
+    .select_from(_AUTO_TRADES)
+    .where(_AUTO_TRADES.c.account_mode == bindparam("account_mode"))
+    .where(_AUTO_TRADES.c.status.in_(("submitted", "open")))
+)
+_OPEN_AUTO_TRADE_PAIRS = (
+    select(_AUTO_TRADES.c.pair)
+    .where(_AUTO_TRADES.c.status.in_(("submitted", "open")))
+    .distinct()
+)
+_DAILY_AUTO_TRADE_PNL = (
+    select(func.coalesce(func.sum(_AUTO_TRADES.c.pnl_amount), 0.0))
+    .where(_AUTO_TRADES.c.account_mode == bindparam("account_mode"))
+    .where(_AUTO_TRADES.c.closed_at.isnot(None))
+    .where(_AUTO_TRADES.c.closed_at >= bindparam("day_start"))
+    .where(_AUTO_TRADES.c.pnl_amount.isnot(None))
+)
+
+
 def count_open_auto_trades(account_mode: str) -> int:
     try:
         with get_db() as session:
             if session is None:
                 return 0
-            return (
-                session.query(AutoTrade)
-                .filter(AutoTrade.account_mode == (account_mode or "demo").lower())
-                .filter(AutoTrade.status.in_(("submitted", "open")))
-                .count()
-            )
+            return session.execute(
+                _COUNT_OPEN_AUTO_TRADES, {"account_mode": (account_mode or "demo").lower()}
+            ).scalar_one()
     except SQLAlchemyError:
         logger.exception("Error counting open auto trades")
         return 0
 
 
+def get_open_auto_trade_pairs() -> list[str]:
+    """Pairs of submitted/open auto trades in any account mode."""
+    try:
+        with get_db() as session:
+            if session is None:
+                return []
+            return sorted(pair for pair in session.execute(_OPEN_AUTO_TRADE_PAIRS).scalars() if pair)
+    except SQLAlchemyError:
+        logger.exception("Error loading open auto trade pairs")
+        return []
+
+
 def get_daily_auto_trade_pnl(account_mode: str) -> float:
     day_start = _utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
 
@@ -1856,15 +2943,12 @@ def get_daily_auto_trade_pnl(account_mode: str) -> float:
             if session is None:
                 return 0.0
 
-            rows = (
-                session.query(AutoTrade)
-                .filter(AutoTrade.account_mode == (account_mode or "demo").lower())
-                .filter(AutoTrade.closed_at.isnot(None))
-                .filter(AutoTrade.closed_at >= day_start)
-                .filter(AutoTrade.pnl_amount.isnot(None))
-                .all()
+            return float(
+                session.execute(
+                    _DAILY_AUTO_TRADE_PNL,
+                    {"account_mode": (account_mode or "demo").lower(), "day_start": day_start},
+                ).scalar_one()
             )
-            return sum(row.pnl_amount for row in rows)
     except SQLAlchemyError:
         logger.exception("Error computing daily auto trade pnl")
         return 0.0
@@ -1999,6 +3083,28 @@ def mark_binomo_trade_error(trade_id: int, error_message: str) -> bool:
         return False
 
 
+_BINOMO_TRADES = BinomoTrade.__table__
+_COUNT_BINOMO_TRADES_SINCE = (
+    select(func.count())
+    .select_from(_BINOMO_TRADES)
+    .where(_BINOMO_TRADES.c.account_mode == bindparam("account_mode"))
+    .where(_BINOMO_TRADES.c.entry_ts >= bindparam("day_start"))
+)
+_RECENT_BINOMO_RESULTS = (
+    select(_BINOMO_TRADES.c.result)
+    .where(_BINOMO_TRADES.c.account_mode == bindparam("account_mode"))
+    .where(_BINOMO_TRADES.c.result.in_(("win", "loss")))
+    .order_by(_BINOMO_TRADES.c.resolved_at.desc())
+)
+_DAILY_BINOMO_PNL = (
+    select(func.coalesce(func.sum(_BINOMO_TRADES.c.payout_amount), 0.0))
+    .where(_BINOMO_TRADES.c.account_mode == bindparam("account_mode"))
+    .where(_BINOMO_TRADES.c.resolved_at.isnot(None))
+    .where(_BINOMO_TRADES.c.resolved_at >= bindparam("day_start"))
+    .where(_BINOMO_TRADES.c.payout_amount.isnot(None))
+)
+
+
 def count_binomo_trades_today(account_mode: str) -> int:
     day_start = _utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
 
@@ -2006,12 +3112,10 @@ def count_binomo_trades_today(account_mode: str) -> int:
         with get_db() as session:
             if session is None:
                 return 0
-            return (
-                session.query(BinomoTrade)
-                .filter(BinomoTrade.account_mode == (account_mode or "demo").lower())
-                .filter(BinomoTrade.entry_ts >= day_start)
-                .count()
-            )
+            return session.execute(
+                _COUNT_BINOMO_TRADES_SINCE,
+                {"account_mode": (account_mode or "demo").lower(), "day_start": day_start},
+            ).scalar_one()
     except SQLAlchemyError:
         logger.exception("Error counting today's binomo trades")
         return 0
@@ -2027,21 +3131,19 @@ def get_consecutive_binomo_losses(account_mode: str, limit: int = 50) -> int:
             if session is None:
                 return 0
 
-            rows = (
-                session.query(BinomoTrade)
-                .filter(BinomoTrade.account_mode == (account_mode or "demo").lower())
-                .filter(BinomoTrade.result.in_(("win", "loss")))
-                .order_by(BinomoTrade.resolved_at.desc())
-                .limit(max(1, min(int(limit or 50), 200)))
-                .all()
-            )
+            # LIMIT values are bound parameters, so this still hits the
+            # compiled cache whatever the limit.
+            results = session.execute(
+                _RECENT_BINOMO_RESULTS.limit(max(1, min(int(limit or 50), 200))),
+                {"account_mode": (account_mode or "demo").lower()},
+            ).scalars().all()
     except SQLAlchemyError:
         logger.exception("Error computing consecutive binomo losses")
         return 0
 
     streak = 0
-    for row in rows:
-        if row.result == "loss":
+    for result in results:
+        if result == "loss":
             streak += 1
         else:
             break
@@ -2056,15 +3158,12 @@ def get_daily_binomo_pnl(account_mode: str) -> float:
             if session is None:
                 return 0.0
 
-            rows = (
-                session.query(BinomoTrade)
-                .filter(BinomoTrade.account_mode == (account_mode or "demo").lower())
-                .filter(BinomoTrade.resolved_at.isnot(None))
-                .filter(BinomoTrade.resolved_at >= day_start)
-                .filter(BinomoTrade.payout_amount.isnot(None))
-                .all()
+            return float(
+                session.execute(
+                    _DAILY_BINOMO_PNL,
+                    {"account_mode": (account_mode or "demo").lower(), "day_start": day_start},
+                ).scalar_one()
             )
-            return sum(row.payout_amount for row in rows)
     except SQLAlchemyError:
         logger.exception("Error computing daily binomo pnl")
         return 0.0
@@ -2084,24 +3183,18 @@ _BINOMO_KILL_SWITCH_REASON_KEY = "binomo_kill_switch_reason"
 
 
 def get_binomo_runtime_state() -> dict:
-    try:
-        with get_db() as session:
-            if session is None:
-                return {"runtime_enabled": True, "kill_switch_tripped": False, "kill_switch_reason": None}
-
-            enabled_raw = _get_runtime_setting(session, _BINOMO_ENABLED_KEY)
-            tripped_raw = _get_runtime_setting(session, _BINOMO_KILL_SWITCH_KEY)
-            reason = _get_runtime_setting(session, _BINOMO_KILL_SWITCH_REASON_KEY)
-
-            return {
-                "runtime_enabled": enabled_raw != "false",  # unset -> enabled by default
-                "kill_switch_tripped": tripped_raw == "true",
-                "kill_switch_reason": reason,
-            }
-    except SQLAlchemyError:
-        logger.exception("Error loading binomo runtime state")
+    """Checked on every signal by the executor — served from the
+    runtime-settings cache (see _RuntimeSettingsCache)."""
+    settings = get_runtime_settings(_BINOMO_ENABLED_KEY, _BINOMO_KILL_SWITCH_KEY, _BINOMO_KILL_SWITCH_REASON_KEY)
+    if settings is None:
         return {"runtime_enabled": True, "kill_switch_tripped": False, "kill_switch_reason": None}
 
+    return {
+        "runtime_enabled": settings[_BINOMO_ENABLED_KEY] != "false",  # unset -> enabled by default
+        "kill_switch_tripped": settings[_BINOMO_KILL_SWITCH_KEY] == "true",
+        "kill_switch_reason": settings[_BINOMO_KILL_SWITCH_REASON_KEY],
+    }
+
 
 def set_binomo_runtime_enabled(enabled: bool) -> bool:
     try:
@@ -2154,19 +3247,15 @@ _SCANNER_STATE_KEY_PREFIX = "scanner_state_"
 
 
 def get_persisted_scanner_state() -> dict:
-    try:
-        with get_db() as session:
-            if session is None:
-                return {}
-            state = {}
-            for category in ("forex", "crypto", "commodities", "watchlist"):
-                raw = _get_runtime_setting(session, _SCANNER_STATE_KEY_PREFIX + category)
-                if raw is not None:
-                    state[category] = raw == "true"
-            return state
-    except SQLAlchemyError:
-        logger.exception("Error loading persisted scanner state")
+    categories = ("forex", "crypto", "commodities", "watchlist")
+    settings = get_runtime_settings(*(_SCANNER_STATE_KEY_PREFIX + category for category in categories))
+    if settings is None:
         return {}
+    return {
+        category: settings[_SCANNER_STATE_KEY_PREFIX + category] == "true"
+        for category in categories
+        if settings[_SCANNER_STATE_KEY_PREFIX + category] is not None
+    }
 
 
 def set_persisted_scanner_state(category: str, enabled: bool) -> bool:
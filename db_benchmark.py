@@ -0,0 +1,218 @@
+# db_benchmark.py
+"""
+Micro-benchmark: ORM vs Core for the hot db.py read helpers.
+
+The Core versions are the ones db.py actually uses; the ORM versions here
+are the previous implementations, kept only for comparison. Rows are seeded
+under account_mode="bench" / pair "BENCH*" and removed afterwards, but point
+it at a scratch database anyway:
+
+    python db_benchmark.py --database-url sqlite:////tmp/zigzag-bench.db
+    python db_benchmark.py --database-url postgresql://user:pw@localhost/zigzag_bench
+"""
+import argparse
+import logging
+import statistics
+import time
+from datetime import timedelta
+
+import db
+
+_MODE = "bench"
+_SETTING_KEY = "bench_runtime_setting"
+
+
+def _day_start():
+    return db._utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _orm_pending_signal_outcomes(session):
+    rows = (
+        session.query(db.SignalOutcome)
+        .filter(db.SignalOutcome.outcome == "pending")
+        .filter(db.SignalOutcome.horizon_seconds.isnot(None))
+        .order_by(db.SignalOutcome.entry_ts.asc())
+        .limit(500)
+        .all()
+    )
+    return [
+        {
+            "id": row.id,
+            "pair": row.pair,
+            "timeframe": row.timeframe,
+            "verdict": row.verdict,
+            "entry_price": row.entry_price,
+            "horizon_seconds": row.horizon_seconds,
+            "entry_ts": row.entry_ts,
+        }
+        for row in rows
+    ]
+
+
+def _orm_count_open_auto_trades(session):
+    return (
+        session.query(db.AutoTrade)
+        .filter(db.AutoTrade.account_mode == _MODE)
+        .filter(db.AutoTrade.status.in_(("submitted", "open")))
+        .count()
+    )
+
+
+def _orm_daily_auto_trade_pnl(session):
+    rows = (
+        session.query(db.AutoTrade)
+        .filter(db.AutoTrade.account_mode == _MODE)
+        .filter(db.AutoTrade.closed_at.isnot(None))
+        .filter(db.AutoTrade.closed_at >= _day_start())
+        .filter(db.AutoTrade.pnl_amount.isnot(None))
+        .all()
+    )
+    return sum(row.pnl_amount for row in rows)
+
+
+def _orm_count_binomo_trades_today(session):
+    return (
+        session.query(db.BinomoTrade)
+        .filter(db.BinomoTrade.account_mode == _MODE)
+        .filter(db.BinomoTrade.entry_ts >= _day_start())
+        .count()
+    )
+
+
+def _orm_consecutive_binomo_losses(session):
+    rows = (
+        session.query(db.BinomoTrade)
+        .filter(db.BinomoTrade.account_mode == _MODE)
+        .filter(db.BinomoTrade.result.in_(("win", "loss")))
+        .order_by(db.BinomoTrade.resolved_at.desc())
+        .limit(50)
+        .all()
+    )
+    streak = 0
+    for row in rows:
+        if row.result != "loss":
+            break
+        streak += 1
+    return streak
+
+
+def _orm_runtime_setting(session):
+    row = session.query(db.AppRuntimeSetting).filter(db.AppRuntimeSetting.key == _SETTING_KEY).first()
+    return None if row is None else row.value
+
+
+def _with_session(fn):
+    def _run():
+        with db.get_db() as session:
+            return fn(session)
+    return _run
+
+
+def _core_runtime_setting():
+    with db.get_db() as session:
+        return db._get_runtime_setting(session, _SETTING_KEY)
+
+
+CASES = (
+    ("get_pending_signal_outcomes", _with_session(_orm_pending_signal_outcomes),
+     lambda: db.get_pending_signal_outcomes()),
+    ("count_open_auto_trades", _with_session(_orm_count_open_auto_trades),
+     lambda: db.count_open_auto_trades(_MODE)),
+    ("get_daily_auto_trade_pnl", _with_session(_orm_daily_auto_trade_pnl),
+     lambda: db.get_daily_auto_trade_pnl(_MODE)),
+    ("count_binomo_trades_today", _with_session(_orm_count_binomo_trades_today),
+     lambda: db.count_binomo_trades_today(_MODE)),
+    ("get_consecutive_binomo_losses", _with_session(_orm_consecutive_binomo_losses),
+     lambda: db.get_consecutive_binomo_losses(_MODE)),
+    ("_get_runtime_setting", _with_session(_orm_runtime_setting), _core_runtime_setting),
+)
+
+
+def seed(rows: int) -> None:
+    now = db._utcnow()
+    with db.session_scope() as session:
+        for i in range(rows):
+            session.add(db.SignalOutcome(
+                pair=f"BENCH{i % 20}", timeframe="1m", verdict="BUY" if i % 2 else "SELL", score=50,
+                entry_price=1.0, horizon_seconds=60, outcome="pending",
+                entry_ts=now - timedelta(seconds=i),
+            ))
+            session.add(db.AutoTrade(
+                pair="BENCH", direction="BUY", volume=1000, account_mode=_MODE,
+                status=("open", "closed_tp", "submitted")[i % 3],
+                pnl_amount=1.5 if i % 3 == 1 else None, closed_at=now if i % 3 == 1 else None,
+            ))
+            session.add(db.BinomoTrade(
+                asset="BENCH", direction="up", amount=1.0, expiry_seconds=60, account_mode=_MODE,
+                result=("loss", "loss", "win", "error")[i % 4], payout_amount=0.8,
+                resolved_at=now - timedelta(seconds=i),
+            ))
+        db._set_runtime_setting(session, _SETTING_KEY, "1")
+
+
+def cleanup() -> None:
+    with db.session_scope() as session:
+        session.query(db.SignalOutcome).filter(db.SignalOutcome.pair.like("BENCH%")).delete(synchronize_session=False)
+        session.query(db.AutoTrade).filter(db.AutoTrade.account_mode == _MODE).delete(synchronize_session=False)
+        session.query(db.BinomoTrade).filter(db.BinomoTrade.account_mode == _MODE).delete(synchronize_session=False)
+        session.query(db.AppRuntimeSetting).filter(db.AppRuntimeSetting.key == _SETTING_KEY).delete(
+            synchronize_session=False
+        )
+
+
+def _time(fn, iterations: int) -> list[float]:
+    fn()  # warm-up: compiled cache, pool connection
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+
+def run(iterations: int) -> list[dict]:
+    report = []
+    for name, orm_fn, core_fn in CASES:
+        if orm_fn() != core_fn():
+            raise AssertionError(f"{name}: ORM and Core results differ")
+        orm = _time(orm_fn, iterations)
+        core = _time(core_fn, iterations)
+        report.append({
+            "name": name,
+            "orm_us": statistics.median(orm),
+            "core_us": statistics.median(core),
+        })
+    return report
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="ORM vs Core latency for hot db.py helpers.")
+    parser.add_argument("--database-url", required=True, help="SQLAlchemy URL of a scratch database.")
+    parser.add_argument("--rows", type=int, default=300, help="Rows seeded per table (default 300).")
+    parser.add_argument("--iterations", type=int, default=500, help="Timed calls per helper (default 500).")
+    args = parser.parse_args()
+
+    if not db.configure_database(args.database_url):
+        raise SystemExit("Could not connect to the database")
+    db.initialize_database()
+
+    seed(args.rows)
+    try:
+        report = run(args.iterations)
+    finally:
+        cleanup()
+
+    backend = db.engine.dialect.name
+    print(f"{backend}: median latency per call, {args.iterations} calls, {args.rows} rows/table")
+    print(f"{'helper':32} {'ORM us':>10} {'Core us':>10} {'speedup':>8}")
+    for item in report:
+        print(
+            f"{item['name']:32} {item['orm_us']:10.1f} {item['core_us']:10.1f} "
+            f"{item['orm_us'] / item['core_us']:7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
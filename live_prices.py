@@ -0,0 +1,183 @@
+# live_prices.py
+"""
+Columnar table of the latest cTrader quote per pair.
+
+Every spot tick used to become a fresh 6-key dict stored under
+AppState._state_lock, and every reader (/api/live_price, the scanner, the
+price-health watchdog) copied the whole dict of dicts under the same lock.
+Here each pair gets a slot once, and a tick only overwrites floats in
+preallocated arrays:
+
+    slot = table.update("EURUSD", bid, ask, mid, ts)    # reactor thread only
+    table.get("EURUSD")      # {"type": "price", "pair", "bid", "ask", "mid", "ts", "ticks"}
+    table.timestamps()       # {pair: ts} — all the health checks need
+
+There is exactly one writer — the reactor thread (spot delivery, drop on
+unsubscribe, clear on reconnect) — so writes take no lock. Readers on WSGI
+and pool threads don't lock either: each slot carries a sequence number
+that the writer makes odd for the duration of a write, and a reader
+retries if it saw an odd or changed sequence, so it never returns a bid
+from one tick with the ask of the next.
+
+A missing bid/ask is stored as NaN and read back as None.
+"""
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+_NAN = float("nan")
+_INITIAL_CAPACITY = 64
+
+
+def _value(x: float) -> Optional[float]:
+    return None if x != x else x
+
+
+class LivePriceTable:
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self._slots: Dict[str, int] = {}
+        self.names: list[str] = []
+        self.bid = array("d")
+        self.ask = array("d")
+        self.mid = array("d")
+        self.ts = array("d")
+        self.ticks = array("Q")
+        self._seq = array("Q")
+        # 1 — у слоті є поточна ціна; 0 — слот вільний, скинутий чи ще без тіків.
+        self._live = bytearray()
+        self._grow(max(1, int(capacity)))
+
+    # ------------------------------------------------------------------
+    # Writer (reactor thread)
+    # ------------------------------------------------------------------
+
+    def reserve(self, capacity: int) -> None:
+        """Preallocates slots, e.g. for every symbol of a fresh symbol list."""
+        if capacity > len(self._live):
+            self._grow(capacity - len(self._live))
+
+    def _grow(self, extra: int) -> None:
+        self.bid.extend([_NAN] * extra)
+        self.ask.extend([_NAN] * extra)
+        self.mid.extend([_NAN] * extra)
+        self.ts.extend([0.0] * extra)
+        self.ticks.extend([0] * extra)
+        self._seq.extend([0] * extra)
+        self._live.extend(bytes(extra))
+
+    def _add(self, name: str) -> int:
+        slot = len(self.names)
+        if slot >= len(self._live):
+            self._grow(len(self._live))
+        self.names.append(name)
+        # Слот стає видимим читачам лише після того, як масиви готові.
+        self._slots[name] = slot
+        return slot
+
+    def update(self, name: str, bid, ask, mid, ts: float) -> int:
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._add(name)
+
+        seq = self._seq
+        seq[slot] += 1
+        self.bid[slot] = _NAN if bid is None else bid
+        self.ask[slot] = _NAN if ask is None else ask
+        self.mid[slot] = _NAN if mid is None else mid
+        self.ts[slot] = ts
+        self.ticks[slot] += 1
+        self._live[slot] = 1
+        seq[slot] += 1
+        return slot
+
+    def drop(self, name: str) -> None:
+        slot = self._slots.get(name)
+        if slot is not None:
+            self._live[slot] = 0
+
+    def clear(self) -> None:
+        """New connection: no price is current. Slots are kept for reuse."""
+        for slot in range(len(self.names)):
+            self._seq[slot] += 1
+            self._live[slot] = 0
+            self.ticks[slot] = 0
+            self._seq[slot] += 1
+
+    # ------------------------------------------------------------------
+    # Readers (any thread)
+    # ------------------------------------------------------------------
+
+    def _read(self, slot: int) -> Optional[tuple]:
+        seq = self._seq
+        while True:
+            before = seq[slot]
+            if before & 1:
+                # Запис перервано перемиканням потоків — віддаємо GIL писачеві.
+                time.sleep(0)
+                continue
+            row = (
+                self._live[slot], self.bid[slot], self.ask[slot],
+                self.mid[slot], self.ts[slot], self.ticks[slot],
+            )
+            if seq[slot] == before:
+                return row if row[0] else None
+
+    @staticmethod
+    def _as_dict(name: str, row: tuple) -> Dict[str, Any]:
+        _, bid, ask, mid, ts, ticks = row
+        return {
+            "type": "price",
+            "pair": name,
+            "bid": _value(bid),
+            "ask": _value(ask),
+            "mid": _value(mid),
+            "ts": ts,
+            "ticks": ticks,
+        }
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        slot = self._slots.get(name)
+        if slot is None:
+            return None
+        row = self._read(slot)
+        return self._as_dict(name, row) if row else None
+
+    def get_ts(self, name: str) -> Optional[float]:
+        slot = self._slots.get(name)
+        if slot is None or not self._live[slot]:
+            return None
+        return self.ts[slot]
+
+    def _live_slots(self) -> List[int]:
+        live = self._live
+        return [slot for slot in range(len(self.names)) if live[slot]]
+
+    def timestamps(self) -> Dict[str, float]:
+        """{pair: ts of its latest tick} — a float read per slot."""
+        names = self.names
+        ts = self.ts
+        return {names[slot]: ts[slot] for slot in self._live_slots()}
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        names = self.names
+        result = {}
+        for slot in range(len(names)):
+            row = self._read(slot)
+            if row:
+                result[names[slot]] = self._as_dict(names[slot], row)
+        return result
+
+    def __len__(self) -> int:
+        return self._live.count(1)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get_ts(name) is not None
+
+    def stats(self) -> dict:
+        live = self._live_slots()
+        return {
+            "slots": len(self.names),
+            "capacity": len(self._live),
+            "live": len(live),
+            "ticks": sum(self.ticks[slot] for slot in live),
+        }
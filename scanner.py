@@ -82,13 +82,19 @@ def _get_active_forex_sessions() -> list:
 
 @safe_call("collect_assets", threshold=5, default=[])
 def _collect_assets_to_scan() -> list:
+    if app_state.get_scanner_state("forex"):
+        logger.info("Активні Forex сесії: %s", _get_active_forex_sessions())
+    return get_scan_universe()
+
+
+def get_scan_universe() -> list:
+    """Pairs the scanner would analyse right now (enabled categories,
+    active Forex sessions, watchlist). Also the scanner's share of the
+    cTrader spot-subscription demand."""
     assets = []
 
     if app_state.get_scanner_state("forex"):
-        active_sessions = _get_active_forex_sessions()
-        logger.info("Активні Forex сесії: %s", active_sessions)
-
-        for session_name in active_sessions:
+        for session_name in _get_active_forex_sessions():
             assets.extend(FOREX_SESSIONS.get(session_name, []))
 
     if app_state.get_scanner_state("crypto"):
@@ -237,11 +243,11 @@ def _handle_analysis_result(pair_norm: str, result: dict):
     app_state.publish_signal_sse(result)
     app_state.scanner_cooldown_cache[pair_norm] = now
 
-    deferToThreadPool(reactor, _blocking_pool(), signal_tracking.maybe_record_signal, result).addErrback(
-        lambda failure: logger.error(
-            "SCANNER: не вдалося записати SignalOutcome для %s: %s", pair_norm, failure.getErrorMessage()
-        )
-    )
+    try:
+        # Enqueue only — the write-behind buffer batches the insert.
+        signal_tracking.maybe_record_signal(result)
+    except Exception:
+        logger.exception("SCANNER: не вдалося записати SignalOutcome для %s", pair_norm)
 
     try:
         # No-op unless AUTOTRADE_ENABLED=true; manages its own threading.
@@ -308,7 +314,7 @@ def _process_one_asset(pair_norm: str):
     try:
         d = get_api_detailed_signal_data(
             app_state.client,
-            app_state.symbol_cache,
+            app_state.symbol_registry,
             pair_norm,
             0,
             SCANNER_TIMEFRAME,
@@ -364,7 +370,7 @@ def scan_markets_once() -> None:
     if not batch:
         return
 
-    if not app_state.get_live_prices_snapshot() and app_state.SYMBOLS_LOADED:
+    if not app_state.live_price_count() and app_state.SYMBOLS_LOADED:
         logger.warning("live_prices порожній, але символи завантажені. Передаємо перевірку контролю цін.")
         try:
             from ctrader import monitor_price_stream_health
@@ -0,0 +1,213 @@
+# signal_archive.py
+"""
+Time-partitioned archive for resolved signal_outcomes / trade rows.
+
+Once a day, resolved rows older than SIGNAL_ARCHIVE_RETENTION_DAYS are
+appended to one CSV.gz file per table and month (same columns as the
+table, same layout as data/signal_outcomes_legacy_20260810.csv) and then
+deleted, which keeps the live tables and their indexes small. Rollups are
+left in place, so /api/stats and /winrate keep counting archived days;
+the raw archived rows can still be read on demand (iter_archived_rows,
+get_archived_signal_outcome_stats, /api/stats/signals?archive=1).
+
+Files are written and fsynced before the rows are deleted. If the delete
+fails, the next run appends the same rows again — readers dedupe by id.
+
+Usage:
+    python signal_archive.py
+    python signal_archive.py --retention-days 30
+"""
+import argparse
+import csv
+import gzip
+import io
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Iterator
+
+from sqlalchemy.engine import make_url
+
+import db
+from config import BASE_DIR, SIGNAL_ARCHIVE_DIR, SIGNAL_ARCHIVE_RETENTION_DAYS
+
+logger = logging.getLogger("signal_archive")
+
+_BATCH_SIZE = 1000
+_TIMESTAMP_COLUMNS = {
+    "signal_outcomes": "entry_ts",
+    "binomo_trades": "entry_ts",
+    "auto_trades": "ts",
+}
+_FILE_PATTERN = re.compile(r"^(?P<table>[a-z_]+)_(?P<month>\d{4}-\d{2})\.csv\.gz$")
+
+
+def archive_dir() -> str:
+    if SIGNAL_ARCHIVE_DIR:
+        return SIGNAL_ARCHIVE_DIR
+    url = db.DATABASE_URL or ""
+    if db._is_sqlite_url(url) and not db._is_sqlite_memory_url(url):
+        return os.path.join(os.path.dirname(os.path.abspath(make_url(url).database)), "archive")
+    return str(BASE_DIR / "data" / "archive")
+
+
+def archive_path(table_name: str, month: str, directory: str | None = None) -> str:
+    return os.path.join(directory or archive_dir(), f"{table_name}_{month}.csv.gz")
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _append_rows(table_name: str, rows: list[dict], directory: str) -> None:
+    ts_column = _TIMESTAMP_COLUMNS[table_name]
+    by_month: dict[str, list[dict]] = {}
+    for row in rows:
+        by_month.setdefault(row[ts_column].strftime("%Y-%m"), []).append(row)
+
+    os.makedirs(directory, exist_ok=True)
+    columns = list(rows[0])
+    for month, month_rows in sorted(by_month.items()):
+        path = archive_path(table_name, month, directory)
+        new_file = not os.path.exists(path)
+        # Every append is a separate gzip member; gzip readers see one
+        # continuous stream, so the header is written only once.
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as gz, \
+                    io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+                writer = csv.writer(text)
+                if new_file:
+                    writer.writerow(columns)
+                for row in month_rows:
+                    writer.writerow([_csv_value(row[column]) for column in columns])
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def archive_cutoff(retention_days: int, now: datetime | None = None) -> datetime:
+    """Midnight (UTC) `retention_days` ago — whole days only, so rollup days
+    are either fully archived or fully live."""
+    day = ((now or db._utcnow()) - timedelta(days=retention_days)).date()
+    return datetime.combine(day, datetime.min.time())
+
+
+def run_archival(retention_days: int | None = None, *, now: datetime | None = None,
+                 directory: str | None = None) -> dict[str, int]:
+    retention = SIGNAL_ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    if not retention or retention <= 0:
+        return {}
+
+    cutoff = archive_cutoff(retention, now)
+    directory = directory or archive_dir()
+    archived: dict[str, int] = {}
+
+    for table_name in db.ARCHIVABLE_TABLES:
+        if table_name == "signal_outcomes":
+            db.ensure_signal_outcome_rollups()
+            if not db.signal_outcome_rollups_ready():
+                logger.warning("Signal outcome rollups are not ready — signal_outcomes archival skipped")
+                continue
+
+        total = 0
+        while True:
+            rows = db.get_archivable_rows(table_name, cutoff, _BATCH_SIZE)
+            if not rows:
+                break
+            _append_rows(table_name, rows, directory)
+            deleted = db.delete_archived_rows(table_name, [row["id"] for row in rows], cutoff)
+            total += deleted
+            if deleted < len(rows):
+                logger.warning(f"Archive {table_name}: deleted {deleted}/{len(rows)} rows, stopping this run")
+                break
+        archived[table_name] = total
+
+    if any(archived.values()):
+        logger.info(f"Архівовано рядки до {cutoff.date()}: {archived} → {directory}")
+    return archived
+
+
+def iter_archived_rows(table_name: str, since: datetime | None = None, until: datetime | None = None,
+                       directory: str | None = None) -> Iterator[dict]:
+    """Yields archived rows (as CSV string dicts) whose timestamp falls in
+    [since, until). Only the monthly files overlapping the range are read."""
+    directory = directory or archive_dir()
+    if not os.path.isdir(directory):
+        return
+
+    ts_column = _TIMESTAMP_COLUMNS[table_name]
+    first_month = since.strftime("%Y-%m") if since else None
+    last_month = until.strftime("%Y-%m") if until else None
+    seen_ids = set()
+
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_PATTERN.match(filename)
+        if not match or match.group("table") != table_name:
+            continue
+        month = match.group("month")
+        if (first_month and month < first_month) or (last_month and month > last_month):
+            continue
+
+        with gzip.open(os.path.join(directory, filename), "rt", encoding="utf-8", newline="") as f:
+            for record in csv.DictReader(f):
+                if record["id"] in seen_ids:
+                    continue
+                seen_ids.add(record["id"])
+                ts = db._normalize_datetime(record.get(ts_column))
+                if ts is None or (since and ts < since) or (until and ts >= until):
+                    continue
+                yield record
+
+
+def get_archived_signal_outcome_stats(days: int, *, pair: str | None = None,
+                                      directory: str | None = None) -> dict:
+    """Same counters as db.get_signal_outcome_stats, computed from the
+    archived rows of the last `days` days."""
+    since = db._utcnow() - timedelta(days=max(1, int(days)))
+    pair = pair.strip().upper() if pair else None
+    rows = [
+        SimpleNamespace(verdict=record.get("verdict"), outcome=record.get("outcome"))
+        for record in iter_archived_rows("signal_outcomes", since, directory=directory)
+        if not pair or record.get("pair") == pair
+    ]
+    return {"since": since.date().isoformat(), **db._aggregate_signal_outcomes(rows)}
+
+
+def list_archive_files(directory: str | None = None) -> list[dict]:
+    directory = directory or archive_dir()
+    if not os.path.isdir(directory):
+        return []
+    files = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_PATTERN.match(filename)
+        if match:
+            files.append({
+                "table": match.group("table"),
+                "month": match.group("month"),
+                "bytes": os.path.getsize(os.path.join(directory, filename)),
+            })
+    return files
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Archive resolved signal/trade rows to monthly CSV.gz files.")
+    parser.add_argument(
+        "--retention-days", type=int, default=None,
+        help=f"Keep this many days in the live tables (default SIGNAL_ARCHIVE_RETENTION_DAYS={SIGNAL_ARCHIVE_RETENTION_DAYS}).",
+    )
+    parser.add_argument("--dir", default=None, help=f"Archive directory (default {archive_dir()}).")
+    args = parser.parse_args()
+
+    db.initialize_database()
+    archived = run_archival(args.retention_days, directory=args.dir)
+    for table_name in db.ARCHIVABLE_TABLES:
+        print(f"{table_name}: {archived.get(table_name, 0)} rows archived")
+
+
+if __name__ == "__main__":
+    main()
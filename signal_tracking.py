@@ -6,10 +6,13 @@ The horizon is tied to which pair of timeframes confirmed the signal (see
 compute_horizon_seconds), matching the expiry binomo_executor.py would use
 for the same signal. This module knows nothing about Binomo itself — it
 only tracks outcomes against cTrader live prices."""
+import argparse
 import logging
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import Future
+from datetime import datetime, timezone
 
 import db
+import write_behind
 from config import SIGNAL_OUTCOME_FLAT_THRESHOLD_PERCENT
 from state import app_state
 
@@ -35,10 +38,15 @@ def compute_horizon_seconds(timeframe: str) -> int:
     return _HORIZON_BY_TIMEFRAME.get(timeframe, _DEFAULT_HORIZON_SECONDS)
 
 
-def maybe_record_signal(result: dict) -> int | None:
+def maybe_record_signal(result: dict) -> Future | None:
     """Record a pending SignalOutcome for a result the bot actually surfaced
     as a signal (is_trade_allowed=True, directional verdict). Safe to call
-    on every such result — recording failures are logged, never raised."""
+    on every such result, from any thread — recording failures are logged,
+    never raised.
+
+    The insert goes through the write-behind buffer, so this returns right
+    away with a Future whose result() is the new outcome id (None if the
+    write failed), or None when the result isn't tracked at all."""
     if not isinstance(result, dict) or not result.get("is_trade_allowed"):
         return None
 
@@ -55,20 +63,27 @@ def maybe_record_signal(result: dict) -> int | None:
 
     horizon_seconds = compute_horizon_seconds(result.get("timeframe"))
 
-    outcome_id = db.create_signal_outcome(
-        pair=pair,
-        timeframe=result.get("timeframe") or "",
-        verdict=verdict,
-        score=result.get("score"),
-        entry_price=entry_price,
-        horizon_seconds=horizon_seconds,
+    future = write_behind.signal_outcomes.submit(
+        {
+            "pair": pair,
+            "timeframe": result.get("timeframe") or "",
+            "verdict": verdict,
+            "score": result.get("score"),
+            "entry_price": entry_price,
+            "horizon_seconds": horizon_seconds,
+        }
     )
-    if outcome_id:
-        logger.info(
-            "SIGNAL_OUTCOME: recorded pending #%s %s %s entry=%.5f horizon=%ss",
-            outcome_id, pair, verdict, entry_price, horizon_seconds,
-        )
-    return outcome_id
+
+    def _log_recorded(done: Future) -> None:
+        outcome_id = done.result()
+        if outcome_id:
+            logger.info(
+                "SIGNAL_OUTCOME: recorded pending #%s %s %s entry=%.5f horizon=%ss",
+                outcome_id, pair, verdict, entry_price, horizon_seconds,
+            )
+
+    future.add_done_callback(_log_recorded)
+    return future
 
 
 def _classify_move(entry_price: float, exit_price: float) -> str:
@@ -83,21 +98,24 @@ def _classify_move(entry_price: float, exit_price: float) -> str:
 
 
 def resolve_pending_signals() -> None:
-    pending = db.get_pending_signal_outcomes()
+    """Resolves every due pending outcome against the live price. Not-yet-due
+    rows are filtered out in SQL, and all resolutions are written in one
+    transaction (db.resolve_signal_outcomes) instead of one per row.
+
+    Runs as one unit of work: both DB helpers share a session."""
+    with db.unit_of_work():
+        _resolve_due_signals()
+
+
+def _resolve_due_signals() -> None:
+    pending = db.get_pending_signal_outcomes(due_at=_utcnow_naive())
     if not pending:
         return
 
-    now = _utcnow_naive()
+    resolutions = []
+    rows_by_id = {}
 
     for row in pending:
-        entry_ts = row["entry_ts"]
-        horizon_seconds = row["horizon_seconds"]
-        if not isinstance(entry_ts, datetime) or not horizon_seconds:
-            continue
-
-        if now - entry_ts < timedelta(seconds=horizon_seconds):
-            continue  # horizon hasn't elapsed yet
-
         pair = row["pair"]
         price_data = app_state.get_live_price(pair)
         live_price = price_data.get("mid") if price_data else None
@@ -107,9 +125,48 @@ def resolve_pending_signals() -> None:
             continue
 
         outcome = _classify_move(row["entry_price"], live_price)
+        resolutions.append((row["id"], outcome, live_price))
+        rows_by_id[row["id"]] = row
 
-        if db.resolve_signal_outcome(row["id"], outcome=outcome, exit_price=live_price):
-            logger.info(
-                "SIGNAL_OUTCOME: #%s %s %s -> %s (entry=%.5f exit=%.5f)",
-                row["id"], pair, row["verdict"], outcome, row["entry_price"], live_price,
-            )
+    if not resolutions:
+        return
+
+    outcomes = {outcome_id: (outcome, exit_price) for outcome_id, outcome, exit_price in resolutions}
+    for outcome_id in db.resolve_signal_outcomes(resolutions):
+        row = rows_by_id[outcome_id]
+        outcome, live_price = outcomes[outcome_id]
+        logger.info(
+            "SIGNAL_OUTCOME: #%s %s %s -> %s (entry=%.5f exit=%.5f)",
+            outcome_id, row["pair"], row["verdict"], outcome, row["entry_price"], live_price,
+        )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    parser = argparse.ArgumentParser(description="Signal outcome tracking maintenance.")
+    parser.add_argument(
+        "--backfill-rollups", action="store_true",
+        help="Rebuild signal_outcome_rollups from every signal_outcomes row.",
+    )
+    parser.add_argument(
+        "--legacy-csv", metavar="PATH",
+        help="Also import an archived outcomes CSV (e.g. data/signal_outcomes_legacy_20260810.csv) "
+             "as source='legacy_csv' rollups; stats never include these.",
+    )
+    args = parser.parse_args()
+
+    if not args.backfill_rollups and not args.legacy_csv:
+        parser.print_help()
+        return
+
+    if args.backfill_rollups:
+        written = db.rebuild_signal_outcome_rollups()
+        print(f"Rollups rebuilt: {written if written is not None else 'failed'}")
+    if args.legacy_csv:
+        imported = db.import_legacy_signal_outcomes_csv(args.legacy_csv)
+        print(f"Legacy rollup rows imported: {imported if imported is not None else 'failed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# spot_subscriptions.py
+"""
+Demand-driven cTrader spot subscriptions.
+
+ctrader.py works out which pairs are wanted right now (scanner universe,
+Web App price-stream clients, open autotrades, pending signal outcomes) and
+hands the resolved {pair: symbolId} map to reconcile(). Only the difference
+against what is already subscribed goes out as ProtoOASubscribeSpotsReq /
+ProtoOAUnsubscribeSpotsReq. A pair that drops out of demand stays subscribed
+for `unsubscribe_grace` seconds, so a session boundary or a Web App reload
+doesn't flap it.
+
+Freshness is tracked per symbol: stale_symbols() + resubscribe() re-send (unsubscribe +
+subscribe) only the symbols whose price went stale, each with its own
+backoff — a closed market isn't hammered every watchdog tick.
+"""
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("spot_subscriptions")
+
+
+class _Subscription:
+    __slots__ = ("pair", "subscribed_at", "undemanded_since", "resubscribe_after", "backoff", "resubscribes")
+
+    def __init__(self, pair: str, now: float, base_backoff: float):
+        self.pair = pair
+        self.subscribed_at = now
+        self.undemanded_since: Optional[float] = None
+        self.resubscribe_after = 0.0
+        self.backoff = base_backoff
+        self.resubscribes = 0
+
+
+class SpotSubscriptionManager:
+    def __init__(
+        self,
+        send_subscribe: Callable[[List[int]], object],
+        send_unsubscribe: Callable[[List[int]], object],
+        *,
+        batch_size: int = 50,
+        unsubscribe_grace: float = 300.0,
+        resubscribe_backoff: float = 120.0,
+        max_resubscribe_backoff: float = 1800.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._send_subscribe = send_subscribe
+        self._send_unsubscribe = send_unsubscribe
+        self.batch_size = max(1, int(batch_size))
+        self.unsubscribe_grace = float(unsubscribe_grace)
+        self.resubscribe_backoff = float(resubscribe_backoff)
+        self.max_resubscribe_backoff = float(max_resubscribe_backoff)
+        self._clock = clock
+        self._subscriptions: Dict[int, _Subscription] = {}
+        self.demand: Dict[str, List[str]] = {}
+        self.subscribe_requests = 0
+        self.unsubscribe_requests = 0
+        self.targeted_resubscribes = 0
+
+    def reset(self) -> None:
+        """New connection: the server-side subscription set is empty."""
+        self._subscriptions.clear()
+
+    def subscribed_pairs(self) -> Dict[str, int]:
+        return {sub.pair: symbol_id for symbol_id, sub in self._subscriptions.items()}
+
+    def is_subscribed(self, symbol_id: int) -> bool:
+        return symbol_id in self._subscriptions
+
+    def reconcile(self, desired: Dict[str, int], demand: Optional[Dict[str, List[str]]] = None) -> dict:
+        """desired: pair -> symbolId. Returns the pairs subscribed and
+        unsubscribed by this call."""
+        now = self._clock()
+        if demand is not None:
+            self.demand = demand
+
+        wanted_ids = {}
+        for pair, symbol_id in desired.items():
+            wanted_ids.setdefault(int(symbol_id), pair)
+
+        to_subscribe = []
+        for symbol_id, pair in wanted_ids.items():
+            sub = self._subscriptions.get(symbol_id)
+            if sub is None:
+                self._subscriptions[symbol_id] = _Subscription(pair, now, self.resubscribe_backoff)
+                to_subscribe.append(symbol_id)
+            else:
+                sub.undemanded_since = None
+
+        to_unsubscribe = []
+        dropped_pairs = []
+        for symbol_id, sub in list(self._subscriptions.items()):
+            if symbol_id in wanted_ids:
+                continue
+            if sub.undemanded_since is None:
+                sub.undemanded_since = now
+            if now - sub.undemanded_since >= self.unsubscribe_grace:
+                to_unsubscribe.append(symbol_id)
+                dropped_pairs.append(sub.pair)
+                del self._subscriptions[symbol_id]
+
+        self._send_batches(self._send_unsubscribe, to_unsubscribe, "unsubscribe")
+        self._send_batches(self._send_subscribe, to_subscribe, "subscribe")
+
+        if to_subscribe or to_unsubscribe:
+            logger.info(
+                "Спот-підписки: +%s / -%s, активних %s.",
+                len(to_subscribe), len(to_unsubscribe), len(self._subscriptions),
+            )
+        return {
+            "subscribed": sorted(wanted_ids[symbol_id] for symbol_id in to_subscribe),
+            "unsubscribed": sorted(dropped_pairs),
+            "active": len(self._subscriptions),
+        }
+
+    def stale_symbols(self, last_price_ts: Dict[str, float], fresh_seconds: float, grace_seconds: float) -> List[int]:
+        """Subscribed symbols with no price for `fresh_seconds` (or none at
+        all `grace_seconds` after subscribing) whose backoff has expired."""
+        now = self._clock()
+        stale = []
+        for symbol_id, sub in self._subscriptions.items():
+            if now < sub.resubscribe_after:
+                continue
+            ts = last_price_ts.get(sub.pair)
+            if ts is None:
+                if now - sub.subscribed_at >= grace_seconds:
+                    stale.append(symbol_id)
+            elif now - ts > fresh_seconds:
+                stale.append(symbol_id)
+            else:
+                sub.backoff = self.resubscribe_backoff
+        return stale
+
+    def resubscribe(self, symbol_ids: Iterable[int]) -> List[int]:
+        now = self._clock()
+        ids = [symbol_id for symbol_id in symbol_ids if symbol_id in self._subscriptions]
+        for symbol_id in ids:
+            sub = self._subscriptions[symbol_id]
+            sub.resubscribe_after = now + sub.backoff
+            sub.backoff = min(sub.backoff * 2, self.max_resubscribe_backoff)
+            sub.resubscribes += 1
+        if ids:
+            self.targeted_resubscribes += len(ids)
+            self._send_batches(self._send_unsubscribe, ids, "unsubscribe")
+            self._send_batches(self._send_subscribe, ids, "subscribe")
+        return ids
+
+    def _send_batches(self, send: Callable[[List[int]], object], symbol_ids: List[int], kind: str) -> None:
+        for i in range(0, len(symbol_ids), self.batch_size):
+            batch = symbol_ids[i : i + self.batch_size]
+            if kind == "subscribe":
+                self.subscribe_requests += 1
+            else:
+                self.unsubscribe_requests += 1
+            try:
+                send(batch)
+            except Exception:
+                logger.exception("Не вдалося надіслати %s для %s символів", kind, len(batch))
+
+    def stats(self) -> dict:
+        pending_unsubscribe = sum(1 for sub in self._subscriptions.values() if sub.undemanded_since is not None)
+        return {
+            "active": len(self._subscriptions),
+            "pending_unsubscribe": pending_unsubscribe,
+            "demand": {source: len(pairs) for source, pairs in self.demand.items()},
+            "subscribe_requests": self.subscribe_requests,
+            "unsubscribe_requests": self.unsubscribe_requests,
+            "targeted_resubscribes": self.targeted_resubscribes,
+        }
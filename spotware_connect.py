@@ -3,6 +3,7 @@ import logging
 
 from twisted.internet import reactor
 from twisted.internet.defer import Deferred
+from twisted.python.threadable import isInIOThread
 from twisted.internet.threads import deferToThread
 
 from ctrader_open_api.auth import Auth as CTraderAuth
@@ -18,9 +19,11 @@ from ctrader_open_api.messages.OpenApiMessages_pb2 import (
     ProtoOAGetAccountListByAccessTokenReq,
     ProtoOAGetAccountListByAccessTokenRes,
     ProtoOASpotEvent,
+    ProtoOASymbolByIdReq,
     ProtoOASymbolsListReq,
 )
 from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOAPayloadType
+from ctrader_open_api.protobuf import Protobuf
 from ctrader_open_api.tcpProtocol import TcpProtocol
 
 from config import get_ctrader_proto_hosts, get_ctrader_proto_port, get_demo_account_id
@@ -30,32 +33,115 @@ logger = logging.getLogger(__name__)
 
 
 class EventEmitter:
+    """
+    Handlers always run on the reactor thread. Events raised on the reactor
+    thread itself (everything coming from the protocol) are dispatched
+    directly; only calls from other threads pay for callFromThread.
+
+    emit_batched() collects items of a high-rate event (spot ticks) and
+    delivers them once per reactor turn — i.e. once per socket read — to
+    handlers registered with on_batch(). Without batch handlers it behaves
+    like emit(). If an event has both kinds of handlers, on_batch() handlers
+    get the list first and then every on() handler gets each item in turn.
+
+    Ordering: before any non-batched event is dispatched, the pending
+    batches are flushed, so a handler never sees an execution event (or
+    "ready", "error") ahead of spot ticks that arrived before it in the
+    same read.
+    """
+
     def __init__(self):
         self._events = {}
+        self._batch_handlers = {}
+        self._pending_batches = {}
+        self.dispatch_stats = {"direct": 0, "cross_thread": 0, "batches": 0, "batched_items": 0}
 
     def on(self, event, func):
         self._events.setdefault(event, []).append(func)
 
+    def on_batch(self, event, func):
+        self._batch_handlers.setdefault(event, []).append(func)
+
     def emit(self, event, *args, **kwargs):
         handlers = list(self._events.get(event, []))
+        if not handlers:
+            return
 
-        def _run_handler(handler):
+        if isInIOThread():
+            self.dispatch_stats["direct"] += 1
+            self._dispatch(event, handlers, *args, **kwargs)
+        else:
+            self.dispatch_stats["cross_thread"] += 1
+            reactor.callFromThread(self._dispatch, event, handlers, *args, **kwargs)
+
+    def _dispatch(self, event, handlers, *args, **kwargs):
+        if self._pending_batches:
+            self.flush_batches()
+        self._run_handlers(event, handlers, *args, **kwargs)
+
+    def flush_batches(self):
+        """Delivers every pending batch now instead of at the end of the turn."""
+        for event in list(self._pending_batches):
+            self._flush_batch(event)
+
+    def emit_batched(self, event, item):
+        if not self._batch_handlers.get(event):
+            self.emit(event, item)
+            return
+
+        if not isInIOThread():
+            reactor.callFromThread(self.emit_batched, event, item)
+            return
+
+        pending = self._pending_batches.get(event)
+        if pending is None:
+            pending = self._pending_batches[event] = []
+            # callLater from the reactor thread does not wake the reactor up;
+            # it runs after the current read has been fully parsed.
+            reactor.callLater(0, self._flush_batch, event)
+        pending.append(item)
+
+    def _flush_batch(self, event):
+        items = self._pending_batches.pop(event, None)
+        if not items:
+            return
+        self.dispatch_stats["batches"] += 1
+        self.dispatch_stats["batched_items"] += len(items)
+        self._run_handlers(event, list(self._batch_handlers.get(event, [])), items)
+        for item in items:
+            self._run_handlers(event, list(self._events.get(event, [])), item)
+
+    @staticmethod
+    def _run_handlers(event, handlers, *args, **kwargs):
+        for handler in handlers:
             try:
                 handler(*args, **kwargs)
             except Exception:
                 logger.exception("Event handler failed for '%s'", event)
 
-        for handler in handlers:
-            reactor.callFromThread(_run_handler, handler)
-
 
 class SpotwareConnect(EventEmitter):
-    def __init__(self, client_id, client_secret):
+    """
+    A standby session (standby=True) stops after Application Auth and emits
+    "standby_ready" instead of authorizing the account: it only keeps an
+    app-authorized socket warm. promote() turns it into a regular session —
+    account auth follows straight away and ends with the usual "ready".
+
+    client_factory(host, port) replaces the network client, e.g. with a
+    ctrader_replay.ReplayClient. A replay client's recording already holds
+    the server's auth responses, so this session sends no auth requests and
+    never refreshes tokens. `recorder` is handed to the network client,
+    whose TcpProtocol records every received frame into it.
+    """
+
+    def __init__(self, client_id, client_secret, *, host_index=0, standby=False,
+                 client_factory=None, recorder=None):
         super().__init__()
 
         self._host_candidates = get_ctrader_proto_hosts()
-        self._host_index = 0
+        self._host_index = host_index % len(self._host_candidates)
         self.host = self._host_candidates[self._host_index]
+        self.standby = standby
         self.port = get_ctrader_proto_port()
         self._client_id = client_id
         self._client_secret = client_secret
@@ -65,11 +151,17 @@ class SpotwareConnect(EventEmitter):
         self._refresh_in_progress = False
         self._app_auth_completed = False
         self._oauth_client = CTraderAuth(client_id or "", client_secret or "", "")
+        self._message_handlers = self._build_message_handlers()
+        self._client_factory = client_factory or (lambda host, port: SpotwareClientBase(host, port, TcpProtocol))
+        self._recorder = recorder
 
         self._client = self._create_client(self.host)
+        self.replay = bool(getattr(self._client, "replay", False))
 
     def _create_client(self, host):
-        client = SpotwareClientBase(host, self.port, TcpProtocol)
+        client = self._client_factory(host, self.port)
+        if self._recorder is not None:
+            client.recorder = self._recorder
         client.setConnectedCallback(self._on_connected)
         client.setMessageReceivedCallback(self._on_message_received)
         client.setDisconnectedCallback(self._on_disconnected)
@@ -143,12 +235,34 @@ class SpotwareConnect(EventEmitter):
             **params,
         )
 
+    @property
+    def host_index(self):
+        return self._host_index
+
+    @property
+    def app_authorized(self):
+        return self._app_auth_completed and not self._stopping
+
+    def promote(self) -> bool:
+        """Standby -> primary. False if the app auth isn't done yet."""
+        if not self.app_authorized:
+            return False
+        self.standby = False
+        logger.info("Promoting standby cTrader session on %s:%s.", self.host, self.port)
+        self._request_account_list()
+        return True
+
+    def get_send_queue_stats(self):
+        stats_method = getattr(self._client, "sendQueueStats", None)
+        return stats_method() if callable(stats_method) else None
+
     def _on_connected(self, client):
         logger.info("Connected to cTrader at %s:%s. Waiting 2s before Application Auth...", self.host, self.port)
         reactor.callLater(2.0, self._send_app_auth)
 
     def _on_disconnected(self, client, reason=None):
         self.is_authorized = False
+        self._app_auth_completed = False
         self._client.account_id = None
 
         if self._stopping:
@@ -159,6 +273,9 @@ class SpotwareConnect(EventEmitter):
         self.emit("error", "DISCONNECTED")
 
     def _send_app_auth(self):
+        if self.replay:
+            # Відповіді сервера на авторизацію вже є в записі.
+            return
         if not self._client_id or not self._client_secret:
             logger.error("Missing cTrader client id/secret")
             self.emit("error", "MISSING_APP_CREDENTIALS")
@@ -172,6 +289,8 @@ class SpotwareConnect(EventEmitter):
         self.send(req, responseTimeoutInSeconds=15)
 
     def _request_account_list(self):
+        if self.replay:
+            return
         token = app_state.get_ctrader_access_token()
 
         if not token:
@@ -184,6 +303,8 @@ class SpotwareConnect(EventEmitter):
         self.send(req, responseTimeoutInSeconds=15)
 
     def _authorize_account(self, account_id=None):
+        if self.replay:
+            return
         acc_id = account_id or get_demo_account_id()
         token = app_state.get_ctrader_access_token()
 
@@ -206,6 +327,8 @@ class SpotwareConnect(EventEmitter):
         self.send(req, responseTimeoutInSeconds=15)
 
     def _refresh_access_token(self, reason: str = "manual"):
+        if self.replay:
+            return
         refresh_token = app_state.get_ctrader_refresh_token()
         if not refresh_token:
             logger.error("Missing cTrader refresh token. Cannot refresh access token.")
@@ -273,77 +396,77 @@ class SpotwareConnect(EventEmitter):
         app_state.set_ctrader_auth_issue("refresh_request_failed")
         self.emit("error", "REFRESH_REQUEST_FAILED")
 
+    def _build_message_handlers(self):
+        return {
+            # Спот-тики — найчастіші повідомлення, тож один dict-lookup і далі.
+            ProtoOAPayloadType.PROTO_OA_SPOT_EVENT: self._on_spot_message,
+            ProtoOAPayloadType.PROTO_OA_EXECUTION_EVENT: self._on_execution_message,
+            ProtoOAPayloadType.PROTO_OA_ERROR_RES: self._handle_api_error,
+            ProtoOAPayloadType.PROTO_OA_APPLICATION_AUTH_RES: self._on_app_auth_res,
+            ProtoOAPayloadType.PROTO_OA_GET_ACCOUNTS_BY_ACCESS_TOKEN_RES: self._on_account_list_res,
+            ProtoOAPayloadType.PROTO_OA_ACCOUNT_AUTH_RES: self._on_account_auth_res,
+            ProtoOAPayloadType.PROTO_OA_ACCOUNTS_TOKEN_INVALIDATED_EVENT: self._on_token_invalidated,
+        }
+
     def _on_message_received(self, client, message: ProtoMessage):
-        pt = message.payloadType
+        handler = self._message_handlers.get(message.payloadType)
+        if handler is not None:
+            handler(message)
 
-        if pt == ProtoOAPayloadType.PROTO_OA_APPLICATION_AUTH_RES:
-            self._app_auth_completed = True
-            logger.info("Step 1 OK. Waiting 1s before requesting account list...")
-            reactor.callLater(1.0, self._request_account_list)
-            return
+    def _on_spot_message(self, message):
+        self.emit_batched("spot_event", Protobuf.extract(message, ProtoOASpotEvent))
 
-        if pt == ProtoOAPayloadType.PROTO_OA_GET_ACCOUNTS_BY_ACCESS_TOKEN_RES:
-            res = ProtoOAGetAccountListByAccessTokenRes()
-            res.ParseFromString(message.payload)
-
-            requested_account_id = get_demo_account_id()
-            selected_account_id = None
-            for account in res.ctidTraderAccount:
-                candidate = int(account.ctidTraderAccountId)
-                if requested_account_id and candidate == int(requested_account_id):
-                    selected_account_id = candidate
-                    break
-                if selected_account_id is None:
-                    selected_account_id = candidate
-
-            if not selected_account_id:
-                logger.error("cTrader account list is empty for this access token")
-                app_state.set_ctrader_auth_issue("account_list_empty")
-                self.emit("error", "ACCOUNT_LIST_EMPTY")
-                return
+    def _on_execution_message(self, message):
+        self.emit("execution_event", Protobuf.extract(message, ProtoOAExecutionEvent))
 
-            logger.info("Step 2 OK. Using cTrader account %s.", selected_account_id)
-            reactor.callLater(0.2, self._authorize_account, selected_account_id)
+    def _on_app_auth_res(self, message):
+        self._app_auth_completed = True
+        if self.standby:
+            logger.info("Standby cTrader session app-authorized on %s:%s.", self.host, self.port)
+            self.emit("standby_ready")
             return
-
-        if pt == ProtoOAPayloadType.PROTO_OA_ACCOUNT_AUTH_RES:
-            res = ProtoOAAccountAuthRes()
-            res.ParseFromString(message.payload)
-
-            self._client.account_id = res.ctidTraderAccountId
-            self.is_authorized = True
-            app_state.set_ctrader_auth_issue(None)
-
-            logger.info("Step 2 OK. Account %s authorized.", res.ctidTraderAccountId)
-            self.emit("ready")
+        logger.info("Step 1 OK. Waiting 1s before requesting account list...")
+        reactor.callLater(1.0, self._request_account_list)
+
+    def _on_account_list_res(self, message):
+        res = Protobuf.extract(message, ProtoOAGetAccountListByAccessTokenRes)
+
+        requested_account_id = get_demo_account_id()
+        selected_account_id = None
+        for account in res.ctidTraderAccount:
+            candidate = int(account.ctidTraderAccountId)
+            if requested_account_id and candidate == int(requested_account_id):
+                selected_account_id = candidate
+                break
+            if selected_account_id is None:
+                selected_account_id = candidate
+
+        if not selected_account_id:
+            logger.error("cTrader account list is empty for this access token")
+            app_state.set_ctrader_auth_issue("account_list_empty")
+            self.emit("error", "ACCOUNT_LIST_EMPTY")
             return
 
-        if pt == ProtoOAPayloadType.PROTO_OA_ERROR_RES:
-            self._handle_api_error(message)
-            return
+        logger.info("Step 2 OK. Using cTrader account %s.", selected_account_id)
+        reactor.callLater(0.2, self._authorize_account, selected_account_id)
 
-        if pt == ProtoOAPayloadType.PROTO_OA_ACCOUNTS_TOKEN_INVALIDATED_EVENT:
-            event = ProtoOAAccountsTokenInvalidatedEvent()
-            event.ParseFromString(message.payload)
-            logger.warning("cTrader token invalidated event received: %s", getattr(event, "reason", "unknown"))
-            self._refresh_access_token("token_invalidated_event")
-            return
+    def _on_account_auth_res(self, message):
+        res = Protobuf.extract(message, ProtoOAAccountAuthRes)
 
-        if pt == ProtoOAPayloadType.PROTO_OA_SPOT_EVENT:
-            spot_event = ProtoOASpotEvent()
-            spot_event.ParseFromString(message.payload)
-            self.emit("spot_event", spot_event)
-            return
+        self._client.account_id = res.ctidTraderAccountId
+        self.is_authorized = True
+        app_state.set_ctrader_auth_issue(None)
 
-        if pt == ProtoOAPayloadType.PROTO_OA_EXECUTION_EVENT:
-            execution_event = ProtoOAExecutionEvent()
-            execution_event.ParseFromString(message.payload)
-            self.emit("execution_event", execution_event)
-            return
+        logger.info("Step 2 OK. Account %s authorized.", res.ctidTraderAccountId)
+        self.emit("ready")
+
+    def _on_token_invalidated(self, message):
+        event = Protobuf.extract(message, ProtoOAAccountsTokenInvalidatedEvent)
+        logger.warning("cTrader token invalidated event received: %s", getattr(event, "reason", "unknown"))
+        self._refresh_access_token("token_invalidated_event")
 
     def _handle_api_error(self, message: ProtoMessage):
-        res = ProtoOAErrorRes()
-        res.ParseFromString(message.payload)
+        res = Protobuf.extract(message, ProtoOAErrorRes)
 
         if res.errorCode == "ALREADY_LOGGED_IN":
             account_id = get_demo_account_id()
@@ -355,6 +478,11 @@ class SpotwareConnect(EventEmitter):
             self.emit("ready")
             return
 
+        if res.errorCode in {"ALREADY_SUBSCRIBED", "NOT_SUBSCRIBED_TO_SPOTS"}:
+            # Точкова перепідписка/відписка розійшлася зі станом сервера — не аварія.
+            logger.info("cTrader spot subscription state: %s - %s", res.errorCode, res.description)
+            return
+
         if res.errorCode == "BLOCKED_PAYLOAD_TYPE":
             logger.critical("cTrader rate limit. Waiting before reconnect.")
             app_state.set_ctrader_auth_issue("rate_limit_blocked")
@@ -390,3 +518,12 @@ class SpotwareConnect(EventEmitter):
 
         req = ProtoOASymbolsListReq(ctidTraderAccountId=self._client.account_id)
         return self.send(req, responseTimeoutInSeconds=20)
+
+    def get_symbols_by_id(self, symbol_ids):
+        if not getattr(self._client, "account_id", None):
+            d = Deferred()
+            reactor.callLater(0, d.errback, Exception("No Account ID"))
+            return d
+
+        req = ProtoOASymbolByIdReq(ctidTraderAccountId=self._client.account_id, symbolId=list(symbol_ids))
+        return self.send(req, responseTimeoutInSeconds=20)
@@ -1,15 +1,19 @@
 # state.py
+import json
 import logging
-import queue
 import threading
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
 from telegram.error import BadRequest
+from twisted.internet import reactor
+from twisted.python.threadable import isInIOThread
 from twisted.python.threadpool import ThreadPool
 
 import db
+from live_prices import LivePriceTable
+from symbol_registry import SymbolRegistry
 from config import IDEAL_ENTRY_THRESHOLD, get_ctrader_access_token, get_ctrader_refresh_token
 
 logger = logging.getLogger(__name__)
@@ -29,11 +33,14 @@ class AppState:
         self.background_tasks: List[Any] = []
 
         self.all_symbol_names: List[str] = []
-        self.symbol_cache: Dict[str, Any] = {}
-        self.symbol_id_map: Dict[int, str] = {}
+        # Замінюється цілком при кожному завантаженні списку символів.
+        self.symbol_registry: SymbolRegistry = SymbolRegistry()
+        # symbolId -> ProtoOASymbol volume/digits fields (symbol_snapshot.DETAIL_FIELDS).
+        self.symbol_details: Dict[int, Dict[str, Any]] = {}
         self.SYMBOLS_LOADED: bool = False
 
-        self.live_prices: Dict[str, Dict[str, Any]] = {}
+        # Пише лише reactor-потік, читачі не блокуються (див. live_prices.py).
+        self.live_prices: LivePriceTable = LivePriceTable()
         self.scanner_cooldown_cache: Dict[str, float] = {}
         self.latest_analysis_cache: Dict[str, Dict[str, Any]] = {}
         self.SIGNAL_CACHE: Dict[str, Dict[str, Any]] = {}
@@ -50,10 +57,7 @@ class AppState:
         self.scan_in_progress: bool = False
         self.scan_generation: int = 0
 
-        self.signal_sse_queue: queue.Queue = queue.Queue(maxsize=1000)
-        self.price_sse_queue: queue.Queue = queue.Queue(maxsize=2000)
-
-        self._sse_listeners: Dict[str, Dict[int, queue.Queue]] = {
+        self._sse_listeners: Dict[str, Dict[int, Any]] = {
             "signal": {},
             "price": {},
         }
@@ -213,50 +217,35 @@ class AppState:
 
     def clear_symbol_state(self) -> None:
         with self._state_lock:
-            self.symbol_cache.clear()
-            self.symbol_id_map.clear()
+            self.symbol_registry = SymbolRegistry()
+            self.symbol_details = {}
             self.all_symbol_names = []
             self.SYMBOLS_LOADED = False
 
     def clear_live_prices(self) -> None:
-        with self._state_lock:
-            self.live_prices.clear()
+        self.live_prices.clear()
 
-    def update_live_price(self, symbol: str, payload: Dict[str, Any]) -> None:
-        with self._state_lock:
-            self.live_prices[symbol] = payload
+    def update_live_price(self, symbol: str, bid, ask, mid, ts: float) -> int:
+        """Reactor thread only."""
+        return self.live_prices.update(symbol, bid, ask, mid, ts)
+
+    def drop_live_price(self, symbol: str) -> None:
+        self.live_prices.drop(symbol)
 
     def get_live_price(self, symbol: str) -> Optional[Dict[str, Any]]:
-        with self._state_lock:
-            return self.live_prices.get(symbol)
+        return self.live_prices.get(symbol)
 
-    def get_live_prices_snapshot(self) -> Dict[str, Dict[str, Any]]:
-        with self._state_lock:
-            return dict(self.live_prices)
+    def get_live_price_timestamps(self) -> Dict[str, float]:
+        return self.live_prices.timestamps()
 
-    def get_symbol_details(self, pair: str):
-        if not pair:
-            return None
-
-        norm = pair.replace("/", "").upper()
-        with_slash = None
-        if len(norm) >= 6:
-            with_slash = f"{norm[:3]}/{norm[3:]}"
+    def live_price_count(self) -> int:
+        return len(self.live_prices)
 
-        candidates = [
-            pair,
-            pair.upper(),
-            norm,
-            with_slash,
-            pair.replace("/", ""),
-            pair.replace("/", "").upper(),
-        ]
+    def get_live_prices_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return self.live_prices.snapshot()
 
-        with self._state_lock:
-            for candidate in candidates:
-                if candidate and candidate in self.symbol_cache:
-                    return self.symbol_cache[candidate]
-        return None
+    def get_symbol_details(self, pair: str):
+        return self.symbol_registry.resolve(pair)
 
     # ------------------------------------------------------------------
     # Signal cache
@@ -355,33 +344,33 @@ class AppState:
     # ------------------------------------------------------------------
 
     @staticmethod
-    def _queue_for_channel(channel: str):
-        if channel == "price":
-            return "price_sse_queue"
-        return "signal_sse_queue"
+    def _encode_sse_message(payload: dict) -> bytes:
+        return f"data: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n".encode("utf-8")
 
     def _put_sse(self, channel: str, payload: dict) -> bool:
+        """
+        Push-доставка: подію серіалізуємо один раз і одразу віддаємо
+        підключеним клієнтам каналу. Запис у twisted transport дозволений
+        лише з reactor-потоку, тож виклики з пулів перекидаємо туди через
+        callFromThread замість проміжної черги та polling-дренажу.
+        """
         if payload is None:
             return False
 
-        q: queue.Queue = getattr(self, self._queue_for_channel(channel))
+        if not self.sse_listener_count(channel):
+            return False
 
         try:
-            q.put_nowait(payload)
-            return True
-        except queue.Full:
-            try:
-                _ = q.get_nowait()
-            except queue.Empty:
-                pass
+            message = self._encode_sse_message(payload)
+        except Exception:
+            logger.exception(f"Не вдалося серіалізувати SSE event каналу '{channel}'")
+            return False
 
-            try:
-                q.put_nowait(payload)
-                logger.warning(f"{channel} SSE queue була переповнена — найстаріший елемент видалено")
-                return True
-            except queue.Full:
-                logger.warning(f"{channel} SSE queue переповнена — подію скинуто")
-                return False
+        if isInIOThread():
+            self.broadcast_sse_message(channel, message)
+        else:
+            reactor.callFromThread(self.broadcast_sse_message, channel, message)
+        return True
 
     def publish_sse(self, payload: dict) -> bool:
         """
@@ -395,30 +384,26 @@ class AppState:
     def publish_price_sse(self, payload: dict) -> bool:
         return self._put_sse("price", payload)
 
-    def pop_pending_sse_events(self, channel: str, limit: int = 500) -> List[dict]:
-        events: List[dict] = []
-        q: queue.Queue = getattr(self, self._queue_for_channel(channel))
-
-        for _ in range(limit):
-            try:
-                events.append(q.get_nowait())
-            except queue.Empty:
-                break
-
-        return events
-
-    def register_sse_listener(self, channel: str, maxsize: int = 200) -> Tuple[int, queue.Queue]:
-        q: queue.Queue = queue.Queue(maxsize=maxsize)
+    def publish_sse_ping(self, ts: Optional[int] = None) -> None:
+        """Keepalive для всіх каналів — пишемо напряму, без черг."""
+        payload = {"_ping": int(ts if ts is not None else time.time())}
+        for channel in tuple(self._sse_listeners.keys()):
+            self._put_sse(channel, payload)
 
+    def register_sse_listener(self, channel: str, listener: Any) -> int:
+        """
+        listener — будь-який об'єкт з методом deliver(message: bytes),
+        який викликається з reactor-потоку (див. api.SSEConnection).
+        """
         with self._listeners_lock:
             listener_id = self._next_listener_id
             self._next_listener_id += 1
-            self._sse_listeners[channel][listener_id] = q
+            self._sse_listeners[channel][listener_id] = listener
             logger.info(
                 f"SSE listener #{listener_id} підключено до каналу '{channel}'. "
                 f"Всього: {len(self._sse_listeners[channel])}"
             )
-            return listener_id, q
+            return listener_id
 
     def unregister_sse_listener(self, channel: str, listener_id: int) -> None:
         with self._listeners_lock:
@@ -429,13 +414,24 @@ class AppState:
                     f"Всього: {len(self._sse_listeners[channel])}"
                 )
 
+    def sse_listeners(self, channel: str) -> list:
+        with self._listeners_lock:
+            return list(self._sse_listeners.get(channel, {}).values())
+
+    def has_sse_listeners(self, channel: str) -> bool:
+        """Lock-free check for hot paths: skip building an event nobody gets."""
+        return bool(self._sse_listeners.get(channel))
+
     def sse_listener_count(self, channel: Optional[str] = None) -> int:
         with self._listeners_lock:
             if channel:
                 return len(self._sse_listeners.get(channel, {}))
             return sum(len(v) for v in self._sse_listeners.values())
 
-    def broadcast_sse_message(self, channel: str, message: str) -> None:
+    def broadcast_sse_message(self, channel: str, message: bytes) -> None:
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+
         with self._listeners_lock:
             listeners = list(self._sse_listeners[channel].items())
 
@@ -444,16 +440,12 @@ class AppState:
 
         stale_ids: List[int] = []
 
-        for listener_id, listener_queue in listeners:
+        for listener_id, listener in listeners:
             try:
-                listener_queue.put_nowait(message)
-            except queue.Full:
-                try:
-                    _ = listener_queue.get_nowait()
-                    listener_queue.put_nowait(message)
-                except Exception:
+                if not listener.deliver(message):
                     stale_ids.append(listener_id)
             except Exception:
+                logger.exception(f"SSE listener #{listener_id} впав під час доставки")
                 stale_ids.append(listener_id)
 
         for listener_id in stale_ids:
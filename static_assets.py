@@ -0,0 +1,194 @@
+# static_assets.py
+"""
+In-memory Web App assets served straight from the reactor.
+
+webapp/ is tiny and only changes on redeploy, so at startup every file is
+read once, index.html is rendered (API_BASE_URL + content-hash asset
+versions), and gzip/brotli variants are precomputed. Requests are then
+answered from memory by StaticAssetResource without touching the WSGI pool.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+from twisted.web.resource import Resource
+
+from config import get_fly_app_name
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is still a big win for script.js
+    brotli = None
+
+logger = logging.getLogger("static_assets")
+
+WEBAPP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "webapp")
+# webapp/templates/ holds server-rendered HTML fragments (with raw
+# {placeholder} markers) — never serve them directly as static files.
+_EXCLUDED_DIRS = {"templates"}
+_EXCLUDED_FILES = {"desktop.ini"}
+# Matches only src="...file.js" / href="...file.css" attribute values, so
+# cache-busting can't corrupt unrelated ".js"/".css" substrings elsewhere in
+# the page (e.g. inside inline <script> text or a ".json" reference).
+_ASSET_VERSION_PATTERN = re.compile(r'((?:src|href)=")([^"?]+\.(?:js|css))(")')
+_COMPRESSIBLE_PREFIXES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_MIN_COMPRESS_BYTES = 512
+_IMMUTABLE_CACHE_CONTROL = b"public, max-age=31536000, immutable"
+_REVALIDATE_CACHE_CONTROL = b"no-cache"
+
+
+class StaticAsset:
+    __slots__ = ("path", "content_type", "version", "variants")
+
+    def __init__(self, path: str, content_type: str, body: bytes):
+        self.path = path
+        self.content_type = content_type
+        self.version = hashlib.sha256(body).hexdigest()[:12]
+        # encoding -> (body, etag); "identity" is always present.
+        self.variants: dict[str, tuple[bytes, bytes]] = {
+            "identity": (body, f'"{self.version}"'.encode("ascii")),
+        }
+        if len(body) >= _MIN_COMPRESS_BYTES and content_type.startswith(_COMPRESSIBLE_PREFIXES):
+            self._add_variant("gzip", gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._add_variant("br", brotli.compress(body))
+
+    def _add_variant(self, encoding: str, compressed: bytes) -> None:
+        if len(compressed) < len(self.variants["identity"][0]):
+            self.variants[encoding] = (compressed, f'"{self.version}-{encoding}"'.encode("ascii"))
+
+
+class StaticAssetStore:
+    def __init__(self, root: str = WEBAPP_DIR):
+        self.root = root
+        self._assets: dict[str, StaticAsset] = {}
+
+    def load(self) -> "StaticAssetStore":
+        assets: dict[str, StaticAsset] = {}
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel_dir = os.path.relpath(dirpath, self.root)
+            if rel_dir == ".":
+                dirnames[:] = [d for d in dirnames if d not in _EXCLUDED_DIRS and not d.startswith(".")]
+            for filename in filenames:
+                if filename.startswith(".") or filename.lower() in _EXCLUDED_FILES:
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                url_path = "/" + os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    body = f.read()
+                content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                if content_type.startswith("text/") or content_type == "application/javascript":
+                    content_type += "; charset=utf-8"
+                assets[url_path] = StaticAsset(url_path, content_type, body)
+
+        index = assets.get("/index.html")
+        if index is not None:
+            rendered = self._render_index(index.variants["identity"][0].decode("utf-8"), assets)
+            index = StaticAsset("/index.html", index.content_type, rendered.encode("utf-8"))
+            assets["/index.html"] = index
+            assets["/"] = index
+
+        self._assets = assets
+        logger.info(
+            f"Static assets loaded: {len(assets)} files, "
+            f"brotli={'on' if brotli is not None else 'off'}"
+        )
+        return self
+
+    @staticmethod
+    def _render_index(content: str, assets: dict[str, StaticAsset]) -> str:
+        content = content.replace(
+            "{{API_BASE_URL}}",
+            f"https://{get_fly_app_name()}.fly.dev" if get_fly_app_name() else "",
+        )
+
+        def _versioned(match):
+            asset = assets.get("/" + match.group(2).lstrip("/"))
+            if asset is None:
+                return match.group(0)
+            return f"{match.group(1)}{match.group(2)}?v={asset.version}{match.group(3)}"
+
+        return _ASSET_VERSION_PATTERN.sub(_versioned, content)
+
+    def get(self, path: str) -> StaticAsset | None:
+        return self._assets.get(path)
+
+    def version(self, path: str) -> str | None:
+        asset = self._assets.get(path)
+        return asset.version if asset else None
+
+
+def _accepted_encodings(header: bytes | None) -> set[str]:
+    accepted = set()
+    for part in (header or b"").decode("latin-1").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def _etag_matches(header: bytes | None, etag: bytes) -> bool:
+    if not header:
+        return False
+    candidates = {item.strip() for item in header.split(b",")}
+    return b"*" in candidates or etag in candidates or b"W/" + etag in candidates
+
+
+class StaticAssetResource(Resource):
+    isLeaf = True
+
+    def __init__(self, store: StaticAssetStore):
+        super().__init__()
+        self.store = store
+
+    def has(self, path: bytes) -> bool:
+        return self.store.get(path.decode("utf-8", errors="ignore")) is not None
+
+    def render_GET(self, request):
+        path = request.path.rstrip(b"/") or b"/"
+        asset = self.store.get(path.decode("utf-8", errors="ignore"))
+        if asset is None:
+            request.setResponseCode(404)
+            return b""
+
+        accepted = _accepted_encodings(request.getHeader(b"accept-encoding"))
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in accepted and candidate in asset.variants:
+                encoding = candidate
+                break
+        body, etag = asset.variants[encoding]
+
+        version = request.args.get(b"v", [b""])[0].decode("ascii", errors="ignore")
+        immutable = asset.path != "/index.html" and version == asset.version
+
+        request.setHeader(b"Content-Type", asset.content_type.encode("ascii"))
+        request.setHeader(b"ETag", etag)
+        request.setHeader(b"Vary", b"Accept-Encoding")
+        request.setHeader(
+            b"Cache-Control",
+            _IMMUTABLE_CACHE_CONTROL if immutable else _REVALIDATE_CACHE_CONTROL,
+        )
+        if encoding != "identity":
+            request.setHeader(b"Content-Encoding", encoding.encode("ascii"))
+
+        if _etag_matches(request.getHeader(b"if-none-match"), etag):
+            request.setResponseCode(304)
+            return b""
+
+        return body
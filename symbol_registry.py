@@ -0,0 +1,153 @@
+# symbol_registry.py
+"""
+One index over the broker's symbol list, built once per symbols load.
+
+Before, every lookup (analysis, autotrader, api, the spot path) built its own
+candidate strings — slash forms, upper/compact variants, config aliases —
+and probed a dict holding several keys per symbol, falling back to a scan of
+all symbols for prefix matches. Now every key variant of a symbol, every
+alias from assets.json and every pair resolved so far points to a dense
+integer index, and per-symbol data sits in parallel arrays:
+
+    index = registry.index("EUR/USD")       # one dict hit after the first call
+    registry.symbol_ids[index], registry.divisors[index], registry.names[index]
+
+Lookups don't lock: the registry is swapped as a whole on a new symbol list,
+and the only in-place writes (bind(), memoized lookups) are single dict/list
+item assignments, atomic under the GIL.
+"""
+import itertools
+import sys
+from array import array
+
+from config import SYMBOL_ALIASES, normalize_symbol_key
+from price_utils import resolve_price_divisor
+
+MISSING = -1
+_generations = itertools.count(1)
+# Скільки невідомих пар (сміття з query string) пам'ятати як «немає».
+_MAX_MEMOIZED_MISSES = 1024
+
+
+def _key_variants(symbol) -> list[str]:
+    raw_name = getattr(symbol, "symbolName", "") or str(getattr(symbol, "symbolId", ""))
+    no_slash = raw_name.replace("/", "").upper().strip()
+    compact = normalize_symbol_key(raw_name)
+    return [key for key in dict.fromkeys((no_slash, compact)) if key]
+
+
+class SymbolRegistry:
+    def __init__(self, symbols=(), details=None):
+        # Росте з кожним новим реєстром — для ETag і кешів, що залежать від символів.
+        self.generation = next(_generations)
+        self.symbols = []
+        self.symbol_ids = array("q")
+        self.divisors = array("q")
+        # ProtoOASymbol.digits — лише для відображення, ціну ділимо на divisors.
+        self.digits = array("b")
+        # Назва, під якою публікуються ціни символу: канонічна, або пара з
+        # конфігурації після bind().
+        self.names = []
+        self._canonical = []
+        self._by_id = {}
+        self._index = {}
+        self._base_keys = []
+        self._misses = 0
+
+        for symbol in symbols:
+            index = len(self.symbols)
+            keys = _key_variants(symbol)
+            self.symbols.append(symbol)
+            self.symbol_ids.append(int(symbol.symbolId))
+            self.divisors.append(resolve_price_divisor(symbol))
+            self.digits.append(MISSING)
+            self._canonical.append(sys.intern(keys[-1] if keys else str(symbol.symbolId)))
+            self._by_id[int(symbol.symbolId)] = index
+            self.names.append(self._canonical[index])
+            for key in keys:
+                key = sys.intern(key)
+                self._index[key] = index
+                self._base_keys.append((key, index))
+
+        for source, target in SYMBOL_ALIASES.items():
+            if target in self._index and source not in self._index:
+                self._index[source] = self._index[target]
+
+        if details:
+            self.set_details(details)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def key_count(self) -> int:
+        return len(self._base_keys)
+
+    def index(self, pair) -> int:
+        """Dense index of the broker symbol for `pair`, or MISSING."""
+        if not pair:
+            return MISSING
+        index = self._index.get(pair)
+        if index is None:
+            index = self._resolve_slow(pair)
+        return index
+
+    def _resolve_slow(self, pair: str) -> int:
+        requested = normalize_symbol_key(pair)
+        index = self._index.get(requested)
+        if index is None:
+            index = self._prefix_match(requested, SYMBOL_ALIASES.get(requested, requested))
+
+        if index != MISSING:
+            self._index[pair] = index
+            self._index[requested] = index
+        elif self._misses < _MAX_MEMOIZED_MISSES:
+            self._misses += 1
+            self._index[pair] = MISSING
+        return index
+
+    def _prefix_match(self, *requested_keys) -> int:
+        # Брокерська назва з суфіксом (EURUSD.m, XAUUSDm): найкоротший
+        # ключ, що починається з запитаної пари.
+        best = None
+        for key, index in self._base_keys:
+            if any(requested and key.startswith(requested) for requested in requested_keys):
+                rank = (len(key), self._canonical[index])
+                if best is None or rank < best[0]:
+                    best = (rank, index)
+        return best[1] if best else MISSING
+
+    def resolve(self, pair):
+        index = self.index(pair)
+        return self.symbols[index] if index != MISSING else None
+
+    def index_of_id(self, symbol_id) -> int:
+        return self._by_id.get(symbol_id, MISSING)
+
+    def name_of_id(self, symbol_id, default=None):
+        index = self._by_id.get(symbol_id, MISSING)
+        return self.names[index] if index != MISSING else default
+
+    def symbol_of_id(self, symbol_id):
+        index = self._by_id.get(symbol_id, MISSING)
+        return self.symbols[index] if index != MISSING else None
+
+    def bind(self, pair: str, index: int) -> None:
+        """A configured pair resolved to this symbol: look it up directly
+        and publish the symbol's prices under the pair's name."""
+        key = sys.intern(normalize_symbol_key(pair))
+        if not key or index == MISSING:
+            return
+        self._index[key] = index
+        self.names[index] = key
+
+    def set_details(self, details: dict) -> None:
+        for symbol_id, values in details.items():
+            index = self._by_id.get(symbol_id, MISSING)
+            digits = values.get("digits")
+            if index != MISSING and isinstance(digits, int) and 0 <= digits < 128:
+                self.digits[index] = digits
+
+    def all_names(self) -> list[str]:
+        """Canonical broker names, whatever bind() did to `names`."""
+        return sorted(self._canonical)
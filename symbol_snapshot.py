@@ -0,0 +1,108 @@
+# symbol_snapshot.py
+"""
+Local snapshot of the cTrader symbol list for a fast cold start.
+
+ProtoOASymbolsListRes is a few thousand light symbols; downloading and
+indexing it after every start/reconnect kept prices and analysis idle for
+the whole round trip. ctrader.py saves the list here (plus the
+ProtoOASymbolByIdRes details of the configured symbols) after each live
+load, and loads it at boot before the account is even authorized. The live
+list is still requested in the background and replaces the snapshot.
+
+The file is gzipped JSON, one short row per symbol. It is tied to the
+trading account: a snapshot of another account is ignored.
+
+`digits` is stored for display only. Spot and trendbar prices are integers
+in 1/100000 of a unit whatever the symbol's digits, so the details are never
+merged into the light symbols and resolve_price_divisor keeps returning 10^5.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+
+from sqlalchemy.engine import make_url
+
+import db
+from config import BASE_DIR, CTRADER_SYMBOL_SNAPSHOT_PATH
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOALightSymbol
+
+logger = logging.getLogger("symbol_snapshot")
+
+_VERSION = 1
+_LIGHT_FIELDS = ("symbolId", "symbolName", "enabled", "baseAssetId", "quoteAssetId", "symbolCategoryId", "description")
+DETAIL_FIELDS = ("digits", "pipPosition", "lotSize", "minVolume", "maxVolume", "stepVolume")
+
+
+def snapshot_path() -> str:
+    """Explicit path, else next to a SQLite database file (the Fly volume,
+    so it survives a deploy), else data/ in the app directory."""
+    if CTRADER_SYMBOL_SNAPSHOT_PATH:
+        return CTRADER_SYMBOL_SNAPSHOT_PATH
+    url = db.DATABASE_URL or ""
+    if db._is_sqlite_url(url) and not db._is_sqlite_memory_url(url):
+        return os.path.join(os.path.dirname(os.path.abspath(make_url(url).database)), "ctrader_symbols.json.gz")
+    return str(BASE_DIR / "data" / "ctrader_symbols.json.gz")
+
+
+def _field(message, name):
+    return getattr(message, name) if message.HasField(name) else None
+
+
+def symbol_details(symbol) -> dict:
+    """The ProtoOASymbol fields we keep, as a plain dict."""
+    return {name: getattr(symbol, name) for name in DETAIL_FIELDS if symbol.HasField(name)}
+
+
+def save(account_id, symbols, details: dict, path: str | None = None) -> str:
+    """Atomically writes the snapshot. Blocking — call from a pool thread."""
+    path = path or snapshot_path()
+    payload = {
+        "version": _VERSION,
+        "account_id": int(account_id),
+        "saved_at": int(time.time()),
+        "fields": list(_LIGHT_FIELDS),
+        "symbols": [[_field(symbol, name) for name in _LIGHT_FIELDS] for symbol in symbols],
+        "details": {str(symbol_id): values for symbol_id, values in details.items()},
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(account_id, path: str | None = None) -> dict | None:
+    """{"symbols": [ProtoOALightSymbol], "details": {symbolId: dict},
+    "saved_at": ts} or None if there is no usable snapshot."""
+    path = path or snapshot_path()
+    if not account_id or not os.path.exists(path):
+        return None
+
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+    except Exception:
+        logger.warning("Знімок символів cTrader пошкоджено, ігнорую: %s", path, exc_info=True)
+        return None
+
+    if payload.get("version") != _VERSION or payload.get("account_id") != int(account_id):
+        logger.info("Знімок символів cTrader від іншого акаунта чи версії, ігнорую: %s", path)
+        return None
+
+    fields = payload.get("fields") or []
+    symbols = []
+    for row in payload.get("symbols") or []:
+        values = {name: value for name, value in zip(fields, row) if value is not None and name in _LIGHT_FIELDS}
+        if "symbolId" in values:
+            symbols.append(ProtoOALightSymbol(**values))
+
+    details = {}
+    for symbol_id, values in (payload.get("details") or {}).items():
+        details[int(symbol_id)] = {name: value for name, value in values.items() if name in DETAIL_FIELDS}
+
+    return {"symbols": symbols, "details": details, "saved_at": payload.get("saved_at")}
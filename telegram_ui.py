@@ -16,6 +16,7 @@ from twisted.internet import reactor
 from twisted.internet.threads import deferToThreadPool
 
 import autotrader
+import ctrader
 import db
 import crypto_pay
 from analysis import get_api_detailed_signal_data
@@ -783,6 +784,7 @@ def button_handler(update: Update, context: CallbackContext):
     if action == "toggle" and len(parts) > 2:
         cat = parts[2]
         app_state.set_scanner_state(cat, not app_state.get_scanner_state(cat))
+        reactor.callFromThread(ctrader.request_price_demand_refresh)
         menu(update, context)
         return
 
@@ -884,7 +886,7 @@ def button_handler(update: Update, context: CallbackContext):
         app_state.mark_manual_analysis_request()
         d = get_api_detailed_signal_data(
             app_state.client,
-            app_state.symbol_cache,
+            app_state.symbol_registry,
             symbol,
             chat_id,
             exp,
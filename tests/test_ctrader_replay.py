@@ -0,0 +1,295 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from twisted.internet import task
+from twisted.internet.testing import StringTransport
+
+from ctrader_open_api.factory import Factory
+from ctrader_open_api.messages.OpenApiCommonMessages_pb2 import ProtoMessage
+from ctrader_open_api.messages.OpenApiMessages_pb2 import (
+    ProtoOAAccountAuthRes,
+    ProtoOAApplicationAuthRes,
+    ProtoOAGetTrendbarsReq,
+    ProtoOAGetTrendbarsRes,
+    ProtoOASpotEvent,
+    ProtoOASymbolByIdReq,
+    ProtoOASymbolByIdRes,
+    ProtoOASymbolsListReq,
+    ProtoOASymbolsListRes,
+)
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOASymbol, ProtoOATrendbarPeriod
+from ctrader_open_api.protobuf import Protobuf
+from ctrader_open_api.tcpProtocol import TcpProtocol
+
+import ctrader_replay
+import spotware_connect
+from ctrader_replay import FrameRecorder, ReplayClient, read_recording
+
+
+def _wire(message, client_msg_id=None) -> bytes:
+    envelope = ProtoMessage(payloadType=message.payloadType, payload=message.SerializeToString())
+    if client_msg_id:
+        envelope.clientMsgId = client_msg_id
+    data = envelope.SerializeToString()
+    return struct.pack("!I", len(data)) + data
+
+
+def _spot(symbol_id, bid):
+    return ProtoOASpotEvent(ctidTraderAccountId=1, symbolId=symbol_id, bid=bid)
+
+
+class _Client:
+    numberOfMessagesToSendPerSecond = 5
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.received = []
+
+    def _connected(self, protocol):
+        pass
+
+    def _disconnected(self, reason):
+        pass
+
+    def _received(self, message):
+        self.received.append(message)
+
+
+class ReplayTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "frames.bin")
+        self.clock = task.Clock()
+
+    def _record(self, frames):
+        """frames: [(receive offset, wire bytes)] -> recording via TcpProtocol."""
+        offsets = iter([0.0] + [offset for offset, _ in frames])
+        recorder = FrameRecorder(self.path, clock=lambda: next(offsets))
+        client = _Client(recorder)
+        protocol = TcpProtocol(clock=self.clock)
+        protocol.factory = Factory(client=client)
+        protocol.makeConnection(StringTransport())
+        for _, data in frames:
+            protocol.dataReceived(data)
+        protocol.connectionLost(None)
+        recorder.close()
+        return client
+
+
+class FrameRecorderTest(ReplayTestCase):
+    def test_recording_is_the_wire_stream_plus_receive_times(self):
+        frames = [(0.5, _wire(_spot(1, 108000))), (1.25, _wire(_spot(2, 126000))), (3.0, _wire(_spot(1, 108010)))]
+
+        client = self._record(frames)
+
+        with open(self.path, "rb") as f:
+            # Той самий формат, що читає ctrader_benchmark.py --frames.
+            self.assertEqual(f.read(), b"".join(data for _, data in frames))
+        recorded, times = read_recording(self.path)
+        self.assertEqual(recorded, [data for _, data in frames])
+        self.assertEqual(list(times), [0.5, 1.25, 3.0])
+        self.assertEqual(len(client.received), 3)
+
+    def test_recording_without_sidecar_replays_at_max_speed_only(self):
+        self._record([(1.0, _wire(_spot(1, 108000))), (2.0, _wire(_spot(2, 126000)))])
+        os.remove(ctrader_replay.times_path(self.path))
+
+        frames, times = read_recording(self.path)
+
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(list(times), [0.0, 0.0])
+
+
+class ReplayClientTest(ReplayTestCase):
+    def _replay(self, speed, **kwargs):
+        client = ReplayClient(self.path, speed=speed, clock=self.clock, **kwargs)
+        received = []
+        client.setMessageReceivedCallback(lambda _, message: received.append(Protobuf.extract(message, ProtoOASpotEvent)))
+        self.addCleanup(client.stopService)
+        return client, received
+
+    def test_frames_follow_the_recorded_pace_scaled_by_speed(self):
+        self._record([(0.0, _wire(_spot(1, 1))), (1.0, _wire(_spot(2, 2))), (4.0, _wire(_spot(3, 3)))])
+        client, received = self._replay(speed=2)
+        done = []
+        client.done.addCallback(done.append)
+
+        client.startService()
+        self.clock.advance(0)
+        self.assertEqual([spot.symbolId for spot in received], [1])
+
+        self.clock.advance(0.5)
+        self.assertEqual([spot.symbolId for spot in received], [1, 2])
+        self.assertEqual(done, [])
+
+        self.clock.advance(1.5)
+        self.assertEqual([spot.symbolId for spot in received], [1, 2, 3])
+        self.assertEqual(done[0]["frames"], 3)
+
+    def test_max_speed_delivers_socket_sized_reads(self):
+        self._record([(float(i), _wire(_spot(i, i))) for i in range(1, 21)])
+        client, received = self._replay(speed=0, chunk_size=64)
+
+        client.startService()
+        for _ in range(20):
+            self.clock.advance(0)
+
+        self.assertEqual([spot.symbolId for spot in received], list(range(1, 21)))
+        self.assertTrue(client.done.called)
+        self.assertGreater(client.stats["reads"], 1)
+
+    def test_requests_get_the_next_recorded_response_of_their_type(self):
+        self._record([
+            (0.0, _wire(ProtoOASymbolsListRes(ctidTraderAccountId=1), "recorded-1")),
+            (1.0, _wire(ProtoOASymbolsListRes(ctidTraderAccountId=2), "recorded-2")),
+        ])
+        client, _ = self._replay(speed=1)
+        responses = []
+
+        client.startService()
+        self.clock.advance(0)
+        # Записана відповідь чекає на свій запит, а не губиться до нього.
+        self.assertEqual(client.stats["frames"], 0)
+        client.send(ProtoOASymbolsListReq(ctidTraderAccountId=1)).addCallback(responses.append)
+        # Ця чекає на наступну записану відповідь.
+        client.send(ProtoOASymbolsListReq(ctidTraderAccountId=1)).addCallback(responses.append)
+        self.clock.advance(1.0)
+
+        self.assertEqual(
+            [Protobuf.extract(message, ProtoOASymbolsListRes).ctidTraderAccountId for message in responses], [1, 2],
+        )
+        self.assertEqual(client.stats["responses_matched"], 2)
+
+    def test_trendbar_and_symbol_responses_are_matched_by_request_content(self):
+        M1, M5 = ProtoOATrendbarPeriod.M1, ProtoOATrendbarPeriod.M5
+        self._record([
+            (0.0, _wire(ProtoOAGetTrendbarsRes(ctidTraderAccountId=1, symbolId=2, period=M1, timestamp=0), "recorded-1")),
+            (0.0, _wire(ProtoOASymbolByIdRes(ctidTraderAccountId=1, symbol=[ProtoOASymbol(symbolId=2, digits=5, pipPosition=4)]), "recorded-2")),
+            (1.0, _wire(ProtoOAGetTrendbarsRes(ctidTraderAccountId=1, symbolId=1, period=M5, timestamp=0), "recorded-3")),
+            (1.0, _wire(ProtoOASymbolByIdRes(ctidTraderAccountId=1, symbol=[ProtoOASymbol(symbolId=1, digits=5, pipPosition=4)]), "recorded-4")),
+        ])
+        client, _ = self._replay(speed=1)
+        trendbars = {}
+        details = {}
+
+        def trendbars_req(symbol_id, period):
+            req = ProtoOAGetTrendbarsReq(
+                ctidTraderAccountId=1, symbolId=symbol_id, period=period, fromTimestamp=0, toTimestamp=1,
+            )
+            client.send(req).addCallback(
+                lambda message: trendbars.__setitem__((symbol_id, period), Protobuf.extract(message, ProtoOAGetTrendbarsRes))
+            )
+
+        def details_req(symbol_id):
+            client.send(ProtoOASymbolByIdReq(ctidTraderAccountId=1, symbolId=[symbol_id])).addCallback(
+                lambda message: details.__setitem__(symbol_id, Protobuf.extract(message, ProtoOASymbolByIdRes))
+            )
+
+        client.startService()
+        # Запити йдуть не в тому порядку, в якому записано відповіді.
+        trendbars_req(1, M5)
+        details_req(1)
+        self.clock.advance(0)
+        trendbars_req(2, M1)
+        details_req(2)
+        self.clock.advance(1.0)
+
+        self.assertEqual({key: (res.symbolId, res.period) for key, res in trendbars.items()}, {(1, M5): (1, M5), (2, M1): (2, M1)})
+        self.assertEqual({key: res.symbol[0].symbolId for key, res in details.items()}, {1: 1, 2: 2})
+        self.assertEqual(client.stats["responses_matched"], 4)
+
+    def _bot_run(self):
+        """Max-speed replay into a bot that, like ctrader.on_ctrader_ready,
+        asks for the symbol list a second after auth and drops every spot
+        until it has it. Returns the number of spots it published."""
+        client, _ = self._replay(speed=0, response_wait=30)
+        published = []
+        symbols = []
+
+        def on_message(_, message):
+            if message.payloadType == ProtoOASpotEvent().payloadType and symbols:
+                published.append(Protobuf.extract(message, ProtoOASpotEvent).symbolId)
+            elif message.payloadType == ProtoOAAccountAuthRes().payloadType:
+                self.clock.callLater(1.0, lambda: client.send(ProtoOASymbolsListReq(ctidTraderAccountId=77)).addCallback(symbols.append))
+
+        client.setMessageReceivedCallback(on_message)
+        client.startService()
+        self.clock.pump([0] * 5 + [0.5] * 4 + [0] * 60)
+        self.assertTrue(client.done.called)
+        return len(published), client.stats
+
+    def test_max_speed_replay_is_deterministic_and_waits_for_the_symbol_request(self):
+        self._record(
+            [(0.0, _wire(ProtoOAAccountAuthRes(ctidTraderAccountId=77), "auth"))]
+            + [(1.1, _wire(ProtoOASymbolsListRes(ctidTraderAccountId=77), "symbols"))]
+            + [(1.2 + i / 1000, _wire(_spot(i % 7 + 1, 108000 + i))) for i in range(500)]
+        )
+
+        first, stats = self._bot_run()
+        second, _ = self._bot_run()
+
+        self.assertEqual(first, 500)
+        self.assertEqual(second, first)
+        self.assertEqual((stats["responses_waited"], stats["response_wait_timeouts"]), (1, 0))
+
+    def test_response_nobody_asks_for_is_released_after_the_wait(self):
+        self._record([
+            (0.0, _wire(ProtoOASymbolsListRes(ctidTraderAccountId=1), "never-requested")),
+            (0.0, _wire(_spot(1, 1))),
+        ])
+        client, received = self._replay(speed=0, response_wait=2)
+
+        client.startService()
+        self.clock.advance(0)
+        self.assertEqual(received, [])
+
+        self.clock.pump([2.0, 0, 0])
+
+        self.assertEqual(len(received), 2)
+        self.assertEqual(client.stats["response_wait_timeouts"], 1)
+        self.assertEqual(client.stats["responses_unclaimed"], 1)
+        self.assertTrue(client.done.called)
+
+
+class ReplaySessionTest(ReplayTestCase):
+    def setUp(self):
+        super().setUp()
+        patchers = [
+            patch.object(spotware_connect, "reactor", self.clock),
+            patch.object(spotware_connect, "isInIOThread", return_value=True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_recorded_handshake_makes_the_session_ready_without_auth_requests(self):
+        self._record([
+            (2.0, _wire(ProtoOAApplicationAuthRes(), "auth")),
+            (3.0, _wire(ProtoOAAccountAuthRes(ctidTraderAccountId=77), "account")),
+            (3.5, _wire(_spot(5, 108000))),
+        ])
+        replay = ReplayClient(self.path, speed=0, clock=self.clock)
+        connect = spotware_connect.SpotwareConnect("replay", "replay", client_factory=lambda host, port: replay)
+        self.addCleanup(connect.stop)
+        events = []
+        connect.on("ready", lambda: events.append("ready"))
+        connect.on("spot_event", lambda spot: events.append(spot.symbolId))
+
+        with patch.object(connect, "_refresh_access_token_http") as refresh:
+            connect.start()
+            self.clock.pump([0, 0, 1.0, 2.0])
+
+        self.assertTrue(connect.replay)
+        self.assertEqual(events, ["ready", 5])
+        self.assertTrue(connect.is_authorized)
+        self.assertEqual(replay.account_id, 77)
+        refresh.assert_not_called()
+        self.assertEqual(replay.protocol.queuedCount(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
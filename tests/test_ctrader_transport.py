@@ -0,0 +1,643 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from twisted.internet import task
+from twisted.internet.protocol import Factory
+from twisted.internet.testing import StringTransport
+
+from ctrader_open_api.messages.OpenApiCommonMessages_pb2 import ProtoMessage
+from ctrader_open_api.messages.OpenApiMessages_pb2 import (
+    ProtoOAGetTrendbarsReq,
+    ProtoOANewOrderReq,
+    ProtoOASpotEvent,
+    ProtoOASubscribeSpotsReq,
+    ProtoOAVersionReq,
+)
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOAOrderType, ProtoOATradeSide, ProtoOATrendbarPeriod
+from ctrader_open_api.protobuf import DecodedMessage, Protobuf
+from ctrader_open_api.tcpProtocol import TcpProtocol
+
+import ctrader
+import spotware_connect
+from live_prices import LivePriceTable
+from spot_subscriptions import SpotSubscriptionManager
+from symbol_registry import SymbolRegistry
+from state import app_state
+
+
+def _trendbars_req():
+    return ProtoOAGetTrendbarsReq(
+        ctidTraderAccountId=1, symbolId=1, period=ProtoOATrendbarPeriod.M1,
+        fromTimestamp=0, toTimestamp=60_000,
+    )
+
+
+def _subscribe_req():
+    return ProtoOASubscribeSpotsReq(ctidTraderAccountId=1, symbolId=[1])
+
+
+def _order_req():
+    return ProtoOANewOrderReq(
+        ctidTraderAccountId=1, symbolId=1, orderType=ProtoOAOrderType.MARKET,
+        tradeSide=ProtoOATradeSide.BUY, volume=1000,
+    )
+
+
+class _FakeFactory(Factory):
+    numberOfMessagesToSendPerSecond = 5
+
+    def __init__(self):
+        self.connected_protocols = []
+        self.disconnects = 0
+
+    def connected(self, protocol):
+        self.connected_protocols.append(protocol)
+
+    def disconnected(self, reason):
+        self.disconnects += 1
+
+    def received(self, message):
+        pass
+
+
+class _RecordingProtocol(TcpProtocol):
+    def __init__(self, clock):
+        super().__init__(clock=clock)
+        self.sent_frames = []
+
+    def sendString(self, data):
+        self.sent_frames.append((self.clock.seconds(), data))
+
+
+class TcpProtocolSendSchedulerTest(unittest.TestCase):
+    """Rolling-window pacing: a message leaves as soon as fewer than `rate`
+    went out in the last second, instead of waiting for a 1s batch tick."""
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.factory = _FakeFactory()
+        self.protocol = self._connect()
+
+    def tearDown(self):
+        if self.protocol.connected:
+            self.protocol.connectionLost(None)
+
+    def _connect(self):
+        protocol = _RecordingProtocol(self.clock)
+        protocol.factory = self.factory
+        protocol.makeConnection(StringTransport())
+        return protocol
+
+    def _send(self, protocol=None, count=1, isCanceled=None, make_message=ProtoOAVersionReq):
+        protocol = protocol or self.protocol
+        for _ in range(count):
+            protocol.send(make_message(), isCanceled=isCanceled)
+
+    def _sent_payload_types(self):
+        types = []
+        for _, data in self.protocol.sent_frames:
+            msg = ProtoMessage()
+            msg.ParseFromString(data)
+            types.append(msg.payloadType)
+        return types
+
+    def test_sends_immediately_when_slots_available(self):
+        self._send(count=3)
+
+        self.assertEqual(len(self.protocol.sent_frames), 3)
+        self.assertEqual(self.protocol.sendQueueStats()["depth"], 0)
+        self.assertEqual(self.protocol.sendQueueStats()["wait_ms_max"], 0.0)
+
+    def test_spread_out_messages_never_wait(self):
+        for _ in range(10):
+            self._send()
+            self.clock.advance(0.3)
+
+        self.assertEqual(len(self.protocol.sent_frames), 10)
+        self.assertEqual(self.protocol.sendQueueStats()["delayed"], 0)
+
+    def test_excess_messages_wait_exactly_for_a_free_slot(self):
+        self._send(count=4)
+        self.clock.advance(0.5)
+        self._send(count=3)
+        self.assertEqual(len(self.protocol.sent_frames), 5)
+
+        self.clock.advance(0.49)
+        self.assertEqual(len(self.protocol.sent_frames), 5)
+        self.clock.advance(0.01)
+        self.assertEqual(len(self.protocol.sent_frames), 7)
+
+        stats = self.protocol.sendQueueStats()
+        self.assertEqual(stats["sent"], 7)
+        self.assertEqual(stats["delayed"], 2)
+        self.assertAlmostEqual(stats["wait_ms_max"], 500.0, places=1)
+        self.assertEqual(stats["depth"], 0)
+
+    def test_never_exceeds_rate_in_any_one_second_window(self):
+        self._send(count=20)
+        for _ in range(50):
+            self.clock.advance(0.1)
+
+        times = [ts for ts, _ in self.protocol.sent_frames]
+        self.assertEqual(len(times), 20)
+        for i, start in enumerate(times):
+            in_window = [ts for ts in times[i:] if ts < start + 1.0 - 1e-9]
+            self.assertLessEqual(len(in_window), 5)
+
+    def test_canceled_messages_do_not_consume_slots(self):
+        self._send(count=2, isCanceled=lambda: True)
+        self._send(count=5)
+
+        self.assertEqual(len(self.protocol.sent_frames), 5)
+        self.assertEqual(self.protocol.sendQueueStats()["canceled"], 2)
+
+    def test_queue_is_per_connection_and_dropped_on_disconnect(self):
+        other = self._connect()
+        self._send(count=8)
+
+        self.assertEqual(self.protocol.sendQueueStats()["depth"], 3)
+        self.assertEqual(other.sendQueueStats()["depth"], 0)
+        self.assertEqual(other.sent_frames, [])
+
+        self.protocol.connectionLost(None)
+        self.clock.advance(5)
+
+        self.assertEqual(len(self.protocol.sent_frames), 5)
+        self.assertEqual(self.protocol.sendQueueStats()["dropped"], 3)
+        self.assertEqual(self.factory.disconnects, 1)
+        other.connectionLost(None)
+
+    def test_order_jumps_ahead_of_queued_market_data(self):
+        self._send(count=8, make_message=_trendbars_req)
+        self._send(count=2, make_message=_subscribe_req)
+        self._send(make_message=_order_req)
+
+        self.clock.advance(1.0)
+
+        order_type = ProtoOANewOrderReq().payloadType
+        sub_type = ProtoOASubscribeSpotsReq().payloadType
+        bars_type = ProtoOAGetTrendbarsReq().payloadType
+        self.assertEqual(
+            self._sent_payload_types()[5:],
+            [order_type, sub_type, sub_type, bars_type, bars_type],
+        )
+
+        lanes = self.protocol.sendQueueStats()["lanes"]
+        self.assertEqual(lanes["orders"]["sent"], 1)
+        self.assertAlmostEqual(lanes["orders"]["wait_ms_max"], 1000.0, places=1)
+        self.assertEqual(lanes["market_data"]["depth"], 1)
+        self.assertEqual(lanes["control"]["sent"], 0)
+
+    def test_idle_connection_sends_heartbeat(self):
+        self.clock.advance(1)
+
+        self.assertEqual(len(self.protocol.sent_frames), 1)
+
+
+class _FakeReactor(task.Clock):
+    def __init__(self):
+        super().__init__()
+        self.cross_thread_calls = []
+
+    def callFromThread(self, fn, *args, **kwargs):
+        self.cross_thread_calls.append((fn, args, kwargs))
+
+
+def _spot(symbol_id, bid=None, ask=None):
+    event = ProtoOASpotEvent(ctidTraderAccountId=1, symbolId=symbol_id)
+    if bid is not None:
+        event.bid = bid
+    if ask is not None:
+        event.ask = ask
+    return event
+
+
+class EventEmitterDispatchTest(unittest.TestCase):
+    """Reactor-thread events skip callFromThread; batched events are
+    delivered once per reactor turn."""
+
+    def setUp(self):
+        self.reactor = _FakeReactor()
+        patcher = patch.object(spotware_connect, "reactor", self.reactor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.emitter = spotware_connect.EventEmitter()
+        self.received = []
+
+    def _in_io_thread(self, value):
+        patcher = patch.object(spotware_connect, "isInIOThread", return_value=value)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reactor_thread_emit_runs_handlers_directly(self):
+        self._in_io_thread(True)
+        self.emitter.on("ready", lambda: self.received.append("ready"))
+
+        self.emitter.emit("ready")
+
+        self.assertEqual(self.received, ["ready"])
+        self.assertEqual(self.reactor.cross_thread_calls, [])
+        self.assertEqual(self.emitter.dispatch_stats["direct"], 1)
+
+    def test_other_thread_emit_goes_through_call_from_thread(self):
+        self._in_io_thread(False)
+        self.emitter.on("error", self.received.append)
+
+        self.emitter.emit("error", "DISCONNECTED")
+
+        self.assertEqual(self.received, [])
+        fn, args, kwargs = self.reactor.cross_thread_calls[0]
+        fn(*args, **kwargs)
+        self.assertEqual(self.received, ["DISCONNECTED"])
+
+    def test_batched_events_are_delivered_once_per_turn(self):
+        self._in_io_thread(True)
+        batches = []
+        self.emitter.on_batch("spot_event", batches.append)
+        self.emitter.on("spot_event", self.received.append)
+
+        for i in range(3):
+            self.emitter.emit_batched("spot_event", i)
+        self.assertEqual(batches, [])
+
+        self.reactor.advance(0)
+
+        self.assertEqual(batches, [[0, 1, 2]])
+        self.assertEqual(self.received, [0, 1, 2])
+        self.assertEqual(self.emitter.dispatch_stats["batches"], 1)
+        self.assertEqual(len(self.reactor.getDelayedCalls()), 0)
+
+    def test_pending_batch_is_flushed_before_a_later_event_of_the_same_read(self):
+        self._in_io_thread(True)
+        self.emitter.on_batch("spot_event", lambda items: self.received.append(("spots", items)))
+        self.emitter.on("execution_event", lambda event: self.received.append(("execution", event)))
+
+        self.emitter.emit_batched("spot_event", 1)
+        self.emitter.emit_batched("spot_event", 2)
+        self.emitter.emit("execution_event", "filled")
+        self.emitter.emit_batched("spot_event", 3)
+        self.reactor.advance(0)
+
+        self.assertEqual(self.received, [("spots", [1, 2]), ("execution", "filled"), ("spots", [3])])
+
+    def test_batched_emit_without_batch_handlers_is_direct(self):
+        self._in_io_thread(True)
+        self.emitter.on("spot_event", self.received.append)
+
+        self.emitter.emit_batched("spot_event", "tick")
+
+        self.assertEqual(self.received, ["tick"])
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+
+class SpotBatchCoalescingTest(unittest.TestCase):
+    def setUp(self):
+        patchers = [
+            patch.object(app_state, "symbol_registry", SymbolRegistry([
+                SimpleNamespace(symbolId=1, symbolName="EURUSD", digits=5),
+                SimpleNamespace(symbolId=2, symbolName="GBPUSD", digits=5),
+            ])),
+            patch.object(app_state, "live_prices", LivePriceTable()),
+            patch.object(app_state, "has_sse_listeners", return_value=True),
+            patch.object(app_state, "publish_price_sse"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_repeated_ticks_collapse_to_latest_quote_per_symbol(self):
+        ctrader._on_spot_events([
+            _spot(1, bid=108000, ask=108010),
+            _spot(2, bid=126000),
+            _spot(1, bid=108005),
+            _spot(2),
+        ])
+
+        published = {call.args[0]["pair"]: call.args[0] for call in app_state.publish_price_sse.call_args_list}
+        self.assertEqual(app_state.publish_price_sse.call_count, 2)
+        self.assertAlmostEqual(published["EURUSD"]["bid"], 1.08005)
+        self.assertAlmostEqual(published["EURUSD"]["ask"], 1.0801)
+        self.assertAlmostEqual(published["GBPUSD"]["mid"], 1.26)
+        self.assertIsNone(published["GBPUSD"]["ask"])
+
+        eurusd = app_state.get_live_price("EURUSD")
+        self.assertEqual(eurusd["ticks"], 1)
+        self.assertAlmostEqual(eurusd["mid"], 1.080075)
+        self.assertIsNone(app_state.get_live_price("GBPUSD")["ask"])
+
+    def test_no_sse_event_is_built_without_price_listeners(self):
+        app_state.has_sse_listeners.return_value = False
+
+        ctrader._on_spot_events([_spot(1, bid=108000, ask=108010)])
+
+        app_state.publish_price_sse.assert_not_called()
+        self.assertAlmostEqual(app_state.get_live_price("EURUSD")["bid"], 1.08)
+
+
+class SpotSubscriptionManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.sent = []
+        self.manager = SpotSubscriptionManager(
+            lambda ids: self.sent.append(("sub", list(ids))),
+            lambda ids: self.sent.append(("unsub", list(ids))),
+            batch_size=2,
+            unsubscribe_grace=60,
+            resubscribe_backoff=30,
+            max_resubscribe_backoff=100,
+            clock=lambda: self.now,
+        )
+
+    def test_only_the_difference_is_sent_and_drops_wait_for_grace(self):
+        self.manager.reconcile({"EURUSD": 1, "GBPUSD": 2, "USDJPY": 3})
+        self.assertEqual(self.sent, [("sub", [1, 2]), ("sub", [3])])
+
+        self.sent.clear()
+        result = self.manager.reconcile({"EURUSD": 1, "GBPUSD": 2, "USDJPY": 3})
+        self.assertEqual(self.sent, [])
+        self.assertEqual(result["subscribed"], [])
+
+        result = self.manager.reconcile({"EURUSD": 1, "AUDUSD": 4})
+        self.assertEqual(self.sent, [("sub", [4])])
+        self.assertEqual(result["unsubscribed"], [])
+        self.assertEqual(self.manager.stats()["pending_unsubscribe"], 2)
+
+        self.now += 61
+        self.sent.clear()
+        result = self.manager.reconcile({"EURUSD": 1, "AUDUSD": 4})
+        self.assertEqual(self.sent, [("unsub", [2, 3])])
+        self.assertEqual(result["unsubscribed"], ["GBPUSD", "USDJPY"])
+        self.assertEqual(sorted(self.manager.subscribed_pairs()), ["AUDUSD", "EURUSD"])
+
+    def test_returning_demand_cancels_pending_unsubscribe(self):
+        self.manager.reconcile({"EURUSD": 1})
+        self.manager.reconcile({})
+        self.now += 30
+        self.manager.reconcile({"EURUSD": 1})
+        self.now += 60
+        self.sent.clear()
+        self.manager.reconcile({"EURUSD": 1})
+        self.assertEqual(self.sent, [])
+        self.assertTrue(self.manager.is_subscribed(1))
+
+    def test_only_stale_symbols_are_resubscribed_with_backoff(self):
+        self.manager.reconcile({"EURUSD": 1, "GBPUSD": 2, "USDJPY": 3})
+        self.now += 100
+        prices = {"GBPUSD": self.now - 50}
+
+        def stale():
+            prices["EURUSD"] = self.now - 1
+            return sorted(self.manager.stale_symbols(prices, fresh_seconds=20, grace_seconds=60))
+
+        self.assertEqual(stale(), [2, 3])
+
+        self.sent.clear()
+        self.manager.resubscribe(stale())
+        self.assertEqual(self.sent, [("unsub", [2, 3]), ("sub", [2, 3])])
+
+        self.now += 29
+        self.assertEqual(stale(), [])
+        self.now += 1
+        self.manager.resubscribe(stale())
+        # Друга спроба — з подвоєною паузою.
+        self.now += 59
+        self.assertEqual(stale(), [])
+        self.now += 1
+        self.assertEqual(stale(), [2, 3])
+        self.assertEqual(self.manager.stats()["targeted_resubscribes"], 4)
+
+    def test_reset_forgets_server_side_state(self):
+        self.manager.reconcile({"EURUSD": 1})
+        self.manager.reset()
+        self.sent.clear()
+        self.manager.reconcile({"EURUSD": 1})
+        self.assertEqual(self.sent, [("sub", [1])])
+
+
+class OnDemandPriceDemandTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.refreshes = []
+        patchers = [
+            patch.object(ctrader.time, "time", side_effect=lambda: self.now),
+            patch.object(ctrader, "isInIOThread", return_value=True),
+            patch.object(ctrader, "request_price_demand_refresh", side_effect=lambda: self.refreshes.append(self.now)),
+            patch.object(ctrader, "_on_demand_pairs", {}),
+            patch.object(app_state, "SYMBOLS_LOADED", False),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_registered_pair_is_demanded_until_its_ttl_runs_out(self):
+        ctrader.register_price_demand(["eur/usd"], ttl=60)
+        self.assertEqual(ctrader._on_demand_price_pairs(), ["EURUSD"])
+        self.assertEqual(self.refreshes, [1000.0])
+
+        # Повторний запит лише продовжує строк — без нового оновлення підписок.
+        self.now += 50
+        ctrader.register_price_demand(["EURUSD"], ttl=60)
+        self.assertEqual(self.refreshes, [1000.0])
+
+        self.now += 59
+        self.assertEqual(ctrader._on_demand_price_pairs(), ["EURUSD"])
+        self.now += 1
+        self.assertEqual(ctrader._on_demand_price_pairs(), [])
+
+        ctrader.register_price_demand(["EURUSD"], ttl=60)
+        self.assertEqual(len(self.refreshes), 2)
+
+    def test_collect_price_demand_includes_on_demand_pairs(self):
+        ctrader.register_price_demand(["GBPJPY"])
+        with patch("scanner.get_scan_universe", return_value=[]), \
+                patch.object(ctrader, "_web_app_price_demand", return_value=[]), \
+                patch.object(ctrader.db, "get_open_auto_trade_pairs", return_value=[]), \
+                patch.object(ctrader.db, "get_pending_signal_outcome_pairs", return_value=[]):
+            demand = ctrader.collect_price_demand()
+
+        self.assertEqual(demand["on_demand"], ["GBPJPY"])
+
+
+class _FakeSession:
+    def __init__(self, client_id=None, client_secret=None, *, host_index=0, standby=False, **transport):
+        self.host = f"host-{host_index}"
+        self.port = 5035
+        self.host_index = host_index
+        self.standby = standby
+        self.app_authorized = False
+        self.is_authorized = not standby
+        self.handlers = {}
+        self.started = self.stopped = self.promoted = False
+
+    def on(self, event, func):
+        self.handlers.setdefault(event, []).append(func)
+
+    on_batch = on
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+    def promote(self):
+        self.promoted = True
+        self.standby = False
+        return True
+
+
+class StandbyFailoverTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = task.Clock()
+        self.primary = _FakeSession()
+        patchers = [
+            patch.object(ctrader, "CTRADER_HOT_STANDBY", True),
+            patch.object(ctrader, "SpotwareConnect", _FakeSession),
+            patch.object(ctrader, "reactor", self.clock),
+            patch.object(ctrader, "_standby_client", None),
+            patch.object(ctrader, "_reconnect_scheduled", False),
+            patch.object(ctrader, "_reconnect_attempt", 0),
+            patch.object(ctrader, "_failover_count", 0),
+            patch.object(ctrader, "_last_failover_ts", 0.0),
+            patch.object(app_state, "client", self.primary),
+            patch.object(app_state, "clear_symbol_state"),
+            patch.object(app_state, "clear_live_prices"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _standby(self, ready=True):
+        ctrader._start_standby()
+        standby = ctrader._standby_client
+        standby.app_authorized = ready
+        return standby
+
+    def test_standby_goes_to_the_next_host(self):
+        standby = self._standby()
+        self.assertTrue(standby.standby)
+        self.assertTrue(standby.started)
+        self.assertEqual(standby.host_index, 1)
+
+    def test_failure_promotes_ready_standby_and_keeps_state(self):
+        standby = self._standby()
+
+        ctrader._handle_error("DISCONNECTED")
+
+        self.assertTrue(self.primary.stopped)
+        self.assertTrue(standby.promoted)
+        self.assertIs(app_state.client, standby)
+        self.assertIn("ready", standby.handlers)
+        self.assertIsNone(ctrader._standby_client)
+        app_state.clear_symbol_state.assert_not_called()
+        app_state.clear_live_prices.assert_not_called()
+        self.assertFalse(ctrader._reconnect_scheduled)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_unready_standby_or_rate_limit_falls_back_to_reconnect(self):
+        standby = self._standby(ready=False)
+        ctrader._schedule_reconnect(5)
+        self.assertFalse(standby.promoted)
+        self.assertTrue(ctrader._reconnect_scheduled)
+
+        ctrader._reconnect_scheduled = False
+        standby.app_authorized = True
+        ctrader._schedule_reconnect(180, failover=False)
+        self.assertFalse(standby.promoted)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 2)
+
+    def test_standby_error_retries_without_touching_primary(self):
+        standby = self._standby()
+
+        standby.handlers["error"][0]("DISCONNECTED")
+
+        self.assertTrue(standby.stopped)
+        self.assertIsNone(ctrader._standby_client)
+        self.assertFalse(self.primary.stopped)
+        self.clock.advance(ctrader._STANDBY_RETRY_SECONDS)
+        self.assertIsNot(ctrader._standby_client, standby)
+        self.assertTrue(ctrader._standby_client.started)
+
+
+class StandbySessionTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = task.Clock()
+        patchers = [
+            patch.object(spotware_connect, "reactor", self.clock),
+            patch.object(spotware_connect, "isInIOThread", return_value=True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.session = spotware_connect.SpotwareConnect("id", "secret", host_index=1, standby=True)
+        self.account_list_requests = []
+        self.session._request_account_list = lambda: self.account_list_requests.append(True)
+
+    def test_standby_stops_after_app_auth_until_promoted(self):
+        events = []
+        self.session.on("standby_ready", lambda: events.append("standby_ready"))
+        self.assertFalse(self.session.promote())
+
+        self.session._on_app_auth_res(None)
+
+        self.assertEqual(events, ["standby_ready"])
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+        self.assertEqual(self.account_list_requests, [])
+
+        self.assertTrue(self.session.promote())
+        self.assertFalse(self.session.standby)
+        self.assertEqual(self.account_list_requests, [True])
+
+    def test_disconnect_clears_app_auth(self):
+        self.session._on_app_auth_res(None)
+        self.session._on_disconnected(None, "lost")
+        self.assertFalse(self.session.app_authorized)
+
+
+def _envelope(message, client_msg_id=None):
+    envelope = ProtoMessage(payloadType=message.payloadType, payload=message.SerializeToString())
+    if client_msg_id:
+        envelope.clientMsgId = client_msg_id
+    return envelope
+
+
+class DecodedMessageTest(unittest.TestCase):
+    """The inner payload is parsed once and shared by every consumer."""
+
+    def test_decode_is_cached(self):
+        msg = DecodedMessage(_envelope(_spot(3, bid=108000), "abc"))
+
+        first = Protobuf.extract(msg, ProtoOASpotEvent)
+        second = msg.decode()
+
+        self.assertIs(first, second)
+        self.assertEqual(first.bid, 108000)
+        self.assertEqual(msg.clientMsgId, "abc")
+
+    def test_expected_type_mismatch_reparses_without_replacing_cache(self):
+        msg = DecodedMessage(_envelope(_spot(3, bid=108000)))
+        cached = msg.decode()
+
+        other = msg.decode(ProtoOAVersionReq)
+
+        self.assertIsInstance(other, ProtoOAVersionReq)
+        self.assertIs(msg.decode(), cached)
+
+    def test_extract_still_accepts_raw_envelopes(self):
+        res = Protobuf.extract(_envelope(_spot(3, ask=5)), ProtoOASpotEvent)
+
+        self.assertEqual(res.ask, 5)
+
+    def test_spot_frames_are_routed_by_the_dispatch_table(self):
+        connect = spotware_connect.SpotwareConnect("id", "secret")
+        with patch.object(connect, "emit_batched") as emit_batched:
+            connect._on_message_received(connect._client, DecodedMessage(_envelope(_spot(9, bid=1))))
+
+        event_name, event = emit_batched.call_args.args
+        self.assertEqual(event_name, "spot_event")
+        self.assertEqual(event.symbolId, 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import gzip
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+from twisted.web.test.requesthelper import DummyRequest
+
+import api
+import static_assets
+from state import app_state
+
+
+class HttpCachingTest(unittest.TestCase):
+    """Repeat Web App opens should revalidate to 304 instead of rebuilding
+    and re-downloading the same payloads."""
+
+    @classmethod
+    def setUpClass(cls):
+        app = Flask(__name__)
+        api.register_routes(app)
+        cls.client = app.test_client()
+
+    def setUp(self):
+        patches = [
+            patch.object(api, "is_valid_admin_token", return_value=True),
+            patch.object(api.db, "get_user_language", return_value="en"),
+            patch.object(api.db, "get_cached_user_status", return_value={"timezone": "Europe/Kyiv"}),
+            patch.object(api.db, "get_watchlist", return_value=["EURUSD"]),
+            patch.object(app_state, "SYMBOLS_LOADED", False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_get_pairs_revalidates_with_etag(self):
+        first = self.client.get("/api/get_pairs?admin_token=x&timezone=Europe/Kyiv")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers.get("ETag")
+        self.assertTrue(etag)
+
+        second = self.client.get(
+            "/api/get_pairs?admin_token=x&timezone=Europe/Kyiv",
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b"")
+
+    def test_get_pairs_answers_304_before_any_db_work(self):
+        uid = api.DEV_USER_ID or 1
+        app_state.set_cached_user_status(uid, {"user_id": uid, "timezone": "Europe/Kyiv"})
+        self.addCleanup(app_state.invalidate_user_status, uid)
+
+        with patch.object(api, "_current_user_id", return_value=uid):
+            first = self.client.get("/api/get_pairs?admin_token=x&timezone=Europe/Kyiv")
+            self.assertEqual(first.status_code, 200)
+
+            with patch.object(api.db, "get_watchlist", return_value=[]) as get_watchlist, \
+                    patch.object(api.db, "set_user_timezone", return_value="America/New_York") as set_user_timezone, \
+                    patch.object(api.db, "get_cached_user_status", return_value={"timezone": "Europe/Kyiv"}) \
+                    as get_cached_user_status:
+                second = self.client.get(
+                    "/api/get_pairs?admin_token=x&timezone=Europe/Kyiv",
+                    headers={"If-None-Match": first.headers["ETag"]},
+                )
+                get_watchlist.assert_not_called()
+                get_cached_user_status.assert_not_called()
+                changed_tz = self.client.get(
+                    "/api/get_pairs?admin_token=x&timezone=America/New_York",
+                    headers={"If-None-Match": first.headers["ETag"]},
+                )
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(changed_tz.status_code, 200)
+        set_user_timezone.assert_called_once()
+        self.assertEqual(get_cached_user_status.call_count, 2)
+
+
+class PairAvailabilityCacheTest(unittest.TestCase):
+    def test_new_registry_recomputes_even_at_the_same_address(self):
+        computed = []
+
+        def compute(pairs):
+            computed.append(app_state.symbol_registry)
+            return ["EURUSD"], []
+
+        with patch.object(app_state, "SYMBOLS_LOADED", True), \
+                patch.object(app_state, "symbol_registry", object()), \
+                patch.object(api, "_pair_availability_cache", {}), \
+                patch.object(api, "_configured_ui_pairs", return_value=["EURUSD"]), \
+                patch.object(api, "_compute_pair_availability", side_effect=compute):
+            api._broker_pair_availability([])
+            api._broker_pair_availability([])
+            self.assertEqual(len(computed), 1)
+
+            # Новий реєстр з тим самим id() (CPython повторно використовує адресу).
+            with patch.object(api, "id", create=True, return_value=id(app_state.symbol_registry)):
+                app_state.symbol_registry = object()
+                api._broker_pair_availability([])
+
+        self.assertEqual(len(computed), 2)
+
+
+class StaticAssetResourceTest(unittest.TestCase):
+    """Web App files come from memory, precompressed, with content-hash
+    versions; hashed URLs are immutable and everything revalidates to 304."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.store = static_assets.StaticAssetStore().load()
+        cls.resource = static_assets.StaticAssetResource(cls.store)
+
+    def _get(self, path: bytes, headers: dict | None = None, **args):
+        request = DummyRequest(path.strip(b"/").split(b"/"))
+        request.path = path
+        for key, value in args.items():
+            request.addArg(key.encode(), value.encode())
+        for key, value in (headers or {}).items():
+            request.requestHeaders.setRawHeaders(key, [value])
+        body = self.resource.render(request)
+        return request, body
+
+    def test_index_uses_content_hash_versions(self):
+        request, body = self._get(b"/")
+        version = self.store.version("/script.js")
+        self.assertIn(f"script.js?v={version}".encode(), body)
+        self.assertNotIn(b"{{API_BASE_URL}}", body)
+
+        etag = request.responseHeaders.getRawHeaders(b"etag")[0]
+        again, body = self._get(b"/", headers={b"If-None-Match": etag})
+        self.assertEqual(again.responseCode, 304)
+        self.assertEqual(body, b"")
+
+    def test_gzip_variant_is_negotiated(self):
+        request, body = self._get(b"/script.js", headers={b"Accept-Encoding": b"gzip, deflate"})
+        self.assertEqual(request.responseHeaders.getRawHeaders(b"content-encoding"), [b"gzip"])
+        identity = self.store.get("/script.js").variants["identity"][0]
+        self.assertEqual(gzip.decompress(body), identity)
+
+        plain, body = self._get(b"/script.js", headers={b"Accept-Encoding": b"gzip;q=0"})
+        self.assertIsNone(plain.responseHeaders.getRawHeaders(b"content-encoding"))
+        self.assertEqual(body, identity)
+
+    def test_hashed_asset_is_immutable(self):
+        version = self.store.version("/style.css")
+        hashed, _ = self._get(b"/style.css", v=version)
+        self.assertIn(b"immutable", hashed.responseHeaders.getRawHeaders(b"cache-control")[0])
+
+        stale, _ = self._get(b"/style.css", v="old")
+        self.assertNotIn(b"immutable", stale.responseHeaders.getRawHeaders(b"cache-control")[0])
+
+    def test_templates_are_not_served(self):
+        self.assertFalse(self.resource.has(b"/templates/privacy_policy.html"))
+        self.assertFalse(self.resource.has(b"/desktop.ini"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from live_prices import LivePriceTable
+
+
+class LivePriceTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = LivePriceTable(capacity=2)
+
+    def test_update_overwrites_the_slot_in_place(self):
+        first = self.table.update("EURUSD", 1.08, 1.0802, 1.0801, 100.0)
+        second = self.table.update("EURUSD", 1.09, None, 1.09, 101.0)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.table.get("EURUSD"), {
+            "type": "price", "pair": "EURUSD", "bid": 1.09, "ask": None, "mid": 1.09, "ts": 101.0, "ticks": 2,
+        })
+        self.assertIsNone(self.table.get("GBPUSD"))
+        self.assertEqual(len(self.table), 1)
+
+    def test_slots_grow_past_the_initial_capacity(self):
+        for i, pair in enumerate(("EURUSD", "GBPUSD", "USDJPY", "XAUUSD", "BTCUSD")):
+            self.table.update(pair, i, i, i, 100.0 + i)
+
+        self.assertEqual(len(self.table), 5)
+        self.assertEqual(self.table.get("BTCUSD")["mid"], 4)
+        self.assertEqual(self.table.timestamps()["USDJPY"], 102.0)
+        self.assertEqual(set(self.table.snapshot()), {"EURUSD", "GBPUSD", "USDJPY", "XAUUSD", "BTCUSD"})
+
+    def test_drop_and_clear_hide_prices_but_keep_slots(self):
+        slot = self.table.update("EURUSD", 1.08, 1.0802, 1.0801, 100.0)
+        self.table.update("GBPUSD", 1.26, 1.2602, 1.2601, 100.0)
+
+        self.table.drop("GBPUSD")
+        self.assertNotIn("GBPUSD", self.table)
+        self.assertEqual(self.table.timestamps(), {"EURUSD": 100.0})
+
+        self.table.clear()
+        self.assertEqual(len(self.table), 0)
+        self.assertEqual(self.table.snapshot(), {})
+        self.assertEqual(self.table.update("EURUSD", 1.1, 1.1, 1.1, 200.0), slot)
+        self.assertEqual(self.table.get("EURUSD")["ticks"], 1)
+        self.assertEqual(self.table.stats(), {"slots": 2, "capacity": 2, "live": 1, "ticks": 1})
+
+    def test_reader_retries_while_a_write_is_in_progress(self):
+        slot = self.table.update("EURUSD", 1.08, 1.0802, 1.0801, 100.0)
+        seq = self.table._seq
+        reads = []
+
+        class _Seq:
+            # Перше читання бачить незавершений запис (непарний номер).
+            def __getitem__(self, index):
+                reads.append(index)
+                return seq[index] + 1 if len(reads) == 1 else seq[index]
+
+        self.table._seq = _Seq()
+        self.assertEqual(self.table.get("EURUSD")["bid"], 1.08)
+        self.assertEqual(reads, [slot, slot, slot])
+
+    def test_reserve_preallocates(self):
+        self.table.reserve(100)
+        self.assertEqual(self.table.stats()["capacity"], 100)
+        self.table.reserve(10)
+        self.assertEqual(self.table.stats()["capacity"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
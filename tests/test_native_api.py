@@ -0,0 +1,167 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from twisted.internet import defer
+from twisted.web.server import NOT_DONE_YET
+from twisted.web.test.requesthelper import DummyRequest
+
+import api
+from state import app_state
+
+
+def _run_inline(reactor, pool, func, *args, **kwargs):
+    return defer.succeed(func(*args, **kwargs))
+
+
+def _make_request(path: bytes, **args) -> DummyRequest:
+    request = DummyRequest(path.strip(b"/").split(b"/"))
+    request.path = path
+    for key, value in args.items():
+        request.addArg(key.encode(), value.encode())
+    return request
+
+
+def _json_body(request: DummyRequest) -> dict:
+    return json.loads(b"".join(request.written).decode("utf-8"))
+
+
+class SignalResourceTest(unittest.TestCase):
+    """/api/signal is served by the reactor: DB checks hop to the blocking
+    pool, the analysis Deferred is awaited without holding any thread."""
+
+    def setUp(self):
+        self.resource = api.SignalResource()
+        patches = [
+            patch.object(api, "deferToThreadPool", side_effect=_run_inline),
+            patch.object(api, "is_valid_admin_token", return_value=True),
+            patch.object(api.db, "get_user_language", return_value="en"),
+            patch.object(app_state, "SYMBOLS_LOADED", False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _render(self, request):
+        result = self.resource.render(request)
+        if result is not NOT_DONE_YET:
+            request.write(result)
+            request.finish()
+        return request
+
+    def test_returns_analysis_result_and_records_it(self):
+        analysis = {"pair": "EURUSD", "timeframe": "1m", "verdict_text": "BUY", "score": 80}
+        with patch.object(api.db, "ensure_trial_or_access", return_value=({"access_allowed": True}, False)), \
+                patch.object(api, "_call_analysis_in_reactor", return_value=defer.succeed(analysis)), \
+                patch.object(api.signal_tracking, "maybe_record_signal") as record:
+            request = self._render(_make_request(b"/api/signal", pair="EURUSD", timeframe="1m", admin_token="x"))
+
+        self.assertEqual(request.responseCode or 200, 200)
+        self.assertEqual(_json_body(request)["verdict_text"], "BUY")
+        record.assert_called_once_with(analysis)
+
+    def test_payment_required_without_access(self):
+        with patch.object(api.db, "ensure_trial_or_access", return_value=({"access_allowed": False}, False)), \
+                patch.object(api, "_call_analysis_in_reactor") as analysis:
+            request = self._render(_make_request(b"/api/signal", pair="EURUSD", admin_token="x"))
+
+        self.assertEqual(request.responseCode, 402)
+        self.assertTrue(_json_body(request)["payment_required"])
+        analysis.assert_not_called()
+
+    def test_timeout_maps_to_localized_error(self):
+        with patch.object(api.db, "ensure_trial_or_access", return_value=({"access_allowed": True}, False)), \
+                patch.object(
+                    api,
+                    "_call_analysis_in_reactor",
+                    return_value=defer.fail(defer.TimeoutError(50, "Deferred")),
+                ):
+            request = self._render(_make_request(b"/api/signal", pair="EURUSD", admin_token="x"))
+
+        self.assertEqual(request.responseCode, 500)
+        self.assertEqual(_json_body(request)["verdict_text"], "ERROR")
+
+    def test_rejects_unauthorized(self):
+        with patch.object(api, "is_valid_admin_token", return_value=False):
+            request = self._render(_make_request(b"/api/signal", pair="EURUSD"))
+
+        self.assertEqual(request.responseCode, 401)
+
+
+class SignalsBatchResourceTest(unittest.TestCase):
+    """/api/signals authenticates once and streams one NDJSON line per pair,
+    cached/ready results first."""
+
+    def setUp(self):
+        self.resource = api.SignalsBatchResource()
+        patches = [
+            patch.object(api, "deferToThreadPool", side_effect=_run_inline),
+            patch.object(api, "is_valid_admin_token", return_value=True),
+            patch.object(api.db, "get_user_language", return_value="en"),
+            patch.object(app_state, "SYMBOLS_LOADED", False),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_streams_ready_results_before_pending_ones(self):
+        slow = defer.Deferred()
+        results = {
+            "EURUSD": slow,
+            "GBPUSD": defer.succeed({"pair": "GBPUSD", "verdict_text": "SELL", "score": 20}),
+        }
+        with patch.object(api.db, "ensure_trial_or_access", return_value=({"access_allowed": True}, False)) as access, \
+                patch.object(api, "_call_analysis_in_reactor", side_effect=lambda pair, *a: results[pair]), \
+                patch.object(api.signal_tracking, "maybe_record_signal") as record:
+            request = _make_request(b"/api/signals", pairs="EURUSD,GBPUSD,eurusd", admin_token="x")
+            self.assertIs(self.resource.render(request), NOT_DONE_YET)
+
+            self.assertEqual(len(request.written), 1)
+            self.assertFalse(request.finished)
+
+            slow.callback({"pair": "EURUSD", "verdict_text": "BUY", "score": 80})
+
+        lines = [json.loads(chunk) for chunk in request.written]
+        self.assertEqual([line["pair"] for line in lines], ["GBPUSD", "EURUSD"])
+        self.assertTrue(request.finished)
+        access.assert_called_once()
+        self.assertEqual(record.call_count, 2)
+
+    def test_failed_pair_becomes_error_line(self):
+        with patch.object(api.db, "ensure_trial_or_access", return_value=({"access_allowed": True}, False)), \
+                patch.object(api, "_call_analysis_in_reactor", return_value=defer.fail(RuntimeError("db://secret"))):
+            request = _make_request(b"/api/signals", pairs="EURUSD", admin_token="x")
+            self.resource.render(request)
+
+        line = json.loads(request.written[0])
+        self.assertEqual(line["verdict_text"], "ERROR")
+        self.assertNotIn("secret", line["error"])
+
+    def test_failure_while_writing_a_result_still_gives_an_error_line(self):
+        results = {
+            "EURUSD": defer.succeed({"pair": "EURUSD", "verdict_text": "BUY", "score": 80}),
+            "GBPUSD": defer.succeed({"pair": "GBPUSD", "verdict_text": "SELL", "score": 20}),
+        }
+
+        def localize(payload, lang):
+            if payload["pair"] == "EURUSD":
+                raise KeyError("verdict")
+            return payload
+
+        with patch.object(api.db, "ensure_trial_or_access", return_value=({"access_allowed": True}, False)), \
+                patch.object(api, "_call_analysis_in_reactor", side_effect=lambda pair, *a: results[pair]), \
+                patch.object(api, "localize_signal_payload", side_effect=localize), \
+                patch.object(api.signal_tracking, "maybe_record_signal"), \
+                patch.object(api.logger, "error") as log_error:
+            request = _make_request(b"/api/signals", pairs="EURUSD,GBPUSD", admin_token="x")
+            self.resource.render(request)
+
+        lines = {line["pair"]: line for line in map(json.loads, request.written)}
+        self.assertEqual(lines["EURUSD"]["verdict_text"], "ERROR")
+        self.assertEqual(lines["GBPUSD"]["verdict_text"], "SELL")
+        self.assertTrue(request.finished)
+        log_error.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
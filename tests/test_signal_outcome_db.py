@@ -0,0 +1,616 @@
+import os
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import db
+import signal_archive
+import write_behind
+
+_LEGACY_CSV = os.path.join(os.path.dirname(__file__), "..", "data", "signal_outcomes_legacy_20260810.csv")
+
+class _SqliteTestCase(unittest.TestCase):
+    """Runs db helpers against a throwaway in-memory SQLite database."""
+
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            future=True,
+        )
+        db.Base.metadata.create_all(bind=self.engine)
+        session_factory = scoped_session(
+            sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False, future=True)
+        )
+        patches = [
+            patch.object(db, "engine", self.engine),
+            patch.object(db, "SessionLocal", session_factory),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self.engine.dispose)
+        db.clear_user_caches()
+        self.addCleanup(db.clear_user_caches)
+        db._runtime_settings_cache.reset()
+        self.addCleanup(db._runtime_settings_cache.reset)
+
+    def _add_outcome(self, pair, timeframe, verdict, score, outcome, age_days=1.0):
+        with db.session_scope() as session:
+            session.add(
+                db.SignalOutcome(
+                    pair=pair,
+                    timeframe=timeframe,
+                    verdict=verdict,
+                    score=score,
+                    entry_price=1.0,
+                    horizon_seconds=60,
+                    outcome=outcome,
+                    entry_ts=db._utcnow() - timedelta(days=age_days),
+                )
+            )
+
+
+class SignalOutcomeStatsTest(_SqliteTestCase):
+    """GROUP BY aggregation must report exactly what the old per-row Python
+    aggregation did."""
+
+    def setUp(self):
+        super().setUp()
+        rows = [
+            ("EURUSD", "1m", "BUY", 20, "up"),
+            ("EURUSD", "1m", "BUY", 22, "down"),
+            ("EURUSD", "5m", "SELL", 81, "down"),
+            ("EURUSD", "5m", "SELL", 83, "flat"),
+            ("GBPUSD", "1m", "SELL", 90, "up"),
+            ("GBPUSD", "1m", "BUY", 10, "pending"),
+            ("GBPUSD", "", "BUY", None, "tp"),
+        ]
+        for row in rows:
+            self._add_outcome(*row)
+        self._add_outcome("USDJPY", "1m", "BUY", 5, "up", age_days=40)
+
+    def _reference(self, days):
+        with db.get_db() as session:
+            since = db._utcnow() - timedelta(days=days)
+            return session.query(db.SignalOutcome).filter(db.SignalOutcome.entry_ts >= since).all()
+
+    def test_stats_match_python_aggregation(self):
+        stats = db.get_signal_outcome_stats(7)
+        rows = self._reference(7)
+
+        expected_total = db._aggregate_signal_outcomes(rows)
+        for key, value in expected_total.items():
+            self.assertEqual(stats[key], value, key)
+
+        by_pair = {item["pair"]: item for item in stats["by_pair"]}
+        self.assertEqual(set(by_pair), {"EURUSD", "GBPUSD"})
+        self.assertEqual([item["pair"] for item in stats["by_pair"]], ["EURUSD", "GBPUSD"])
+        eur = db._aggregate_signal_outcomes([r for r in rows if r.pair == "EURUSD"])
+        self.assertEqual({k: by_pair["EURUSD"][k] for k in eur}, eur)
+
+        by_tf = {item["timeframe"]: item for item in stats["by_timeframe"]}
+        self.assertEqual(set(by_tf), {"1m", "5m", "?"})
+        self.assertEqual(by_tf["?"]["resolved"], 1)
+        self.assertIsNone(by_tf["?"]["win_rate"])
+
+    def test_score_breakdown_buckets(self):
+        buckets = db.get_signal_outcome_score_breakdown(days=7, bucket_size=5)
+        by_start = {b["bucket_start"]: b for b in buckets}
+
+        # BUY 20 -> 80, BUY 22 -> 78 (75 bucket), SELL 81 -> 80, SELL 90 -> 90.
+        self.assertEqual(sorted(by_start), [75, 80, 90])
+        self.assertEqual(by_start[80]["wins"], 2)
+        self.assertEqual(by_start[75]["losses"], 1)
+        self.assertEqual(by_start[90]["losses"], 1)
+        self.assertEqual(by_start[80]["score_range"], "80-85")
+
+
+class SignalOutcomeRollupTest(_SqliteTestCase):
+    """Rollups kept up to date by create/resolve must give the same stats as
+    aggregating raw rows, and a rebuild must reproduce them exactly."""
+
+    def _create(self, pair, verdict, score, timeframe="1m"):
+        return db.create_signal_outcome(
+            pair=pair, timeframe=timeframe, verdict=verdict, score=score, entry_price=1.0, horizon_seconds=60,
+        )
+
+    def _rollup_rows(self):
+        with db.get_db() as session:
+            return sorted(
+                (r.pair, r.timeframe, r.verdict, r.score_bucket, r.total, r.pending, r.wins, r.losses, r.flats)
+                for r in session.query(db.SignalOutcomeRollup).filter(db.SignalOutcomeRollup.source == "live")
+            )
+
+    def setUp(self):
+        super().setUp()
+        a = self._create("EURUSD", "BUY", 20)
+        b = self._create("EURUSD", "BUY", 22)
+        c = self._create("GBPUSD", "SELL", 90, timeframe="5m")
+        self._create("GBPUSD", "SELL", None)
+        db.resolve_signal_outcome(a, outcome="up", exit_price=1.1)
+        db.resolve_signal_outcome(b, outcome="down", exit_price=0.9)
+        db.resolve_signal_outcome(c, outcome="flat", exit_price=1.0)
+
+    def test_incremental_counters(self):
+        rows = self._rollup_rows()
+        self.assertIn(("EURUSD", "1m", "BUY", 75, 1, 0, 0, 1, 0), rows)
+        self.assertIn(("EURUSD", "1m", "BUY", 80, 1, 0, 1, 0, 0), rows)
+        self.assertIn(("GBPUSD", "5m", "SELL", 90, 1, 0, 0, 0, 1), rows)
+        self.assertIn(("GBPUSD", "1m", "SELL", -1, 1, 1, 0, 0, 0), rows)
+
+    def test_rebuild_matches_incremental_and_stats_switch_over(self):
+        raw_stats = db.get_signal_outcome_stats(7)
+        raw_buckets = db.get_signal_outcome_score_breakdown(7)
+        incremental = self._rollup_rows()
+
+        db.rebuild_signal_outcome_rollups()
+
+        self.assertEqual(self._rollup_rows(), incremental)
+        with db.get_db() as session:
+            self.assertTrue(db._signal_outcome_rollups_ready(session))
+        self.assertEqual(db.get_signal_outcome_stats(7), raw_stats)
+        self.assertEqual(db.get_signal_outcome_score_breakdown(7), raw_buckets)
+
+    def test_legacy_csv_is_kept_out_of_stats(self):
+        db.rebuild_signal_outcome_rollups()
+        before = db.get_signal_outcome_stats(365)
+
+        imported = db.import_legacy_signal_outcomes_csv(_LEGACY_CSV)
+
+        self.assertGreater(imported, 0)
+        self.assertEqual(db.get_signal_outcome_stats(365), before)
+
+
+class BulkResolveSignalOutcomesTest(_SqliteTestCase):
+    def _create(self, pair, verdict="BUY", horizon=60, age_seconds=0):
+        outcome_id = db.create_signal_outcome(
+            pair=pair, timeframe="1m", verdict=verdict, score=20, entry_price=1.0, horizon_seconds=horizon,
+        )
+        if age_seconds:
+            with db.session_scope() as session:
+                row = session.get(db.SignalOutcome, outcome_id)
+                row.entry_ts = row.entry_ts - timedelta(seconds=age_seconds)
+        return outcome_id
+
+    def test_due_filter_runs_in_sql(self):
+        due_short = self._create("EURUSD", horizon=60, age_seconds=120)
+        self._create("GBPUSD", horizon=900, age_seconds=120)
+        due_long = self._create("USDJPY", horizon=900, age_seconds=1000)
+
+        due = db.get_pending_signal_outcomes(due_at=db._utcnow())
+
+        self.assertEqual(sorted(row["id"] for row in due), sorted([due_short, due_long]))
+
+    def test_resolves_batch_once_and_skips_already_resolved(self):
+        a = self._create("EURUSD")
+        b = self._create("GBPUSD", verdict="SELL")
+        db.resolve_signal_outcome(b, outcome="up", exit_price=1.2)
+
+        resolved = db.resolve_signal_outcomes([(a, "up", 1.1), (b, "down", 0.9), (999, "up", 1.0)])
+
+        self.assertEqual(resolved, [a])
+        with db.get_db() as session:
+            self.assertEqual(session.get(db.SignalOutcome, a).outcome, "up")
+            self.assertEqual(session.get(db.SignalOutcome, b).outcome, "up")
+        stats = db.get_signal_outcome_stats(1)
+        self.assertEqual((stats["wins"], stats["losses"], stats["pending"]), (1, 1, 0))
+
+    def test_row_resolved_by_a_racing_resolver_is_not_counted_twice(self):
+        a = self._create("EURUSD")
+        b = self._create("GBPUSD", verdict="SELL")
+        utcnow = db._utcnow
+
+        def other_resolver_wins_b():
+            # Між SELECT і UPDATE цього виклику інший процес закриває b.
+            with self.engine.begin() as conn:
+                table = db.SignalOutcome.__table__
+                conn.execute(table.update().where(table.c.id == b).values(outcome="up", resolved_at=utcnow()))
+            return utcnow()
+
+        with patch.object(db, "_utcnow", side_effect=other_resolver_wins_b):
+            resolved = db.resolve_signal_outcomes([(a, "up", 1.1), (b, "down", 0.9)])
+
+        self.assertEqual(resolved, [a])
+        with db.get_db() as session:
+            self.assertEqual(session.get(db.SignalOutcome, b).outcome, "up")
+            rollups = {
+                r.pair: (r.total, r.pending, r.wins, r.losses)
+                for r in session.query(db.SignalOutcomeRollup).filter(db.SignalOutcomeRollup.source == "live")
+            }
+        # Дельту для b рахує лише той резолвер, чий UPDATE його змінив.
+        self.assertEqual(rollups["EURUSD"], (1, 0, 1, 0))
+        self.assertEqual(rollups["GBPUSD"], (1, 1, 0, 0))
+
+
+class WriteBehindSignalOutcomesTest(_SqliteTestCase):
+    """Queued outcomes hit the DB in one batch on flush, and each caller's
+    Future resolves to its own row id."""
+
+    def _item(self, pair):
+        return {"pair": pair, "timeframe": "1m", "verdict": "BUY", "score": 20, "entry_price": 1.0, "horizon_seconds": 60}
+
+    def _count(self):
+        with db.get_db() as session:
+            return session.query(db.SignalOutcome).count()
+
+    def test_flush_writes_batch_and_resolves_futures(self):
+        scheduled = []
+        buffer = write_behind.WriteBehindBuffer("test", db.create_signal_outcomes, max_batch=3)
+        buffer._scheduler = lambda: scheduled.append(True)
+
+        futures = [buffer.submit(self._item(pair)) for pair in ("EURUSD", "GBPUSD")]
+        self.assertEqual((self._count(), buffer.depth(), scheduled), (0, 2, []))
+
+        futures.append(buffer.submit(self._item("USDJPY")))
+        self.assertEqual(scheduled, [True])
+
+        self.assertEqual(buffer.flush(), 3)
+        ids = [future.result(timeout=0) for future in futures]
+        with db.get_db() as session:
+            pairs = [session.get(db.SignalOutcome, outcome_id).pair for outcome_id in ids]
+        self.assertEqual(pairs, ["EURUSD", "GBPUSD", "USDJPY"])
+        self.assertEqual(buffer.stats()["flushed_batches"], 1)
+        self.assertEqual(db.get_signal_outcome_stats(1)["pending"], 3)
+
+    def test_failed_batch_resolves_futures_to_none(self):
+        buffer = write_behind.WriteBehindBuffer("test", lambda items: 1 / 0)
+        with self.assertLogs("write_behind", level="ERROR"):
+            future = buffer.submit(self._item("EURUSD"))
+        self.assertIsNone(future.result(timeout=0))
+        self.assertEqual(buffer.stats()["failed_batches"], 1)
+
+    def test_invalid_item_does_not_cost_the_rest_of_the_batch(self):
+        bad = dict(self._item("GBPUSD"), entry_price="n/a")
+        with self.assertLogs("db", level="WARNING"):
+            ids = db.create_signal_outcomes([self._item("EURUSD"), bad, self._item("USDJPY")])
+
+        self.assertIsNone(ids[1])
+        self.assertTrue(ids[0] and ids[2])
+        self.assertEqual(self._count(), 2)
+
+    def test_failed_batch_insert_is_retried_row_by_row(self):
+        real_upsert = db._upsert_signal_outcome_rollup
+        calls = []
+
+        def _flaky_upsert(session, key, deltas):
+            calls.append(deltas["total"])
+            if len(calls) == 1:
+                raise db.SQLAlchemyError("batch failed")
+            return real_upsert(session, key, deltas)
+
+        with patch.object(db, "_upsert_signal_outcome_rollup", side_effect=_flaky_upsert), \
+                self.assertLogs("db", level="WARNING"):
+            ids = db.create_signal_outcomes([self._item("EURUSD"), self._item("GBPUSD")])
+
+        self.assertTrue(all(ids))
+        self.assertEqual(len(calls), 3)  # збій батчу, потім по рядку
+        self.assertEqual(self._count(), 2)
+        self.assertEqual(db.get_signal_outcome_stats(1)["pending"], 2)
+
+
+class UserReadThroughCacheTest(_SqliteTestCase):
+    """Repeat reads are served from the LRU; the write paths keep it exact."""
+
+    def setUp(self):
+        super().setUp()
+        for store in (db._fallback_watchlists, db._fallback_user_languages, db._fallback_user_timezones,
+                      db._fallback_user_profiles):
+            p = patch.dict(store)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _query_count(self, fn):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        db.event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            result = fn()
+        finally:
+            db.event.remove(self.engine, "before_cursor_execute", listener)
+        return result, len(statements)
+
+    def test_watchlist_hits_db_once_and_writes_invalidate(self):
+        db.add_to_watchlist(7, "eurusd")
+
+        self.assertEqual(self._query_count(lambda: db.get_watchlist(7)), (["EURUSD"], 1))
+        self.assertEqual(self._query_count(lambda: db.get_watchlist(7)), (["EURUSD"], 0))
+        self.assertEqual(self._query_count(lambda: db.is_in_watchlist(7, "EURUSD")), (True, 0))
+
+        db.toggle_watchlist(7, "GBPUSD")
+        self.assertEqual(db.get_watchlist(7), ["EURUSD", "GBPUSD"])
+        db.remove_from_watchlist(7, "EURUSD")
+        self.assertEqual(db.get_watchlist(7), ["GBPUSD"])
+
+        stats = db.get_user_cache_stats()["watchlist"]
+        self.assertGreaterEqual(stats["hits"], 2)
+
+    def test_language_and_timezone_follow_setters_without_queries(self):
+        db.set_user_language(9, "uk")
+        db.set_user_timezone(9, "Europe/London")
+
+        self.assertEqual(self._query_count(lambda: db.get_user_language(9)), ("uk", 0))
+        self.assertEqual(self._query_count(lambda: db.get_user_timezone(9)), ("Europe/London", 0))
+
+    def test_lru_is_bounded(self):
+        cache = db._UserLruCache("test", max_entries=2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+
+        self.assertIsNone(cache.get(2))
+        self.assertEqual((cache.get(1), cache.get(3)), ("a", "c"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_fill_racing_an_invalidation_is_dropped(self):
+        cache = db._UserLruCache("test")
+        version = cache.version
+        cache.invalidate(1)
+        cache.put(1, "stale", version=version)
+
+        self.assertIsNone(cache.get(1))
+
+
+class BulkUserStatusRefreshTest(_SqliteTestCase):
+    """The 120s refresh loads all cached users in one query and only writes
+    back rows whose access lapsed."""
+
+    def setUp(self):
+        super().setUp()
+        from state import app_state
+
+        self.app_state = app_state
+        for store in (app_state.user_status_cache, db._fallback_user_profiles, db._fallback_user_languages,
+                      db._fallback_user_timezones):
+            p = patch.dict(store)
+            p.start()
+            self.addCleanup(p.stop)
+        app_state.user_status_cache.clear()
+
+        now = db._utcnow()
+        with db.session_scope() as session:
+            session.add_all([
+                db.User(user_id=101, subscription_status="trial", plan_type="free", trial_used=True,
+                        subscription_end_date=now - timedelta(minutes=5)),
+                db.User(user_id=102, subscription_status="active", plan_type="pro",
+                        subscription_end_date=now + timedelta(days=3)),
+                db.User(user_id=103, subscription_status="free", plan_type="free"),
+            ])
+        for user_id in (101, 102, 103, 999):
+            app_state.set_cached_user_status(user_id, {"user_id": user_id, "access_allowed": True})
+
+    def test_single_select_and_only_expired_rows_written(self):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+        db.event.listen(self.engine, "before_cursor_execute", listener)
+        self.addCleanup(db.event.remove, self.engine, "before_cursor_execute", listener)
+
+        with patch.object(db, "_notify_subscription_event") as notify:
+            db.refresh_cached_user_statuses()
+
+        self.assertEqual(statements.count("SELECT"), 1)
+        self.assertEqual(statements.count("UPDATE"), 1)
+        notify.assert_called_once()
+        self.assertEqual(notify.call_args.kwargs["key"], "trial_expired_101")
+
+        cached = self.app_state.get_cached_user_status
+        self.assertFalse(cached(101)["access_allowed"])
+        self.assertTrue(cached(102)["access_allowed"])
+        self.assertFalse(cached(103)["access_allowed"])
+        # Unknown to the DB: left as it was rather than creating a row.
+        self.assertTrue(cached(999)["access_allowed"])
+        with db.get_db() as session:
+            self.assertEqual(session.get(db.User, 101).subscription_status, "free")
+            self.assertIsNone(session.get(db.User, 999))
+
+
+class UnitOfWorkTest(_SqliteTestCase):
+    def test_helpers_share_one_session_until_the_unit_ends(self):
+        seen = []
+        with db.unit_of_work():
+            with db.get_db() as session:
+                seen.append(session)
+            with db.session_scope() as session:
+                seen.append(session)
+            self.assertIs(seen[0], seen[1])
+            self.assertTrue(db.SessionLocal.registry.has())
+        self.assertFalse(db.SessionLocal.registry.has())
+
+    def test_resolver_job_runs_get_and_resolve_in_one_unit(self):
+        outcome_id = db.create_signal_outcome(
+            pair="EURUSD", timeframe="1m", verdict="BUY", score=20, entry_price=1.0, horizon_seconds=0,
+        )
+        with db.unit_of_work():
+            due = db.get_pending_signal_outcomes(due_at=db._utcnow())
+            resolved = db.resolve_signal_outcomes([(row["id"], "up", 1.1) for row in due])
+
+        self.assertEqual(resolved, [outcome_id])
+        with db.get_db() as session:
+            self.assertEqual(session.get(db.SignalOutcome, outcome_id).outcome, "up")
+
+
+class CoreFastPathTest(_SqliteTestCase):
+    """The Core select() helpers return plain scalars with the same meaning
+    the ORM versions had."""
+
+    def setUp(self):
+        super().setUp()
+        now = db._utcnow()
+        with db.session_scope() as session:
+            session.add_all([
+                db.AutoTrade(pair="EURUSD", direction="BUY", volume=1000, account_mode="demo", status="open"),
+                db.AutoTrade(pair="EURUSD", direction="BUY", volume=1000, account_mode="demo",
+                             status="closed_tp", pnl_amount=2.5, closed_at=now),
+                db.AutoTrade(pair="EURUSD", direction="BUY", volume=1000, account_mode="demo",
+                             status="closed_sl", pnl_amount=-1.0, closed_at=now - timedelta(days=2)),
+                db.AutoTrade(pair="EURUSD", direction="BUY", volume=1000, account_mode="live", status="submitted"),
+            ])
+            for age, result in enumerate(("loss", "error", "loss", "win", "loss")):
+                session.add(db.BinomoTrade(
+                    asset="EUR/USD", direction="up", amount=1.0, expiry_seconds=60, account_mode="demo",
+                    result=result, payout_amount=-1.0 if result == "loss" else 0.8,
+                    resolved_at=now - timedelta(seconds=age), entry_ts=now - timedelta(seconds=age),
+                ))
+            db._set_runtime_setting(session, "some_key", "value")
+
+    def test_auto_trade_helpers(self):
+        self.assertEqual(db.count_open_auto_trades("demo"), 1)
+        self.assertEqual(db.count_open_auto_trades("LIVE"), 1)
+        self.assertEqual(db.get_daily_auto_trade_pnl("demo"), 2.5)
+        self.assertEqual(db.get_daily_auto_trade_pnl("live"), 0.0)
+        self.assertEqual(db.get_open_auto_trade_pairs(), ["EURUSD"])
+
+    def test_pending_signal_outcome_pairs(self):
+        for pair in ("GBPUSD", "EURUSD", "GBPUSD"):
+            db.create_signal_outcome(
+                pair=pair, timeframe="1m", verdict="BUY", score=20, entry_price=1.0, horizon_seconds=60,
+            )
+        resolved = db.create_signal_outcome(
+            pair="USDJPY", timeframe="1m", verdict="BUY", score=20, entry_price=1.0, horizon_seconds=60,
+        )
+        db.resolve_signal_outcome(resolved, outcome="up", exit_price=1.1)
+        self.assertEqual(db.get_pending_signal_outcome_pairs(), ["EURUSD", "GBPUSD"])
+
+    def test_binomo_helpers(self):
+        self.assertEqual(db.count_binomo_trades_today("demo"), 5)
+        self.assertEqual(db.get_consecutive_binomo_losses("demo"), 2)
+        self.assertEqual(db.get_consecutive_binomo_losses("demo", limit=1), 1)
+
+    def test_runtime_setting(self):
+        with db.get_db() as session:
+            self.assertEqual(db._get_runtime_setting(session, "some_key"), "value")
+            self.assertIsNone(db._get_runtime_setting(session, "missing"))
+
+
+class SignalArchiveTest(_SqliteTestCase):
+    """Archival moves old resolved rows to monthly CSV.gz files, keeps the
+    stats identical through rollups, and survives a rollup rebuild."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self._add_outcome("EURUSD", "1m", "BUY", 20, "up", age_days=40)
+        self._add_outcome("EURUSD", "1m", "SELL", 80, "up", age_days=45)
+        self._add_outcome("GBPUSD", "1m", "BUY", 20, "pending", age_days=40)
+        self._add_outcome("GBPUSD", "1m", "BUY", 20, "down", age_days=2)
+        with db.session_scope() as session:
+            session.add(db.BinomoTrade(
+                asset="EUR/USD", direction="up", amount=1.0, expiry_seconds=60, account_mode="demo",
+                result="win", payout_amount=0.8, entry_ts=db._utcnow() - timedelta(days=40),
+            ))
+        db.rebuild_signal_outcome_rollups()
+
+    def _live_outcomes(self):
+        with db.get_db() as session:
+            return sorted(row.outcome for row in session.query(db.SignalOutcome))
+
+    def test_archives_old_resolved_rows_and_keeps_stats(self):
+        before = db.get_signal_outcome_stats(365)
+
+        archived = signal_archive.run_archival(30, directory=self.tmp.name)
+
+        self.assertEqual(archived, {"binomo_trades": 1, "auto_trades": 0, "signal_outcomes": 2})
+        self.assertEqual(self._live_outcomes(), ["down", "pending"])
+        self.assertEqual(db.get_signal_outcome_stats(365), before)
+        self.assertTrue(all(f["bytes"] > 0 for f in signal_archive.list_archive_files(self.tmp.name)))
+
+        archived_stats = signal_archive.get_archived_signal_outcome_stats(365, directory=self.tmp.name)
+        self.assertEqual((archived_stats["total"], archived_stats["wins"], archived_stats["losses"]), (2, 1, 1))
+
+        db.rebuild_signal_outcome_rollups()
+        self.assertEqual(db.get_signal_outcome_stats(365), before)
+
+    def test_second_run_is_a_no_op_and_files_append(self):
+        signal_archive.run_archival(30, directory=self.tmp.name)
+        self._add_outcome("USDJPY", "5m", "BUY", 20, "flat", age_days=40)
+
+        self.assertEqual(signal_archive.run_archival(30, directory=self.tmp.name)["signal_outcomes"], 1)
+        self.assertEqual(signal_archive.run_archival(30, directory=self.tmp.name)["signal_outcomes"], 0)
+
+        pairs = sorted(r["pair"] for r in signal_archive.iter_archived_rows("signal_outcomes", directory=self.tmp.name))
+        self.assertEqual(pairs, ["EURUSD", "EURUSD", "USDJPY"])
+
+
+class RuntimeSettingsCacheTest(_SqliteTestCase):
+    def _statements(self, fn):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        db.event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            result = fn()
+        finally:
+            db.event.remove(self.engine, "before_cursor_execute", listener)
+        return result, len(statements)
+
+    def test_repeat_checks_skip_the_db_and_local_writes_show_up_at_once(self):
+        db.trip_binomo_kill_switch("3 losses")
+
+        state, queries = self._statements(db.get_binomo_runtime_state)
+        self.assertTrue(state["kill_switch_tripped"])
+        self.assertEqual(state["kill_switch_reason"], "3 losses")
+        self.assertEqual(queries, 2)  # version check + one reload
+        self.assertEqual(self._statements(db.get_binomo_runtime_state)[1], 0)
+
+        db.clear_binomo_kill_switch()
+        self.assertFalse(db.get_binomo_runtime_state()["kill_switch_tripped"])
+
+    def test_other_process_writes_are_picked_up_by_version(self):
+        db.set_binomo_runtime_enabled(True)
+        self.assertTrue(db.get_binomo_runtime_state()["runtime_enabled"])
+
+        # Another process: rows change in the DB without touching this
+        # process's cache. Until max_age passes the cached value stands.
+        with self.engine.begin() as conn:
+            conn.execute(db.text("UPDATE app_runtime_settings SET value='false' WHERE key='binomo_runtime_enabled'"))
+            conn.execute(db.text("UPDATE app_runtime_settings SET value='other' WHERE key='runtime_settings_version'"))
+        self.assertTrue(db.get_binomo_runtime_state()["runtime_enabled"])
+
+        with patch.object(db._runtime_settings_cache, "max_age", 0.0):
+            self.assertFalse(db.get_binomo_runtime_state()["runtime_enabled"])
+            _, queries = self._statements(db.get_binomo_runtime_state)
+        self.assertEqual(queries, 1)  # version unchanged -> no reload
+
+
+class EngineOptionsTest(unittest.TestCase):
+    def test_pre_ping_only_for_network_databases(self):
+        sqlite_file = db._engine_options("sqlite:////data/zigzag.db")
+        postgres = db._engine_options("postgresql://user:pw@db.internal:5432/zigzag")
+        memory = db._engine_options("sqlite://")
+
+        self.assertNotIn("pool_pre_ping", sqlite_file)
+        self.assertIs(sqlite_file["poolclass"], db._TimedQueuePool)
+        self.assertEqual(sqlite_file["pool_size"], db.DB_POOL_SIZE)
+        self.assertTrue(postgres["pool_pre_ping"])
+        self.assertIn("pool_recycle", postgres)
+        self.assertNotIn("poolclass", memory)
+
+    def test_configure_database_records_checkouts(self):
+        for name in ("engine", "SessionLocal"):
+            p = patch.object(db, name, None)
+            p.start()
+            self.addCleanup(p.stop)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertTrue(db.configure_database(f"sqlite:///{os.path.join(tmp, 'pool.db')}"))
+            try:
+                with db.get_db() as session:
+                    session.execute(db.text("select 1"))
+                stats = db.get_pool_stats()
+            finally:
+                db.engine.dispose()
+
+        self.assertEqual(stats["pool_class"], "_TimedQueuePool")
+        self.assertFalse(stats["pre_ping"])
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["checked_out"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
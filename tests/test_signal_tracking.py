@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 
 import signal_tracking
 
@@ -64,5 +65,23 @@ class MaybeRecordSignalTest(unittest.TestCase):
         self.assertIsNone(signal_tracking.maybe_record_signal(result))
 
 
+class ResolvePendingSignalsTest(unittest.TestCase):
+    def test_resolves_all_priced_rows_in_one_bulk_call(self):
+        pending = [
+            {"id": 1, "pair": "EURUSD", "verdict": "BUY", "entry_price": 100.0},
+            {"id": 2, "pair": "GBPUSD", "verdict": "SELL", "entry_price": 100.0},
+            {"id": 3, "pair": "USDJPY", "verdict": "BUY", "entry_price": 100.0},
+        ]
+        prices = {"EURUSD": {"mid": 101.0}, "GBPUSD": {"mid": 99.0}}
+
+        with patch.object(signal_tracking.db, "get_pending_signal_outcomes", return_value=pending) as load, \
+                patch.object(signal_tracking.app_state, "get_live_price", side_effect=prices.get), \
+                patch.object(signal_tracking.db, "resolve_signal_outcomes", return_value=[1, 2]) as bulk:
+            signal_tracking.resolve_pending_signals()
+
+        self.assertIsNotNone(load.call_args.kwargs.get("due_at"))
+        bulk.assert_called_once_with([(1, "up", 101.0), (2, "down", 99.0)])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+
+import api
+import state
+from state import app_state
+
+
+class _FakeTransport:
+    def __init__(self):
+        self.aborted = False
+
+    def abortConnection(self):
+        self.aborted = True
+
+
+class _FakeRequest:
+    def __init__(self):
+        self.written = []
+        self.transport = _FakeTransport()
+
+    def write(self, data):
+        self.written.append(data)
+
+
+class SSEConnectionTest(unittest.TestCase):
+    """Push delivery: writes go straight to the transport until twisted pauses
+    the producer, then pile up locally and a client that falls too far behind
+    is dropped by byte count."""
+
+    def setUp(self):
+        self.request = _FakeRequest()
+        self.conn = api.SSEConnection(self.request, "price", max_buffered_bytes=20)
+        self.conn.listener_id = app_state.register_sse_listener("price", self.conn)
+
+    def tearDown(self):
+        app_state.unregister_sse_listener("price", self.conn.listener_id)
+
+    def test_writes_immediately_while_unpaused(self):
+        self.assertTrue(self.conn.deliver(b"data: 1\n\n"))
+        self.assertEqual(self.request.written, [b"data: 1\n\n"])
+
+    def test_buffers_while_paused_and_flushes_on_resume(self):
+        self.conn.pauseProducing()
+        self.conn.deliver(b"a")
+        self.conn.deliver(b"b")
+        self.assertEqual(self.request.written, [])
+        self.assertEqual(self.conn.buffered_bytes, 2)
+
+        self.conn.resumeProducing()
+        self.assertEqual(self.request.written, [b"a", b"b"])
+        self.assertEqual(self.conn.buffered_bytes, 0)
+
+    def test_slow_client_is_dropped_by_buffered_bytes(self):
+        self.conn.pauseProducing()
+        self.assertTrue(self.conn.deliver(b"x" * 15))
+        self.assertFalse(self.conn.deliver(b"x" * 10))
+        self.assertTrue(self.request.transport.aborted)
+        self.assertEqual(app_state.sse_listener_count("price"), 0)
+
+    def test_publish_only_wakes_listeners_of_that_channel(self):
+        with patch.object(state, "isInIOThread", return_value=True):
+            app_state.publish_signal_sse({"pair": "EURUSD"})
+            self.assertEqual(self.request.written, [])
+
+            app_state.publish_price_sse({"type": "price", "pair": "EURUSD"})
+
+        self.assertEqual(len(self.request.written), 1)
+        self.assertTrue(self.request.written[0].startswith(b'data: {"type": "price"'))
+
+    def test_publish_from_worker_thread_hops_to_reactor(self):
+        with patch.object(state, "isInIOThread", return_value=False), \
+                patch.object(state.reactor, "callFromThread") as call_from_thread:
+            app_state.publish_price_sse({"type": "price", "pair": "EURUSD"})
+
+        call_from_thread.assert_called_once()
+        self.assertEqual(self.request.written, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOALightSymbol
+
+from symbol_registry import MISSING, SymbolRegistry
+
+
+def _light(symbol_id, name):
+    return ProtoOALightSymbol(symbolId=symbol_id, symbolName=name)
+
+
+class SymbolRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = SymbolRegistry([
+            _light(1, "EUR/USD"),
+            _light(2, "USDJPY"),
+            _light(3, "AVXUSD"),
+            _light(4, "XAUUSD.m"),
+            _light(5, "XAUUSD.mini"),
+        ], details={2: {"digits": 3}})
+
+    def test_key_variants_and_aliases_share_one_index(self):
+        index = self.registry.index("EURUSD")
+        self.assertEqual(self.registry.symbol_ids[index], 1)
+        for pair in ("EUR/USD", "eur/usd", "EURUSD"):
+            self.assertEqual(self.registry.index(pair), index)
+        self.assertEqual(self.registry.resolve("AVAXUSD").symbolId, 3)
+        self.assertIsNone(self.registry.resolve("NOPE"))
+        self.assertEqual(self.registry.index(""), MISSING)
+
+    def test_suffixed_broker_names_match_by_shortest_prefix(self):
+        self.assertEqual(self.registry.resolve("XAUUSD").symbolId, 4)
+        self.assertIn("XAUUSD", self.registry._index)
+
+    def test_divisor_stays_fixed_and_digits_are_display_only(self):
+        index = self.registry.index("USDJPY")
+        self.assertEqual(self.registry.digits[index], 3)
+        self.assertEqual(self.registry.divisors[index], 10 ** 5)
+        self.assertEqual(self.registry.digits[self.registry.index("EURUSD")], MISSING)
+
+    def test_bind_renames_the_published_pair(self):
+        index = self.registry.index("XAUUSD")
+        self.assertEqual(self.registry.name_of_id(4), "XAUUSDM")
+
+        self.registry.bind("XAU/USD", index)
+
+        self.assertEqual(self.registry.name_of_id(4), "XAUUSD")
+        self.assertEqual(self.registry.name_of_id(99, "99"), "99")
+        self.assertIn("XAUUSDM", self.registry.all_names())
+        self.assertEqual(self.registry.index_of_id(4), index)
+
+
+if __name__ == "__main__":
+    unittest.main()
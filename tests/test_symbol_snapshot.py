@@ -0,0 +1,159 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from twisted.internet import defer, task
+
+from ctrader_open_api.messages.OpenApiCommonMessages_pb2 import ProtoMessage
+from ctrader_open_api.messages.OpenApiMessages_pb2 import ProtoOASymbolByIdRes, ProtoOASymbolsListRes
+from ctrader_open_api.messages.OpenApiModelMessages_pb2 import ProtoOALightSymbol, ProtoOASymbol
+from ctrader_open_api.protobuf import DecodedMessage
+
+import ctrader
+import symbol_snapshot
+from price_utils import resolve_price_divisor
+from state import app_state
+
+
+def _received(message):
+    return DecodedMessage(ProtoMessage(payloadType=message.payloadType, payload=message.SerializeToString()))
+
+
+def _light(symbol_id, name):
+    return ProtoOALightSymbol(symbolId=symbol_id, symbolName=name, enabled=True)
+
+
+class SymbolSnapshotFileTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "nested", "symbols.json.gz")
+
+    def test_round_trip_keeps_symbols_and_details(self):
+        details = {1: {"digits": 5, "minVolume": 100000, "stepVolume": 100000}}
+        symbol_snapshot.save(42, [_light(1, "EURUSD"), _light(2, "USD/JPY")], details, path=self.path)
+
+        loaded = symbol_snapshot.load(42, path=self.path)
+
+        self.assertEqual([(s.symbolId, s.symbolName) for s in loaded["symbols"]], [(1, "EURUSD"), (2, "USD/JPY")])
+        self.assertFalse(loaded["symbols"][0].HasField("baseAssetId"))
+        self.assertEqual(loaded["details"], details)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_other_account_or_broken_file_is_ignored(self):
+        symbol_snapshot.save(42, [_light(1, "EURUSD")], {}, path=self.path)
+        self.assertIsNone(symbol_snapshot.load(7, path=self.path))
+
+        with gzip.open(self.path, "wt") as f:
+            f.write("{not json")
+        self.assertIsNone(symbol_snapshot.load(42, path=self.path))
+        self.assertIsNone(symbol_snapshot.load(42, path=self.path + ".missing"))
+
+    def test_rows_are_compact(self):
+        symbol_snapshot.save(42, [_light(1, "EURUSD")], {}, path=self.path)
+        with gzip.open(self.path, "rt") as f:
+            payload = json.load(f)
+        self.assertEqual(payload["symbols"], [[1, "EURUSD", True, None, None, None, None]])
+
+
+class _FakeClient:
+    def __init__(self):
+        self.detail_requests = []
+
+    def get_symbols_by_id(self, symbol_ids):
+        self.detail_requests.append(list(symbol_ids))
+        res = ProtoOASymbolByIdRes(
+            ctidTraderAccountId=42,
+            symbol=[
+                ProtoOASymbol(symbolId=symbol_id, digits=3, pipPosition=2, minVolume=100000, stepVolume=100000)
+                for symbol_id in symbol_ids
+            ],
+        )
+        return defer.succeed(_received(res))
+
+
+class ColdStartTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "symbols.json.gz")
+        self.client = _FakeClient()
+        self.saved = []
+        patchers = [
+            patch.object(app_state, "symbol_registry", app_state.symbol_registry),
+            patch.object(app_state, "symbol_details", {}),
+            patch.object(app_state, "all_symbol_names", []),
+            patch.object(app_state, "SYMBOLS_LOADED", False),
+            patch.object(app_state, "client", self.client),
+            patch.object(ctrader, "reactor", task.Clock()),
+            patch.object(ctrader, "_symbols_source", None),
+            patch.object(ctrader, "CTRADER_SYMBOL_SNAPSHOT", True),
+            patch.object(ctrader, "get_demo_account_id", return_value=42),
+            patch.object(ctrader, "_account_id", return_value=42),
+            patch.object(ctrader, "_collect_configured_assets", return_value=["USDJPY"]),
+            patch.object(ctrader, "start_price_subscriptions"),
+            patch.object(ctrader, "_save_symbol_snapshot", side_effect=self.saved.append),
+            patch.object(symbol_snapshot, "CTRADER_SYMBOL_SNAPSHOT_PATH", self.path),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_snapshot_makes_symbols_available_before_the_live_list(self):
+        symbol_snapshot.save(42, [_light(1, "EURUSD"), _light(2, "USD/JPY")], {2: {"digits": 3, "minVolume": 1000}})
+
+        self.assertTrue(ctrader._load_symbol_snapshot())
+
+        self.assertTrue(app_state.SYMBOLS_LOADED)
+        self.assertEqual(ctrader._symbols_source, "snapshot")
+        symbol = ctrader._resolve_broker_symbol("USDJPY")
+        self.assertEqual(symbol.symbolId, 2)
+        self.assertEqual(ctrader.get_symbol_details(2)["minVolume"], 1000)
+        # digits лише для відображення: ціни cTrader завжди в 1/100000.
+        self.assertEqual(resolve_price_divisor(symbol), 10 ** 5)
+
+    def test_live_list_reconciles_without_resetting_subscriptions(self):
+        symbol_snapshot.save(42, [_light(1, "EURUSD"), _light(2, "USD/JPY")], {})
+        ctrader._load_symbol_snapshot()
+
+        res = ProtoOASymbolsListRes(ctidTraderAccountId=42, symbol=[_light(2, "USD/JPY"), _light(3, "GBPUSD")])
+        ctrader._on_symbols_loaded(_received(res))
+
+        self.assertEqual(ctrader._symbols_source, "server")
+        self.assertIsNone(ctrader._resolve_broker_symbol("EURUSD"))
+        ctrader.start_price_subscriptions.assert_called_once_with(reset=False)
+        self.assertEqual(self.client.detail_requests, [[2]])
+        self.assertEqual(ctrader.get_symbol_details(2)["digits"], 3)
+        self.assertEqual([s.symbolId for s in self.saved[0]], [2, 3])
+
+    def test_reconnect_keeps_symbols_in_memory_instead_of_rereading_the_snapshot(self):
+        ctrader._on_symbols_loaded(_received(ProtoOASymbolsListRes(ctidTraderAccountId=42, symbol=[_light(2, "USD/JPY")])))
+        registry = app_state.symbol_registry
+
+        with patch.object(app_state, "client", None), \
+                patch.object(ctrader, "_subscriptions"), \
+                patch.object(ctrader, "start_ctrader_client") as start, \
+                patch.object(symbol_snapshot, "load") as load:
+            ctrader._do_reconnect()
+            start.assert_called_once_with()
+            load.assert_not_called()
+
+        self.assertIs(app_state.symbol_registry, registry)
+        self.assertTrue(app_state.SYMBOLS_LOADED)
+        self.assertEqual(ctrader._symbols_source, "snapshot")
+        self.assertEqual(ctrader._resolve_broker_symbol("USDJPY").symbolId, 2)
+
+    def test_no_snapshot_keeps_the_old_path(self):
+        self.assertFalse(ctrader._load_symbol_snapshot())
+        self.assertFalse(app_state.SYMBOLS_LOADED)
+
+        res = ProtoOASymbolsListRes(ctidTraderAccountId=42, symbol=[_light(2, "USD/JPY")])
+        ctrader._on_symbols_loaded(_received(res))
+        ctrader.start_price_subscriptions.assert_called_once_with(reset=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# write_behind.py
+"""
+Write-behind buffer for hot-path inserts (SignalOutcome).
+
+Callers enqueue a row and get a concurrent.futures.Future back right away;
+rows are written in batches by the blocking pool on a short timer, or as
+soon as a buffer reaches its size threshold. The Future resolves to what the
+batch insert returned for that row (the SignalOutcome id, for instance), so
+anything that needs the id — e.g. linking a BinomoTrade to its outcome — can
+still wait for it.
+
+Until start() is called (tests, one-off scripts) every submit is flushed
+inline, so behaviour matches a direct insert.
+"""
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from twisted.internet.task import LoopingCall
+from twisted.internet.threads import deferToThreadPool
+
+import db
+from config import WRITE_BEHIND_FLUSH_INTERVAL_MS, WRITE_BEHIND_MAX_BATCH
+
+logger = logging.getLogger("write_behind")
+
+
+class WriteBehindBuffer:
+    def __init__(self, name: str, flush_fn: Callable[[List[dict]], Any], max_batch: int = WRITE_BEHIND_MAX_BATCH):
+        """flush_fn receives a list of items and returns a list of per-item
+        results in the same order; anything else resolves every Future in
+        the batch to None."""
+        self.name = name
+        self._flush_fn = flush_fn
+        self.max_batch = max(1, int(max_batch))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: List[Tuple[dict, Future]] = []
+        self._scheduler: Optional[Callable[[], None]] = None
+        self.flushed_rows = 0
+        self.flushed_batches = 0
+        self.failed_batches = 0
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def submit(self, item: dict) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((item, future))
+            full = len(self._pending) >= self.max_batch
+            scheduler = self._scheduler
+
+        if scheduler is None:
+            self.flush()
+        elif full:
+            scheduler()
+        return future
+
+    def flush(self) -> int:
+        """Writes everything queued so far. Blocking — call from a pool
+        thread (or at shutdown). Returns how many rows were handed to
+        flush_fn."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[: self.max_batch]
+                    del self._pending[: len(batch)]
+                if not batch:
+                    return written
+
+                items = [item for item, _ in batch]
+                try:
+                    results = self._flush_fn(items)
+                    self.flushed_batches += 1
+                except Exception:
+                    logger.exception(f"Write-behind '{self.name}': batch of {len(items)} failed")
+                    self.failed_batches += 1
+                    results = None
+
+                if not isinstance(results, list) or len(results) != len(batch):
+                    results = [None] * len(batch)
+
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+                written += len(batch)
+                self.flushed_rows += len(batch)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": self.depth(),
+            "max_batch": self.max_batch,
+            "flushed_rows": self.flushed_rows,
+            "flushed_batches": self.flushed_batches,
+            "failed_batches": self.failed_batches,
+        }
+
+
+signal_outcomes = WriteBehindBuffer("signal_outcomes", db.create_signal_outcomes)
+
+_BUFFERS = (signal_outcomes,)
+_loop: Optional[LoopingCall] = None
+
+
+def start(reactor, pool, interval_ms: int = WRITE_BEHIND_FLUSH_INTERVAL_MS) -> LoopingCall:
+    """Switches the buffers to batched mode: a reactor timer (and any buffer
+    hitting max_batch) schedules a flush in `pool`."""
+    global _loop
+
+    inflight = {"flush": False}
+
+    def _schedule_flush():
+        if inflight["flush"] or not any(buffer.depth() for buffer in _BUFFERS):
+            return
+        inflight["flush"] = True
+
+        d = deferToThreadPool(reactor, pool, flush_all)
+
+        def _done(result):
+            inflight["flush"] = False
+            return result
+
+        d.addBoth(_done)
+        d.addErrback(lambda failure: logger.error(f"Write-behind flush failed: {failure.getErrorMessage()}"))
+
+    def _schedule_from_any_thread():
+        reactor.callFromThread(_schedule_flush)
+
+    for buffer in _BUFFERS:
+        buffer._scheduler = _schedule_from_any_thread
+
+    _loop = LoopingCall(_schedule_flush)
+    _loop.clock = reactor
+    _loop.start(max(0.05, interval_ms / 1000.0), now=False)
+    logger.info(f"Write-behind buffers started (flush every {interval_ms}ms, batch {WRITE_BEHIND_MAX_BATCH})")
+    return _loop
+
+
+def stop_and_flush() -> int:
+    """Shutdown hook: stop the timer, go back to inline mode and write out
+    whatever is still queued."""
+    global _loop
+
+    if _loop is not None and _loop.running:
+        _loop.stop()
+    _loop = None
+
+    for buffer in _BUFFERS:
+        buffer._scheduler = None
+    return flush_all()
+
+
+def flush_all() -> int:
+    return sum(buffer.flush() for buffer in _BUFFERS)
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {buffer.name: buffer.stats() for buffer in _BUFFERS}